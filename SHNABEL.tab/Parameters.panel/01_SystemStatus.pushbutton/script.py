@@ -7,8 +7,17 @@ __doc__ = 'Check if the automatic export system is active for this Revit model a
 __author__ = 'SHNABEL digital'
 
 from pyrevit import forms, script, revit
+from pyrevit.coreutils import envvars
 import os
 import re
+import time
+
+from shn_reports.freshness import (FreshnessCache, model_freshness, project_freshness,
+                                   duration_change)
+from shn_reports.retention import scan_share, apply_actions, DELETE, PROMOTE
+from shn_reports.reachability import PathProbe, REACHABLE, MISSING
+from shn_reports.spool import ReportSpool
+from shn_reports.workerpool import BackgroundTask
 
 # =========================================================================
 # 1. PATH SETTINGS
@@ -25,6 +34,30 @@ HOOK_FILE = os.path.join(EXTENSION_DIR, 'hooks', 'doc-synced.py')
 
 # Root path for reports on the server
 SERVER_ROOT_PATH = r"F:\REVIT_SHN\CHECK\Parameters_BOQ"
+# Room List reports (02_RoomList BASE_PATH), cleaned up together with BOQ
+ROOMS_ROOT_PATH = r"F:\REVIT_SHN\CHECK\Rooms"
+
+# Server checks run in the background; the panel waits at most this long
+# and reuses a result for PROBE_MAX_AGE_S (shared for the Revit session)
+PROBE_TIMEOUT_S = 0.5
+PROBE_MAX_AGE_S = 30
+PROBE_ENVVAR = "SHN_SERVER_PROBE"
+
+# Files written by the sync hook into every model report folder
+SYNC_LOG_FILE_NAME = "SHN_Reports_sync_log.jsonl"
+STATUS_FILE_NAME = "SHN_Reports_status.json"
+# Freshness data is read only on request and reused for this long
+FRESHNESS_TTL_S = 60
+FRESHNESS_ENVVAR = "SHN_REPORT_FRESHNESS"
+
+# Share work (freshness, publish, retention) runs off the UI thread; the
+# panel waits this long, a task that takes longer keeps running and its
+# result is shown on the next click if it is not older than TASK_RESULT_MAX_AGE_S
+FRESHNESS_TIMEOUT_S = 1.0
+PUBLISH_TIMEOUT_S = 20
+RETENTION_TIMEOUT_S = 120
+TASK_RESULT_MAX_AGE_S = 300
+TASKS_ENVVAR = "SHN_STATUS_TASKS"
 
 # =========================================================================
 # 2. FUNCTIONS
@@ -55,6 +88,185 @@ def get_current_project_folder():
         # Fallback to root if anything goes wrong
         return None
 
+def get_server_probe():
+    """One probe per Revit session, so the cached result survives between clicks."""
+    probe = envvars.get_pyrevit_env_var(PROBE_ENVVAR)
+    if probe is None:
+        probe = PathProbe(PROBE_MAX_AGE_S)
+        envvars.set_pyrevit_env_var(PROBE_ENVVAR, probe)
+    return probe
+
+def run_in_background(name, func, timeout_s):
+    """
+    Runs func on a worker thread and waits at most timeout_s. A task with
+    the same name that is still running (from an earlier click) is waited
+    for instead of starting a second one. Returns the finished task or
+    None if it is still running.
+    """
+    tasks = envvars.get_pyrevit_env_var(TASKS_ENVVAR)
+    if tasks is None:
+        tasks = {}
+        envvars.set_pyrevit_env_var(TASKS_ENVVAR, tasks)
+    task = tasks.get(name)
+    if task is not None and task.done \
+            and time.time() - task.finished_at > TASK_RESULT_MAX_AGE_S:
+        task = None
+    if task is None:
+        task = BackgroundTask(func, "SHN " + name)
+        tasks[name] = task
+    if not task.wait(timeout_s):
+        return None
+    tasks.pop(name, None)
+    return task
+
+def task_error(task):
+    """Last line of the task traceback."""
+    return task.error.strip().splitlines()[-1]
+
+def get_freshness_cache():
+    cache = envvars.get_pyrevit_env_var(FRESHNESS_ENVVAR)
+    if cache is None:
+        cache = FreshnessCache(FRESHNESS_TTL_S)
+        envvars.set_pyrevit_env_var(FRESHNESS_ENVVAR, cache)
+    return cache
+
+def load_freshness(model_folder):
+    """Model summary + last status of every model in the same project."""
+    return {
+        "model": model_freshness(model_folder, SYNC_LOG_FILE_NAME, STATUS_FILE_NAME),
+        "project": project_freshness(os.path.dirname(model_folder), STATUS_FILE_NAME),
+    }
+
+def show_freshness(model_folder):
+    """Report freshness for the current model and its project in the output window."""
+    task = run_in_background(
+        "freshness " + model_folder,
+        lambda: get_freshness_cache().get(model_folder, lambda: load_freshness(model_folder)),
+        FRESHNESS_TIMEOUT_S)
+    if task is None:
+        forms.alert(
+            "Report share is not responding - freshness data is still loading.\n"
+            "Open Report Freshness again in a moment.",
+            title="Report Freshness"
+        )
+        return
+    if task.error:
+        forms.alert("Report freshness could not be read:\n{}".format(task_error(task)),
+                    title="Report Freshness")
+        return
+    data, loaded_at = task.result
+    model = data["model"]
+    output = script.get_output()
+    output.print_md("## Report freshness: {}".format(os.path.basename(model_folder)))
+    output.print_md("*Loaded {:.0f} s ago*".format(time.time() - loaded_at))
+    if not model["syncs"]:
+        output.print_md("No export has been logged for this model yet.")
+    else:
+        output.print_md("- Last successful export: **{}**".format(model["last_success"] or "never"))
+        output.print_md("- Last sync: **{}** ({})".format(model["last_sync"], model["last_result"]))
+        output.print_md("- Last {} syncs: **{}** schedules regenerated, **{}** skipped "
+                        "(unchanged), **{}** failed jobs".format(
+                            model["syncs"], model["regenerated"], model["skipped"],
+                            model["errors"]))
+        change = duration_change(model["trend"])
+        if change:
+            output.print_md("- Average duration: **{:.1f} s** (before: {:.1f} s)".format(*change))
+        if model["slowest_stage"]:
+            output.print_md("- Slowest stage: **{}** ({:.2f} s per job on average)".format(
+                *model["slowest_stage"]))
+        output.print_table(
+            [[finished, "" if total is None else "{:.1f}".format(total),
+              regenerated, skipped, result]
+             for finished, total, regenerated, skipped, result in reversed(model["trend"][-10:])],
+            columns=["Finished", "Duration, s", "Regenerated", "Skipped", "Result"],
+            title="Recent syncs")
+
+    if data["project"]:
+        output.print_table(
+            [[name, status.get("finished", ""), status.get("result", ""),
+              status.get("regenerated", ""), status.get("total_s", "")]
+             for name, status in data["project"]],
+            columns=["Model", "Last export", "Result", "Regenerated", "Duration, s"],
+            title="Project: {}".format(os.path.basename(os.path.dirname(model_folder))))
+
+def format_size(size):
+    if size >= 1073741824:
+        return "{:.2f} GB".format(size / 1073741824.0)
+    if size >= 1048576:
+        return "{:.1f} MB".format(size / 1048576.0)
+    return "{:.0f} KB".format(size / 1024.0)
+
+def run_retention():
+    """Dry run over the whole share, then prune/compress after confirmation."""
+    output = script.get_output()
+    output.print_md("## Report share retention (dry run)")
+    started = time.time()
+    task = run_in_background("retention scan",
+                             lambda: scan_share([SERVER_ROOT_PATH, ROOMS_ROOT_PATH]),
+                             RETENTION_TIMEOUT_S)
+    if task is None:
+        output.print_md("The share is slow: the scan goes on in the background. "
+                        "Click Clean Up Report Share again to see the result.")
+        return
+    if task.error:
+        output.print_md("**Scan failed:** {}".format(task_error(task)))
+        return
+    scanned, errors = task.result
+    output.print_md("*Scanned in {:.1f} s*".format(time.time() - started))
+
+    folders = []
+    actions = []
+    for root, project, result in scanned:
+        for model, totals in result["models"].items():
+            folders.append((os.path.basename(root), project, model, totals))
+        actions.extend(result["actions"])
+    folders.sort(key=lambda f: -f[3]["bytes"])
+    total = sum(f[3]["bytes"] for f in folders)
+    rows = [[root, project, model, totals["files"], format_size(totals["bytes"]),
+             time.strftime("%Y-%m-%d", time.localtime(totals["last_modified"]))
+             if totals["last_modified"] else ""]
+            for root, project, model, totals in folders]
+    output.print_md("- Report folders: **{}**, total size: **{}**".format(len(rows), format_size(total)))
+    output.print_table(rows, columns=["Root", "Project", "Model", "Files", "Size", "Last change"],
+                       title="Report folders by size")
+
+    if errors:
+        output.print_md("**Could not read {} folder(s):**".format(len(errors)))
+        for path, error in errors[:20]:
+            output.print_md("- {}: {}".format(path, error))
+
+    if not actions:
+        output.print_md("Nothing to clean up.")
+        return
+    reclaim = sum(info.size for action, info, _ in actions if action == DELETE)
+    output.print_table(
+        [[action, info.path, format_size(info.size), reason] for action, info, reason in actions],
+        columns=["Action", "File", "Size", "Reason"],
+        title="Planned actions")
+    deletes = len([a for a in actions if a[0] == DELETE])
+    promotes = len([a for a in actions if a[0] == PROMOTE])
+    res = forms.alert(
+        "Delete {} file(s) ({}), promote {} newer _new cop(ies) and compress {} log(s)?".format(
+            deletes, format_size(reclaim), promotes, len(actions) - deletes - promotes),
+        title="Report Share Retention",
+        options=["Apply", "Cancel"]
+    )
+    if res != "Apply":
+        output.print_md("Dry run only - nothing was changed.")
+        return
+    task = run_in_background("retention apply", lambda: apply_actions(actions),
+                             RETENTION_TIMEOUT_S)
+    if task is None:
+        output.print_md("The share is slow: the clean-up goes on in the background.")
+        return
+    if task.error:
+        output.print_md("**Clean-up failed:** {}".format(task_error(task)))
+        return
+    done, freed, failed = task.result
+    output.print_md("## Applied: {} action(s), {} freed".format(done, format_size(freed)))
+    for path, error in failed:
+        output.print_md("- Failed: {}: {}".format(path, error))
+
 # =========================================================================
 # 3. BUTTON UI
 # =========================================================================
@@ -70,22 +282,41 @@ else:
 # Get current project folder (where reports are exported)
 project_folder = get_current_project_folder()
 
+# Server reachability (never blocks the UI longer than PROBE_TIMEOUT_S)
+probe = get_server_probe()
+server_state = probe.check(SERVER_ROOT_PATH, PROBE_TIMEOUT_S)
+
+# Reports generated while the server was unreachable (local spool)
+spool = ReportSpool()
+pending_reports = spool.pending()
+
+options = ["Open Report Folder", "Report Freshness", "Clean Up Report Share",
+           "Open Script Folder", "Cancel"]
+if pending_reports:
+    options.insert(2, "Publish Pending Reports")
+
 # Main Menu Alert
 res = forms.alert(
     "Auto-Export System: {} {}\n\n".format(status_msg, status_symbol) +
-    "Hook script location:\n{}".format(HOOK_FILE),
+    "Hook script location:\n{}\n\n".format(HOOK_FILE) +
+    "Server: {}\n".format(server_state.describe()) +
+    "Reports waiting for server: {}".format(len(pending_reports)),
     title="SHNABEL Control Panel",
-    options=["Open Report Folder", "Open Script Folder", "Cancel"],
+    options=options,
     footer="Ver 1.0"
 )
 
 # Handle actions
 if res == "Open Report Folder":
-    # First check that the server root exists at all
-    if not os.path.exists(SERVER_ROOT_PATH):
+    folder_state = None
+    if server_state.ok and project_folder:
+        folder_state = probe.check(project_folder, PROBE_TIMEOUT_S)
+
+    # First check that the server root is reachable at all
+    if not server_state.ok:
         forms.alert(
-            "Report root path is not available.\n"
-            "Please make sure the server folder is accessible.",
+            "Report root path is not available: server {}.\n"
+            "Please make sure the server folder is accessible.".format(server_state.describe()),
             title="Report Folder Error"
         )
 
@@ -98,9 +329,17 @@ if res == "Open Report Folder":
         )
 
     # If project folder exists – open it
-    elif os.path.exists(project_folder):
+    elif folder_state.state == REACHABLE:
         os.startfile(project_folder)
 
+    # Server stopped answering in the meantime
+    elif folder_state.state != MISSING:
+        forms.alert(
+            "Report folder could not be checked: server {}.\n"
+            "Please try again in a moment.".format(folder_state.describe()),
+            title="Report Folder Error"
+        )
+
     # Project folder does not exist yet
     else:
         forms.alert(
@@ -109,5 +348,53 @@ if res == "Open Report Folder":
             title="Report Folder Not Found"
         )
 
+elif res == "Report Freshness":
+    if not server_state.ok:
+        forms.alert(
+            "Report freshness is read from the server: server {}.".format(server_state.describe()),
+            title="Report Freshness"
+        )
+    elif not project_folder:
+        forms.alert(
+            "Report folder for this model could not be determined.",
+            title="Report Freshness"
+        )
+    else:
+        show_freshness(project_folder)
+
+elif res == "Clean Up Report Share":
+    if not server_state.ok:
+        forms.alert(
+            "Report share is not available: server {}.".format(server_state.describe()),
+            title="Report Share Retention"
+        )
+    else:
+        run_retention()
+
 elif res == "Open Script Folder":
     os.startfile(EXTENSION_DIR)
+
+elif res == "Publish Pending Reports":
+    if not server_state.ok:
+        forms.alert(
+            "Server {}.\nReports stay in the local spool and are published "
+            "by the next sync.".format(server_state.describe()),
+            title="Report Spool"
+        )
+    else:
+        task = run_in_background("spool flush", spool.flush, PUBLISH_TIMEOUT_S)
+        probe.forget(SERVER_ROOT_PATH)
+        if task is None:
+            forms.alert(
+                "The server is slow: publishing goes on in the background.\n"
+                "Open the panel again later to see how many reports are still waiting.",
+                title="Report Spool"
+            )
+        elif task.error:
+            forms.alert("Publishing failed:\n{}".format(task_error(task)), title="Report Spool")
+        else:
+            published, still_pending, last_error = task.result
+            msg = "Published: {}\nStill waiting: {}".format(published, still_pending)
+            if last_error:
+                msg += "\n\nLast error:\n{}".format(last_error)
+            forms.alert(msg, title="Report Spool")
@@ -2,8 +2,10 @@
 """
 ExportRooms_v9
 Exports room data to CSV and HTML with English headers, Ceiling detection
-(by checking ceilings' bounding boxes in the same document as the room),
-and Door Count per room (from FromRoom/ToRoom across all phases).
+(by checking ceilings' footprint outlines in the same document as the room),
+and Door Count per room (from FromRoom/ToRoom in the selected phase(s),
+by default the last phase of each document). With several phases in
+DOOR_PHASE_NAMES there is also a "Doors (<phase>)" column per phase.
 
 HTML report:
 - Click on column headers to sort (text / numeric).
@@ -11,17 +13,38 @@ HTML report:
 """
 
 __title__ = 'Room\nList'
-__doc__ = 'Exports room data to CSV and HTML with English headers, Ceiling detection (by checking ceilings bounding boxes in the same document as the room), and Door Count per room (from FromRoom/ToRoom across all phases)'
+__doc__ = 'Exports room data to CSV and HTML with English headers, Ceiling detection (by checking ceilings footprint outlines in the same document as the room), and Door Count per room (from FromRoom/ToRoom in the last phase)'
 __author__ = 'SHNABEL digital'
 
 import os
 import io
+import shutil
+import tempfile
+import time
 from pyrevit import revit, DB, forms
 
+from shn_rooms.ceilings import make_ceiling
+from shn_rooms.compute import compute_documents, sort_rows
+from shn_rooms.linkcache import LinkResultCache
+from shn_reports.serverindex import update_server_index
+from shn_reports.spool import ReportSpool
+from shn_reports.workerpool import BackgroundTask
+
 # --- Settings ---
 BASE_PATH = r"F:\REVIT_SHN\CHECK\Rooms"
-SQFT_TO_SQM = 0.09290304
-FT_TO_M = 0.3048
+# Common index of all report folders (shared with the sync hook)
+INDEX_ROOT = os.path.dirname(BASE_PATH)
+# Publishing runs off the UI thread; Room List waits this long for it and
+# otherwise leaves it running (the report is already in the local spool)
+PUBLISH_TIMEOUT_S = 20
+# Phases used for door -> room counts, by name. Empty = the last phase of
+# each document. Several phases are resolved in one sweep over the doors;
+# Door Count is their total and each gets its own "Doors (<phase>)" column.
+DOOR_PHASE_NAMES = []
+# Results of linked models are cached locally per link file and reused
+# while the link is unchanged. Bump the version when the room data changes.
+LINK_CACHE_ENABLED = True
+LINK_CACHE_VERSION = 2
 
 doc = revit.doc
 
@@ -43,12 +66,39 @@ def get_project_info():
     return project_name, model_name
 
 
-# ---------- CEILINGS COLLECTION ----------
+# ---------- EXTRACTION (Revit API -> plain records) ----------
+# Only these functions touch the Revit API. They return plain numbers and
+# strings (see shn_rooms.compute); ceiling matching, door counts, unit
+# conversion and sorting happen in the compute stage.
 
-def collect_ceilings_bboxes(document):
+def get_ceiling_loops(ceil):
+    """
+    Footprint of a ceiling: XY points of every edge loop of its bottom
+    face(s), holes included. Returns [] if the geometry can't be read.
     """
-    Collects all ceilings in the given document and returns list of their
-    bounding boxes (in document INTERNAL coordinates).
+    loops = []
+    try:
+        for ref in DB.HostObjectUtils.GetBottomFaces(ceil):
+            face = ceil.GetGeometryObjectFromReference(ref)
+            if face is None:
+                continue
+            for curve_loop in face.GetEdgesAsCurveLoops():
+                points = []
+                for curve in curve_loop:
+                    # arcs are tessellated; last point = start of next curve
+                    pts = list(curve.Tessellate())
+                    points.extend((p.X, p.Y) for p in pts[:-1])
+                loops.append(points)
+    except Exception:
+        return []
+    return loops
+
+
+def extract_ceilings(document):
+    """
+    All ceilings of the document as shn_rooms.ceilings tuples: footprint
+    outline + bottom elevation (document INTERNAL coordinates). A ceiling
+    whose outline can't be read falls back to its bounding box.
     """
     result = []
     try:
@@ -57,8 +107,13 @@ def collect_ceilings_bboxes(document):
                .WhereElementIsNotElementType())
         for ceil in col:
             bb = ceil.get_BoundingBox(None)
-            if bb:
-                result.append(bb)
+            if not bb:
+                continue
+            cmin, cmax = bb.Min, bb.Max
+            ceiling = make_ceiling(get_ceiling_loops(ceil), cmin.Z)
+            if ceiling is None:
+                ceiling = (cmin.X, cmin.Y, cmax.X, cmax.Y, cmin.Z, None)
+            result.append(ceiling)
     except Exception as e:
         print("Error collecting ceilings in doc {}: {}".format(document.Title, e))
     return result
@@ -66,98 +121,79 @@ def collect_ceilings_bboxes(document):
 
 def get_room_center_and_floor(room):
     """
-    Returns (center_point, floor_elevation_ft) for the room.
+    Returns (interior_point, floor_elevation_ft) for the room.
     Both values are in INTERNAL Revit coordinates (feet).
 
+    Точка - Location.Point помещения: она всегда внутри помещения
+    (центр bounding box у L-образного помещения может быть снаружи).
     Floor elevation берём из Min.Z bounding box'а, чтобы быть
     в той же системе координат, что и потолки.
     """
+    location = room.Location
+    pt = location.Point if location and hasattr(location, "Point") else None
+
     bb = room.get_BoundingBox(None)
     if not bb:
-        # fallback: use Location point
-        if room.Location and hasattr(room.Location, "Point"):
-            pt = room.Location.Point
-            floor_z = pt.Z
-            return pt, floor_z
+        # fallback: floor at Location point
+        if pt is not None:
+            return pt, pt.Z
         return None, None
 
     minpt = bb.Min
     maxpt = bb.Max
 
-    center = DB.XYZ(
-        (minpt.X + maxpt.X) / 2.0,
-        (minpt.Y + maxpt.Y) / 2.0,
-        (minpt.Z + maxpt.Z) / 2.0
-    )
+    if pt is None:
+        pt = DB.XYZ(
+            (minpt.X + maxpt.X) / 2.0,
+            (minpt.Y + maxpt.Y) / 2.0,
+            (minpt.Z + maxpt.Z) / 2.0
+        )
 
     # пол помещения берём по нижней отметке bounding box
     floor_z = minpt.Z
 
-    return center, floor_z
-
-
-def find_ceiling_above_room(room, ceilings_bboxes):
-    """
-    Для заданной комнаты и списка bbox потолков (в том же документе)
-    находит ближайший потолок над центром комнаты по Z.
-
-    Возвращает: (HasCeilingStr, Height_m_or_dash)
-    Height = расстояние от пола комнаты (bb.Min.Z) до низа потолка.
-    """
-    center, floor_z = get_room_center_and_floor(room)
-    if center is None:
-        return "No", "-"
-
-    tol_xy = 0.1  # small tolerance in ft
-    closest_ceil_z = None
-
-    for bb in ceilings_bboxes:
-        cmin = bb.Min
-        cmax = bb.Max
-
-        # check XY: center inside ceiling footprint (with small tolerance)
-        if not (cmin.X - tol_xy <= center.X <= cmax.X + tol_xy and
-                cmin.Y - tol_xy <= center.Y <= cmax.Y + tol_xy):
-            continue
-
-        # ceiling bottom elevation (internal coords, feet)
-        ceil_z = cmin.Z
-
-        # must be above floor
-        if ceil_z <= floor_z + 0.1:
-            continue
-
-        if closest_ceil_z is None or ceil_z < closest_ceil_z:
-            closest_ceil_z = ceil_z
+    return pt, floor_z
 
-    if closest_ceil_z is None:
-        return "No", "-"
 
-    height_m = round((closest_ceil_z - floor_z) * FT_TO_M, 2)
-    return "Yes", height_m
+# resolved Phase objects per document (links placed several times reuse them)
+_door_phases_cache = {}
 
 
-# ---------- DOORS -> ROOM COUNTS ----------
-
-def build_door_room_counts(document):
+def resolve_door_phases(document):
     """
-    Строит словарь {roomId (int) : number_of_doors} для данного документа.
-
-    Использует FromRoom/ToRoom по всем фазам документа:
-    идём от "последней" фазы к первой и берём первую фазу, где
-    FromRoom или ToRoom не None. Дверь считается для обеих комнат.
+    Phases of 'document' named in DOOR_PHASE_NAMES (missing names are
+    skipped), or [last phase] when the setting is empty.
     """
-    counts = {}
+    key = document.PathName or document.Title
+    if key in _door_phases_cache:
+        return _door_phases_cache[key]
 
-    # список фаз документа
     try:
         phases = [ph for ph in document.Phases]
     except Exception as e:
         print("Error getting phases for doc {}: {}".format(document.Title, e))
-        return counts
+        phases = []
+
+    if DOOR_PHASE_NAMES:
+        by_name = dict((ph.Name, ph) for ph in phases)
+        selected = [by_name[name] for name in DOOR_PHASE_NAMES if name in by_name]
+    else:
+        selected = phases[-1:]
+
+    _door_phases_cache[key] = selected
+    return selected
 
+
+def extract_door_links(document):
+    """
+    [(phase name, FromRoom id or None, ToRoom id or None)] for every door
+    in the selected phase(s) (resolve_door_phases), one pass over doors.
+    """
+    links = []
+
+    phases = resolve_door_phases(document)
     if not phases:
-        return counts
+        return links
 
     try:
         doors = (DB.FilteredElementCollector(document)
@@ -165,51 +201,30 @@ def build_door_room_counts(document):
                  .WhereElementIsNotElementType())
     except Exception as e:
         print("Error collecting doors in doc {}: {}".format(document.Title, e))
-        return counts
+        return links
 
-    for door in doors:
-        try:
-            rooms_for_door = []
-            fr = None
-            tr = None
-
-            # перебираем фазы с конца (новые → старые)
-            for ph in reversed(phases):
-                try:
-                    fr = door.FromRoom[ph]
-                except:
-                    fr = None
-                try:
-                    tr = door.ToRoom[ph]
-                except:
-                    tr = None
+    phase_names = [(ph, ph.Name) for ph in phases]
 
+    for door in doors:
+        for ph, phase_name in phase_names:
+            # a failing phase (e.g. door not in it) must not drop the door's other phases
+            try:
+                fr = door.get_FromRoom(ph)
+                tr = door.get_ToRoom(ph)
                 if fr or tr:
-                    # нашли фазу, где дверь привязана к комнатам
-                    break
-
-            if fr:
-                rooms_for_door.append(fr)
-            if tr and tr != fr:
-                rooms_for_door.append(tr)
-
-            for rm in rooms_for_door:
-                rid = rm.Id.IntegerValue
-                counts[rid] = counts.get(rid, 0) + 1
+                    links.append((phase_name,
+                                  fr.Id.IntegerValue if fr else None,
+                                  tr.Id.IntegerValue if tr else None))
 
-        except Exception as e_door:
-            print("Error processing door {} in {}: {}".format(door.Id, document.Title, e_door))
+            except Exception as e_door:
+                print("Error processing door {} ({}) in {}: {}".format(
+                    door.Id, phase_name, document.Title, e_door))
 
-    return counts
+    return links
 
 
-# ---------- ROOMS COLLECTION ----------
-
-def get_rooms_from_document(document, ceilings_bboxes, door_counts, source_label):
-    """
-    Collects rooms from 'document' and calculates data,
-    using 'ceilings_bboxes' and 'door_counts' (по room.Id) из того же документа.
-    """
+def extract_rooms(document, source_label):
+    """Placed rooms of 'document' as plain records (internal units, feet)."""
     results = []
     try:
         collector = (
@@ -223,35 +238,18 @@ def get_rooms_from_document(document, ceilings_bboxes, door_counts, source_label
                 if room.Area <= 0 or not room.Location:
                     continue
 
-                # Basic Info
-                r_num = room.Number
                 p_name = room.get_Parameter(DB.BuiltInParameter.ROOM_NAME)
-                r_name = p_name.AsString() if p_name else "No Name"
-                r_level = room.Level.Name if room.Level else "Unknown Level"
-
-                # Area (sqft -> sqm)
-                area_sqm = round(room.Area * SQFT_TO_SQM, 2)
-
-                # Room height (UnboundedHeight, ft -> m)
-                r_height_ft = room.UnboundedHeight
-                r_height_m = round(r_height_ft * FT_TO_M, 2)
-
-                # Ceiling detection within this document
-                has_ceil, ceil_h = find_ceiling_above_room(room, ceilings_bboxes)
-
-                # Door count for this room
-                door_count = door_counts.get(room.Id.IntegerValue, 0)
+                point, floor_z = get_room_center_and_floor(room)
 
                 results.append({
-                    "Number": r_num,
-                    "Name": r_name,
-                    "Level": r_level,
-                    "Area": area_sqm,
-                    "RoomHeight": r_height_m,
-                    "DoorCount": door_count,
-                    "HasCeiling": has_ceil,
-                    "CeilingHeight": ceil_h,
-                    "Source": source_label
+                    "id": room.Id.IntegerValue,
+                    "number": room.Number,
+                    "name": p_name.AsString() if p_name else "No Name",
+                    "level": room.Level.Name if room.Level else "Unknown Level",
+                    "area_sqft": room.Area,
+                    "height_ft": room.UnboundedHeight,
+                    "point": (point.X, point.Y) if point is not None else None,
+                    "floor_z": floor_z,
                 })
             except Exception as e_room:
                 print("Error processing room {} in {}: {}".format(room.Id, source_label, e_room))
@@ -262,16 +260,52 @@ def get_rooms_from_document(document, ceilings_bboxes, door_counts, source_label
     return results
 
 
-def get_all_rooms_data():
-    """Aggregates rooms from host and links."""
-    all_rooms = []
+def extract_document(document, source_label):
+    """Everything the compute stage needs from one document."""
+    return {
+        "source": source_label,
+        "rooms": extract_rooms(document, source_label),
+        "ceilings": extract_ceilings(document),
+        "door_links": extract_door_links(document),
+    }
+
+
+# ---------- ROOMS (host + links) ----------
+
+def get_link_stamp(link_doc):
+    """
+    Saved version of a linked model: version GUID + number of saves
+    (Revit 2021+), else modification time and size of the link file.
+    None - the link can't be identified, it is not cached.
+    """
+    try:
+        version = DB.Document.GetDocumentVersion(link_doc)
+        if version is not None:
+            return "{}:{}".format(version.VersionGUID, version.NumberOfSaves)
+    except Exception:
+        pass
+    try:
+        st = os.stat(link_doc.PathName)
+        return "{}:{}".format(int(st.st_mtime), st.st_size)
+    except Exception:
+        return None
+
+
+def link_cache_settings():
+    """Settings the cached link results depend on (a change = cache miss)."""
+    return {"version": LINK_CACHE_VERSION, "door_phases": list(DOOR_PHASE_NAMES)}
 
-    # 1. Host document
-    host_ceilings = collect_ceilings_bboxes(doc)
-    host_door_counts = build_door_room_counts(doc)
-    all_rooms.extend(get_rooms_from_document(doc, host_ceilings, host_door_counts, "Host model"))
 
-    # 2. Linked documents (rooms + ceilings + doors внутри линка)
+def get_all_rooms_data(cache=None):
+    """
+    Aggregates rooms from host and links: extraction in the API thread,
+    then the compute stage for all documents in a worker pool.
+    Unchanged links come from 'cache' and are not extracted at all.
+    """
+    all_rooms = []
+    records = [extract_document(doc, "Host model")]
+    cache_keys = {}  # index in records -> (link path, stamp)
+
     links_collector = (
         DB.FilteredElementCollector(doc)
         .OfClass(DB.RevitLinkInstance)
@@ -284,35 +318,56 @@ def get_all_rooms_data():
             continue
 
         source_label = "Link: {}".format(link_doc.Title)
-        link_ceilings = collect_ceilings_bboxes(link_doc)
-        link_door_counts = build_door_room_counts(link_doc)
-        rooms_in_link = get_rooms_from_document(
-            link_doc,
-            link_ceilings,
-            link_door_counts,
-            source_label
-        )
-        all_rooms.extend(rooms_in_link)
+        if cache:
+            link_path = link_doc.PathName
+            stamp = get_link_stamp(link_doc)
+            rooms = cache.get(link_path, stamp, link_cache_settings())
+            if rooms is not None:
+                all_rooms.extend(rooms)
+                continue
+            cache_keys[len(records)] = (link_path, stamp)
+        records.append(extract_document(link_doc, source_label))
+
+    for index, (rows, error) in enumerate(compute_documents(records)):
+        if error:
+            print("Error computing rooms in {}: {}".format(
+                records[index]["source"], error.strip().splitlines()[-1]))
+            continue
+        all_rooms.extend(rows)
+        if index in cache_keys:
+            link_path, stamp = cache_keys[index]
+            cache.put(link_path, stamp, link_cache_settings(), rows)
 
     # Sort by room number and then by source
-    all_rooms.sort(key=lambda x: (x["Number"], x["Source"]))
-    return all_rooms
+    return sort_rows(all_rooms)
 
 
 # ---------- SAVE FUNCTIONS ----------
 
-def save_csv(data, folder, filename):
+def door_phase_columns():
+    """Phases that get their own door column (only when several are selected)."""
+    return list(DOOR_PHASE_NAMES) if len(DOOR_PHASE_NAMES) > 1 else []
+
+
+def phase_door_counts(row, phases):
+    by_phase = row.get("DoorsByPhase") or {}
+    return [by_phase.get(phase, 0) for phase in phases]
+
+
+def save_csv(data, folder, filename, phases=()):
     filepath = os.path.join(folder, filename + ".csv")
 
     with io.open(filepath, mode='w', encoding='utf-8-sig') as f:
         header = (
             u"Number;Name;Level;Area (m2);Room Height (m);Door Count;"
-            u"Has Ceiling;Ceiling Height (m);Source\n"
+            u"Has Ceiling;Ceiling Height (m);Source"
         )
-        f.write(header)
+        for phase in phases:
+            header += u";Doors ({})".format(phase.replace(";", ","))
+        f.write(header + u"\n")
 
         for row in data:
-            line = u"{};{};{};{};{};{};{};{};{}\n".format(
+            line = u"{};{};{};{};{};{};{};{};{}".format(
                 row["Number"],
                 row["Name"],
                 row["Level"],
@@ -323,12 +378,14 @@ def save_csv(data, folder, filename):
                 str(row["CeilingHeight"]).replace('.', ','),
                 row["Source"].replace(";", ",")
             )
-            f.write(line)
+            for count in phase_door_counts(row, phases):
+                line += u";{}".format(count)
+            f.write(line + u"\n")
 
     return filepath
 
 
-def save_html(data, folder, filename):
+def save_html(data, folder, filename, phases=()):
     filepath = os.path.join(folder, filename + ".html")
 
     html_content = u"""
@@ -376,7 +433,10 @@ def save_html(data, folder, filename):
                 <th>Has Ceiling</th>
                 <th>Ceiling Height (m)</th>
                 <th>Source</th>
-            </tr>
+"""
+    for phase in phases:
+        html_content += u"                <th>Doors ({})</th>\n".format(phase)
+    html_content += u"""            </tr>
         </thead>
         <tbody>
 """
@@ -392,13 +452,18 @@ def save_html(data, folder, filename):
         html_content += u"<td>{}</td>".format(row["HasCeiling"])
         html_content += u"<td>{}</td>".format(row["CeilingHeight"])
         html_content += u"<td>{}</td>".format(row["Source"])
+        for count in phase_door_counts(row, phases):
+            html_content += u"<td>{}</td>".format(count)
         html_content += u"</tr>"
 
-    # закрываем tbody и table, добавляем JS
+    # закрываем tbody и table, добавляем JS (колонки фаз - после Source, числовые)
     html_content += u"""
         </tbody>
     </table>
 
+    <script>var phaseCols = [{}];</script>
+""".format(u", ".join(str(9 + i) for i in range(len(phases))))
+    html_content += u"""
     <script>
     document.addEventListener('DOMContentLoaded', function() {
         var table = document.getElementById('roomTable');
@@ -443,8 +508,8 @@ def save_html(data, folder, filename):
         for (var i = 0; i < headers.length; i++) {
             (function(index) {
                 headers[index].addEventListener('click', function() {
-                    // numeric columns: Area, Room Height, Door Count, Ceiling Height
-                    var numericCols = [3, 4, 5, 7];
+                    // numeric columns: Area, Room Height, Door Count, Ceiling Height, phases
+                    var numericCols = [3, 4, 5, 7].concat(phaseCols);
                     var isNumeric = numericCols.indexOf(index) !== -1;
                     sortByColumn(index, isNumeric);
                 });
@@ -548,24 +613,105 @@ def save_html(data, folder, filename):
     return filepath
 
 
+# ---------- PUBLISH ----------
+
+def publish_via_spool(local_files, output_dir, on_published=None):
+    """
+    Stages the generated files in the local report spool and publishes
+    the whole spool to the server (temp name + rename per file) on a
+    worker thread; on_published() runs there too once this entry is out.
+    Returns (spool entry path, published): published is True, False (server
+    not reachable) or None (still publishing after PUBLISH_TIMEOUT_S).
+    """
+    share_root = os.path.splitdrive(BASE_PATH)[0] + os.sep
+    spool = ReportSpool()
+    entry = spool.stage(
+        output_dir,
+        dict((os.path.basename(p), p) for p in local_files),
+        share_root=share_root
+    )
+
+    def publish():
+        spool.flush()
+        if os.path.exists(entry):
+            return False
+        if on_published is not None:
+            on_published()
+        return True
+
+    task = BackgroundTask(publish, "SHN Room List publish")
+    if not task.wait(PUBLISH_TIMEOUT_S):
+        return entry, None
+    if task.error:
+        print("Error publishing Room List: {}".format(task.error.strip().splitlines()[-1]))
+    return entry, task.result is True
+
+
+def update_rooms_index(output_dir, project_name, model_name, file_names, room_count):
+    """Updates this model's Room List entry in the server-wide report index."""
+    try:
+        published = [os.path.join(output_dir, name) for name in file_names]
+        update_server_index(INDEX_ROOT, "rooms", project_name, model_name, output_dir, {
+            "last_export": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "result": "ok",
+            "rows": room_count,
+            "bytes": sum(os.path.getsize(p) for p in published if os.path.isfile(p)),
+            "links": [(os.path.splitext(name)[1][1:].upper(), name) for name in file_names],
+        })
+    except Exception:
+        pass
+
+
 # ---------- MAIN ----------
 
 try:
     project_name, model_name = get_project_info()
     output_dir = os.path.join(BASE_PATH, project_name, model_name)
 
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-
-    data = get_all_rooms_data()
+    link_cache = LinkResultCache() if LINK_CACHE_ENABLED else None
+    data = get_all_rooms_data(link_cache)
+    cache_note = ""
+    if link_cache and (link_cache.hits or link_cache.misses):
+        cache_note = "\nLinks: {} from cache, {} re-read".format(link_cache.hits,
+                                                                 link_cache.misses)
 
     if data:
-        save_csv(data, output_dir, "Room_Schedule")
-        save_html(data, output_dir, "Room_Schedule")
-
-        msg = "Done!\nFolder: {}\nRooms found: {}".format(output_dir, len(data))
-        forms.alert(msg, title="Success")
-        os.startfile(output_dir)
+        # generate locally, then publish to the server in one go
+        local_dir = tempfile.mkdtemp(prefix="SHN_Rooms_")
+        try:
+            phases = door_phase_columns()
+            local_files = [
+                save_csv(data, local_dir, "Room_Schedule", phases),
+                save_html(data, local_dir, "Room_Schedule", phases),
+            ]
+            file_names = [os.path.basename(p) for p in local_files]
+            room_count = len(data)
+            entry, published = publish_via_spool(
+                local_files, output_dir,
+                lambda: update_rooms_index(output_dir, project_name, model_name,
+                                           file_names, room_count))
+        finally:
+            shutil.rmtree(local_dir, ignore_errors=True)
+
+        if published is None:
+            msg = ("Server is not responding:\n{}\n\n"
+                   "Report saved locally, will publish later:\n{}\n"
+                   "Publishing goes on in the background and is retried on the next\n"
+                   "Room List run or model sync.\n"
+                   "Rooms found: {}{}").format(output_dir, entry, len(data), cache_note)
+            forms.alert(msg, title="Saved Locally")
+        elif not published:
+            msg = ("Server folder is not reachable:\n{}\n\n"
+                   "Report saved locally:\n{}\n"
+                   "It will be published on the next Room List run or model sync.\n"
+                   "Rooms found: {}{}").format(output_dir, entry, len(data), cache_note)
+            forms.alert(msg, title="Saved Locally")
+            if os.path.isdir(entry):
+                os.startfile(entry)
+        else:
+            msg = "Done!\nFolder: {}\nRooms found: {}{}".format(output_dir, len(data), cache_note)
+            forms.alert(msg, title="Success")
+            os.startfile(output_dir)
     else:
         forms.alert("No placed rooms found.", title="Warning")
 
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+Synthetic SHN_CommonBOQ schedules and Room List floor plans for the
+benchmarks.
+
+Adds the extension lib folder to sys.path so the benchmarks can be run
+from a plain checkout:  python benchmarks/bench_boq_reports.py
+"""
+
+import io
+import math
+import os
+import random
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+LIB_DIR = os.path.join(os.path.dirname(BENCH_DIR), 'lib')
+if LIB_DIR not in sys.path:
+    sys.path.insert(0, LIB_DIR)
+
+HEADER = [u"Family", u"Category", u"Type", u"Level", u"Count", u"Length", u"Description"]
+FAMILIES = [u"SHN_Panel_ELE_Electrical_{}".format(i) for i in range(40)]
+CATEGORIES = [u"Electrical Equipment", u"Lighting Fixtures", u"Cable Trays",
+              u"Conduits", u"Electrical Fixtures", u"Communication Devices"]
+LEVELS = [u"Level {}".format(i) for i in range(-2, 12)]
+LEVEL_HEIGHT = 13.0  # ft, этажи синтетических планов помещений
+
+
+def make_rows(row_count, seed=1, multiline=False):
+    """Генерирует заголовок + row_count строк спецификации."""
+    rnd = random.Random(seed)
+    rows = [list(HEADER)]
+    for i in range(row_count):
+        desc = u'Item {} "{}", 230V'.format(i, rnd.choice(u"ABCDEF"))
+        if multiline and i % 7 == 0:
+            desc += u"\nsecond line"
+        rows.append([
+            rnd.choice(FAMILIES),
+            rnd.choice(CATEGORIES),
+            u"Type {}".format(rnd.randint(1, 25)),
+            rnd.choice(LEVELS),
+            u"{}".format(rnd.randint(1, 50)),
+            u"{:.2f}".format(rnd.random() * 100),
+            desc,
+        ])
+    return rows
+
+
+def quote_cell(cell):
+    return u'"' + cell.replace(u'"', u'""') + u'"'
+
+
+def write_csv(path, row_count, seed=1, multiline=False, encoding='utf-16'):
+    """Пишет CSV так же, как Revit (все ячейки в кавычках, UTF-16 с BOM)."""
+    with io.open(path, 'w', encoding=encoding, newline=u'') as f:
+        for row in make_rows(row_count, seed, multiline):
+            f.write(u",".join(quote_cell(c) for c in row) + u"\r\n")
+    return path
+
+
+# ---------- ROOM LIST ----------
+
+def ceiling_outline(rnd, x, y, w, h):
+    """Прямоугольник, L-образный контур или повёрнутый прямоугольник."""
+    kind = rnd.randrange(3)
+    if kind == 0:
+        return [(x, y), (x + w, y), (x + w, y + h), (x, y + h)]
+    if kind == 1:
+        cx, cy = x + w * rnd.uniform(0.3, 0.7), y + h * rnd.uniform(0.3, 0.7)
+        return [(x, y), (x + w, y), (x + w, cy), (cx, cy), (cx, y + h), (x, y + h)]
+    a = rnd.uniform(0.2, 1.2)
+    ox, oy = x + w / 2.0, y + h / 2.0
+    return [(ox + (px - ox) * math.cos(a) - (py - oy) * math.sin(a),
+             oy + (px - ox) * math.sin(a) + (py - oy) * math.cos(a))
+            for px, py in [(x, y), (x + w, y), (x + w, y + h), (x, y + h)]]
+
+
+def make_floor_plan(room_count, ceiling_count, seed=1):
+    """
+    Комнаты (x, y, floor_z) и потолки (кортежи make_ceiling) на
+    нескольких этажах: сетка комнат ~20x15 ft, потолки частично
+    перекрывают комнаты, часть комнат без потолка.
+    """
+    from shn_rooms.ceilings import make_ceiling  # lib добавлен в sys.path выше
+
+    rnd = random.Random(seed)
+    levels = max(1, room_count // 400)
+    per_level = max(1, room_count // levels)
+    cols = int(per_level ** 0.5) + 1
+    rooms = []
+    for i in range(room_count):
+        level, k = divmod(i, per_level)
+        x = (k % cols) * 20.0 + rnd.uniform(4.0, 16.0)
+        y = (k // cols) * 15.0 + rnd.uniform(3.0, 12.0)
+        rooms.append((x, y, level * LEVEL_HEIGHT))
+
+    span_x = cols * 20.0
+    span_y = (per_level // cols + 1) * 15.0
+    ceilings = []
+    for _ in range(ceiling_count):
+        level = rnd.randrange(levels)
+        w, h = rnd.uniform(6.0, 30.0), rnd.uniform(6.0, 25.0)
+        x, y = rnd.uniform(0, span_x - w), rnd.uniform(0, span_y - h)
+        z = level * LEVEL_HEIGHT + rnd.uniform(8.0, 11.0)
+        ceilings.append(make_ceiling([ceiling_outline(rnd, x, y, w, h)], z))
+    return rooms, ceilings
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+Sync-hook report stage: one pass CSV -> HTML + XLSX + grouped totals
+for 1k / 10k / 100k rows.
+
+    python benchmarks/bench_boq_reports.py [--mem] [row_count ...]
+
+--mem also reports peak traced memory (slower, CPython 3 only).
+"""
+from __future__ import print_function
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import _synthetic
+from shn_reports.csvreader import iter_csv_rows
+from shn_reports.htmlreport import BoqHtmlWriter
+from shn_reports.pipeline import feed_rows
+from shn_reports.summary import GroupSummaryWriter
+from shn_reports.xlsx import XlsxWriter
+
+try:
+    import tracemalloc
+except ImportError:  # Python 2.7
+    tracemalloc = None
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+
+
+def run(row_count, work_dir, trace):
+    csv_path = os.path.join(work_dir, "boq_{}.csv".format(row_count))
+    html_path = os.path.join(work_dir, "boq_{}.html".format(row_count))
+    xlsx_path = os.path.join(work_dir, "boq_{}.xlsx".format(row_count))
+    summary_path = os.path.join(work_dir, "boq_{}_summary.html".format(row_count))
+    _synthetic.write_csv(csv_path, row_count, multiline=True)
+
+    if trace:
+        tracemalloc.start()
+    t0 = time.time()
+    sinks = [BoqHtmlWriter.to_file(html_path, u"SHN_CommonBOQ", u"Benchmark"),
+             XlsxWriter(xlsx_path, u"SHN_CommonBOQ"),
+             GroupSummaryWriter(summary_path, summary_path[:-5] + ".csv",
+                                [u"Family", u"Category"], u"SHN_CommonBOQ", u"Benchmark")]
+    written, errors = feed_rows(iter_csv_rows(csv_path), sinks)
+    elapsed = time.time() - t0
+    peak = None
+    if trace:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    if errors:
+        print("  errors: {}".format(list(errors.values())))
+
+    print("{:>8} rows  {:7.3f} s  {:>9.0f} rows/s  html {:6.1f} MB  xlsx {:5.1f} MB  "
+          "summary {:5.1f} KB  peak mem {}".format(
+        written, elapsed, written / max(elapsed, 1e-9),
+        os.path.getsize(html_path) / 1048576.0,
+        os.path.getsize(xlsx_path) / 1048576.0,
+        os.path.getsize(summary_path) / 1024.0,
+        "{:.1f} MB".format(peak / 1048576.0) if peak is not None else "n/a"))
+
+
+def main():
+    args = sys.argv[1:]
+    trace = tracemalloc is not None and "--mem" in args
+    sizes = [int(a) for a in args if a != "--mem"] or DEFAULT_SIZES
+    work_dir = tempfile.mkdtemp(prefix="shn_bench_")
+    try:
+        for n in sizes:
+            run(n, work_dir, trace)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
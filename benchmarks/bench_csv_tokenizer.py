@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+CSV tokenizer throughput (rows/s) on a synthetic 100k-row schedule:
+legacy splitlines() + per-character parse_csv_line vs the record
+tokenizer in shn_reports.csvreader.
+
+    python benchmarks/bench_csv_tokenizer.py [row_count]
+"""
+from __future__ import print_function
+
+import io
+import sys
+import time
+
+import _synthetic
+from shn_reports.csvreader import parse_csv_line, parse_csv_text
+
+
+def render_csv(row_count, multiline):
+    buf = io.StringIO()
+    for row in _synthetic.make_rows(row_count, multiline=multiline):
+        buf.write(u",".join(_synthetic.quote_cell(c) for c in row) + u"\r\n")
+    return buf.getvalue()
+
+
+def legacy_parse(text):
+    rows = []
+    for line in text.splitlines():
+        if line.strip() == "":
+            continue
+        rows.append(parse_csv_line(line))
+    return rows
+
+
+def measure(label, func, text, expected_rows):
+    t0 = time.time()
+    rows = func(text)
+    elapsed = time.time() - t0
+    status = "ok" if len(rows) == expected_rows + 1 else "BROKEN ({} rows)".format(len(rows) - 1)
+    print("  {:<10} {:7.3f} s  {:>10.0f} rows/s  {}".format(
+        label, elapsed, expected_rows / max(elapsed, 1e-9), status))
+
+
+def main():
+    row_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    for multiline in (False, True):
+        text = render_csv(row_count, multiline)
+        print("{} rows, {:.1f} MB, multi-line Description: {}".format(
+            row_count, len(text) / 1048576.0, "yes" if multiline else "no"))
+        measure("legacy", legacy_parse, text, row_count)
+        measure("tokenizer", parse_csv_text, text, row_count)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+Room List ceiling lookup on synthetic floor plans (default: 4k rooms /
+6k ceilings, hospital size; a third of the ceilings L-shaped, a third
+rotated):
+
+    bbox scan     every ceiling bounding box per room (the old lookup)
+    outline scan  every ceiling per room, point-in-polygon on outlines
+    outline grid  CeilingGrid over the outlines (what Room List uses)
+
+    python benchmarks/bench_room_ceilings.py [rooms:ceilings ...]
+
+The grid must return the same ceiling as the outline scan for every
+room; "bbox false hits" counts rooms the bounding boxes alone would mark
+with a ceiling that is not there.
+"""
+from __future__ import print_function
+
+import sys
+import time
+
+from _synthetic import make_floor_plan
+from shn_rooms.ceilings import CeilingGrid, lowest_ceiling_scan
+
+DEFAULT_SETS = ((400, 600), (4000, 6000))
+
+
+def run(room_count, ceiling_count):
+    rooms, ceilings = make_floor_plan(room_count, ceiling_count)
+    boxes = [c[:5] + (None,) for c in ceilings]
+
+    t0 = time.time()
+    bbox_found = [lowest_ceiling_scan(boxes, x, y, z) for x, y, z in rooms]
+    bbox_s = time.time() - t0
+
+    t0 = time.time()
+    expected = [lowest_ceiling_scan(ceilings, x, y, z) for x, y, z in rooms]
+    scan_s = time.time() - t0
+
+    t0 = time.time()
+    grid = CeilingGrid(ceilings)
+    build_s = time.time() - t0
+    t0 = time.time()
+    found = [grid.lowest_above(x, y, z) for x, y, z in rooms]
+    query_s = time.time() - t0
+
+    assert found == expected, "grid and scan results differ"
+    with_ceiling = len([z for z in found if z is not None])
+    false_hits = len([1 for b, z in zip(bbox_found, found) if b is not None and z is None])
+    print("{:>6} rooms {:>6} ceilings  bbox scan {:7.3f} s  outline scan {:7.3f} s  "
+          "outline grid {:6.3f} s (build {:.3f} s, cell {:.1f} ft)  "
+          "rooms with ceiling {}  bbox false hits {}".format(
+              room_count, ceiling_count, bbox_s, scan_s, build_s + query_s, build_s,
+              grid.cell_size, with_ceiling, false_hits))
+
+
+def main():
+    sets = [tuple(int(v) for v in a.split(":")) for a in sys.argv[1:]] or DEFAULT_SETS
+    for room_count, ceiling_count in sets:
+        run(room_count, ceiling_count)
+
+
+if __name__ == "__main__":
+    main()
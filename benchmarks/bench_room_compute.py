@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Room List compute stage (shn_rooms.compute) on synthetic extraction
+records: a host model plus links, each with rooms, ceiling outlines and
+door links. Runs the documents one by one and in the worker pool; both
+must give the same rows.
+
+    python benchmarks/bench_room_compute.py [documents:rooms_per_document ...]
+"""
+from __future__ import print_function
+
+import random
+import sys
+import time
+
+from _synthetic import make_floor_plan
+from shn_rooms.compute import COMPUTE_WORKERS, compute_documents, sort_rows
+
+DEFAULT_SETS = ((1, 4000), (6, 1500))
+PHASE = u"New Construction"
+
+
+def make_record(index, room_count, seed):
+    """Запись документа в формате extract_document() кнопки Room List."""
+    rnd = random.Random(seed)
+    points, ceilings = make_floor_plan(room_count, room_count * 3 // 2, seed=seed)
+    rooms = []
+    for i, (x, y, floor_z) in enumerate(points):
+        rooms.append({
+            "id": 1000 + i,
+            "number": u"{:02d}.{:04d}".format(index, i),
+            "name": u"Room {}".format(i % 50),
+            "level": u"Level {}".format(int(floor_z // 13)),
+            "area_sqft": rnd.uniform(80.0, 600.0),
+            "height_ft": rnd.uniform(9.0, 14.0),
+            "point": (x, y),
+            "floor_z": floor_z,
+        })
+    door_links = []
+    for _ in range(room_count * 2):
+        from_id = 1000 + rnd.randrange(room_count)
+        to_id = 1000 + rnd.randrange(room_count) if rnd.random() < 0.7 else None
+        door_links.append((PHASE, from_id, to_id))
+    return {
+        "source": u"Host model" if index == 0 else u"Link: Synthetic {}".format(index),
+        "rooms": rooms,
+        "ceilings": ceilings,
+        "door_links": door_links,
+    }
+
+
+def run(document_count, rooms_per_document):
+    records = [make_record(i, rooms_per_document, seed=i + 1) for i in range(document_count)]
+
+    timings = {}
+    outputs = {}
+    for workers in (1, COMPUTE_WORKERS):
+        t0 = time.time()
+        rows = []
+        for result, error in compute_documents(records, workers):
+            assert error is None, error
+            rows.extend(result)
+        outputs[workers] = sort_rows(rows)
+        timings[workers] = time.time() - t0
+
+    assert outputs[1] == outputs[COMPUTE_WORKERS], "pool and serial results differ"
+    total = len(outputs[1])
+    print("{:>3} documents x {:>5} rooms  serial {:6.3f} s  pool({}) {:6.3f} s  "
+          "{:>8.0f} rooms/s  with ceiling {}".format(
+              document_count, rooms_per_document, timings[1], COMPUTE_WORKERS,
+              timings[COMPUTE_WORKERS], total / max(timings[COMPUTE_WORKERS], 1e-9),
+              len([r for r in outputs[1] if r["HasCeiling"] == "Yes"])))
+
+
+def main():
+    sets = [tuple(int(v) for v in a.split(":")) for a in sys.argv[1:]] or DEFAULT_SETS
+    for document_count, rooms_per_document in sets:
+        run(document_count, rooms_per_document)
+
+
+if __name__ == "__main__":
+    main()
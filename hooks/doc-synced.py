@@ -1,29 +1,116 @@
 # -*- coding: utf-8 -*-
 from pyrevit import revit
+from pyrevit.coreutils import envvars
 from Autodesk.Revit.DB import *
 import os
 import re
+import shutil
+import tempfile
 import time
-import clr
 import sys
 
-# Пробуем подключить Excel
-try:
-    clr.AddReference("Microsoft.Office.Interop.Excel")
-    from Microsoft.Office.Interop import Excel
-except:
-    Excel = None
+from shn_reports.csvreader import iter_csv_rows
+from shn_reports.csvwriter import CsvWriter
+from shn_reports.diff import BoqDiffWriter
+from shn_reports.fileready import wait_for_file
+from shn_reports.history import segment_file_name, write_delta_segment, write_full_segment
+from shn_reports.htmlreport import BoqHtmlWriter, write_error_html
+from shn_reports.idcache import NameIdCache
+from shn_reports.indexpage import write_index_html
+from shn_reports.jobqueue import CoalescingJobQueue, ExportJob
+from shn_reports.jsonfile import read_json, write_json
+from shn_reports.manifest import (file_digest, manifest_matches, read_manifest, rows_digest,
+                                  write_manifest)
+from shn_reports.pendingjobs import (claim_job, find_orphaned_jobs, load_job_sources,
+                                     persist_job)
+from shn_reports.pipeline import feed_rows
+from shn_reports.spool import ReportSpool
+from shn_reports.summary import GroupSummaryWriter
+from shn_reports.synclog import append_log_record
+from shn_reports.tablesource import ScheduleTable, read_table_rows
+from shn_reports.throttle import SyncThrottle
+from shn_reports.textutil import to_text
+from shn_reports.timing import StageTimer
+from shn_reports.workerpool import map_parallel
+from shn_reports.xlsx import XlsxWriter
 
 # ==========================================================
 # --- НАСТРОЙКИ ---
-TARGET_SCHEDULE_NAME = "SHN_CommonBOQ"
+# Спецификации, которые выгружаются при каждом sync (имена видов в Revit).
+# Файлы отчётов называются по имени спецификации: <имя>.html / .xlsx / .csv
+TARGET_SCHEDULE_NAMES = [
+    "SHN_CommonBOQ",
+    # "SHN_CableSchedule",
+    # "SHN_LightingSchedule",
+    # "SHN_PanelSchedule",
+]
 SERVER_ROOT_PATH = r"F:\REVIT_SHN\CHECK\Parameters_BOQ"
-FILE_NAME_BASE = "SHN_CommonBOQ"
+# Префикс общих файлов папки модели (статус, лог)
+MODEL_FILE_PREFIX = "SHN_Reports"
+# Общий индекс всех папок отчётов (_reports_index.json / .html) - на уровень выше,
+# рядом с папкой Rooms. None - не обновлять.
+SERVER_INDEX_ROOT = os.path.dirname(SERVER_ROOT_PATH)
 
 # Имя столбца, по которому фильтруем Family
 FILTER_FAMILY_COLUMN_NAME   = u"Family"    # должен совпадать с заголовком в спецификации
 # Имя столбца, по которому фильтруем Category
 FILTER_CATEGORY_COLUMN_NAME = u"Category"  # ← ПОМЕНЯЙ на фактическое имя колонки, например u"Revit Category"
+# Колонки, по которым строки сопоставляются между выгрузками (отчёт изменений)
+DIFF_KEY_COLUMN_NAMES = [u"Family", u"Type"]  # если колонок нет - ключом будет вся строка
+# Итоги по группам (<имя>_summary.html / .csv): количество строк и суммы числовых колонок
+SUMMARY_GROUP_COLUMN_NAMES = [FILTER_FAMILY_COLUMN_NAME, FILTER_CATEGORY_COLUMN_NAME]
+
+# Читать строки прямо из таблицы спецификации (без Export в CSV и его
+# повторного чтения). При ошибке чтения - старый путь через Export.
+EXTRACT_FROM_TABLE = True
+# Локальная папка: Revit быстро выгружает CSV сюда, остальное делает фоновый поток
+STAGING_ROOT = os.path.join(tempfile.gettempdir(), "SHN_BOQ_Export")
+# Файл со статусом последнего фонового задания (в папке отчётов модели)
+STATUS_FILE_NAME = MODEL_FILE_PREFIX + "_status.json"
+# Сколько максимум ждать, пока Revit допишет CSV после Export (сек)
+EXPORT_WAIT_DEADLINE_S = 5.0
+# Очередь заданий живёт весь сеанс Revit, а хук запускается заново на каждый sync
+QUEUE_ENVVAR = "SHN_BOQ_EXPORT_QUEUE"
+# Идентификатор сеанса Revit: отложенные задания других (закрытых) сеансов
+# подхватывает следующий sync
+SESSION_ENVVAR = "SHN_BOQ_EXPORT_SESSION"
+# Кэш ElementId спецификаций по документу (тоже на весь сеанс)
+SCHEDULE_CACHE_ENVVAR = "SHN_BOQ_SCHEDULE_IDS"
+# Как часто искать заново спецификации, которых нет в модели (сек)
+MISSING_SCHEDULE_RESCAN_S = 10 * 60
+# Сколько спецификаций конвертировать одновременно в фоновом задании
+REPORT_WORKERS = 4
+
+# Частота конвертаций. Данные снимаются на каждом sync, но если прошлая
+# конвертация была меньше MIN_EXPORT_INTERVAL_S назад, задание ждёт в очереди
+# (и заменяется данными следующих sync). Без ожидания: каждый N-й sync
+# подряд и если прошлая конвертация старше MAX_EXPORT_AGE_S.
+MIN_EXPORT_INTERVAL_S = 5 * 60   # 0 - конвертировать на каждом sync
+FORCE_EXPORT_EVERY_N_SYNCS = 5   # 0 - не форсировать по счётчику
+MAX_EXPORT_AGE_S = 30 * 60       # 0 - без ограничения
+# Состояние (время последней конвертации, счётчик sync) - локально, по модели
+THROTTLE_STATE_NAME = "throttle.json"
+
+# Версия генератора отчётов: поменяй, если меняется формат HTML/XLSX,
+# иначе неизменившиеся спецификации не будут перегенерированы
+REPORT_GENERATOR_VERSION = "2.1"
+# Лог решений по каждому sync и оглавление папки модели
+SYNC_LOG_FILE_NAME = MODEL_FILE_PREFIX + "_sync_log.jsonl"
+INDEX_FILE_NAME = "index.html"
+
+# История снимков: <папка модели>\history\<имя спецификации>\*.jsonl.gz,
+# в каждом файле только изменённые строки (и полный снимок раз в N файлов)
+KEEP_SNAPSHOT_HISTORY = True
+HISTORY_DIR_NAME = "history"
+HISTORY_FULL_EVERY = 20
+
+# Подробные тайминги стадий (decode / parse / HTML / XLSX / ...) в логе sync.
+# Выключено - ни одного лишнего замера на строку.
+STAGE_TIMING_ENABLED = True
+# Sync дольше этого (API-поток + фоновое задание, сек) помечается "slow"
+# и дублируется в отдельный лог медленных sync
+SLOW_SYNC_THRESHOLD_S = 20.0
+SLOW_SYNC_LOG_FILE_NAME = MODEL_FILE_PREFIX + "_slow_syncs.jsonl"
 # ==========================================================
 
 doc = revit.doc
@@ -33,580 +120,789 @@ def clean_filename(text):
     return re.sub(r'[\\/*?:"<>|]', '_', text).strip()
 
 
-def get_export_folder():
-    """Формируем путь: ROOT\\ProjectName\\ModelName и создаём, если нет."""
-    try:
-        p_info = doc.ProjectInformation
-        project_name = p_info.Name if p_info and p_info.Name else "Unassigned_Project"
+# ---------- ИМЕНА ФАЙЛОВ ОДНОЙ СПЕЦИФИКАЦИИ ----------
 
-        model_title = doc.Title or "Unnamed_Model"
-        if model_title.lower().endswith('.rvt'):
-            model_title = model_title[:-4]
+def report_file_names(base):
+    """Основные отчёты (CSV, HTML, XLSX)."""
+    return [base + ext for ext in (".csv", ".html", ".xlsx")]
 
-        safe_project = clean_filename(project_name)
-        safe_model = clean_filename(model_title)
 
-        full_path = os.path.join(SERVER_ROOT_PATH, safe_project, safe_model)
+def summary_file_names(base):
+    """Итоги по группам (HTML, CSV)."""
+    return [base + "_summary" + ext for ext in (".html", ".csv")]
 
-        if not os.path.exists(full_path):
-            os.makedirs(full_path)
 
-        return full_path
-    except Exception:
-        return None
+def delta_file_names(base):
+    """Отчёт изменений (HTML, JSON)."""
+    return [base + "_delta" + ext for ext in (".html", ".json")]
 
 
-# ---------- CSV / HTML ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ ----------
+def manifest_file_name(base):
+    """Хэш данных последней генерации."""
+    return base + "_manifest.json"
 
-def read_csv_text(csv_path):
-    """Чтение CSV-файла с попыткой угадать кодировку (Revit часто даёт UTF-16)."""
-    try:
-        with open(csv_path, 'rb') as fb:
-            raw = fb.read()
-    except:
-        return None
 
-    for enc in ('utf-8-sig', 'utf-16', 'cp1255', 'cp1251'):
-        try:
-            return raw.decode(enc)
-        except:
-            continue
+def previous_csv_path(job_folder, base):
+    """Копия последней обработанной выгрузки (локально) - база для отчёта изменений."""
+    return os.path.join(os.path.dirname(job_folder), base + "_previous.csv")
 
+
+def previous_info_path(job_folder, base):
+    """Хэш и заголовок previous.csv - можно ли писать историю дельтой от него."""
+    return os.path.join(os.path.dirname(job_folder), base + "_previous.json")
+
+
+def get_model_folder_names():
+    """Безопасные имена (ProjectName, ModelName) для папок отчётов."""
+    p_info = doc.ProjectInformation
+    project_name = p_info.Name if p_info and p_info.Name else "Unassigned_Project"
+
+    model_title = doc.Title or "Unnamed_Model"
+    if model_title.lower().endswith('.rvt'):
+        model_title = model_title[:-4]
+
+    return clean_filename(project_name), clean_filename(model_title)
+
+
+def get_export_folder():
+    """Формируем путь: ROOT\\ProjectName\\ModelName (папку создаёт публикация из спула)."""
     try:
-        return raw.decode(errors='ignore')
-    except:
+        safe_project, safe_model = get_model_folder_names()
+        return os.path.join(SERVER_ROOT_PATH, safe_project, safe_model)
+    except Exception:
         return None
 
 
-def parse_csv_line(line, delimiter=",", quote='"'):
+def get_model_staging_folder():
     """
-    Простой CSV-парсер:
-    - понимает кавычки
-    - запятые внутри кавычек не считаются разделителем
-    - "" внутри строки -> одна "
+    Локальная папка модели (STAGING_ROOT\\Project__Model): папки заданий,
+    <имя>_previous.csv и состояние ограничения частоты.
     """
-    cells = []
-    current = []
-    in_quotes = False
-    i = 0
-    length = len(line)
-
-    while i < length:
-        ch = line[i]
-
-        if ch == quote:
-            if in_quotes and i + 1 < length and line[i + 1] == quote:
-                current.append(quote)
-                i += 1
-            else:
-                in_quotes = not in_quotes
-        elif ch == delimiter and not in_quotes:
-            cells.append(u"".join(current))
-            current = []
-        else:
-            current.append(ch)
-        i += 1
+    safe_project, safe_model = get_model_folder_names()
+    model_staging = os.path.join(STAGING_ROOT, safe_project + "__" + safe_model)
+    if not os.path.exists(model_staging):
+        os.makedirs(model_staging)
+    return model_staging
 
-    cells.append(u"".join(current))
-    return cells
 
+def make_job_folder():
+    """Новая локальная папка для одного задания экспорта."""
+    return tempfile.mkdtemp(prefix="job_", dir=get_model_staging_folder())
 
-def html_escape(s):
-    """Простое экранирование спецсимволов для HTML."""
-    if s is None:
-        return u""
-    if isinstance(s, bytes):
-        try:
-            s = s.decode('utf-8')
-        except:
-            try:
-                s = s.decode('cp1251')
-            except:
-                s = s.decode(errors='ignore')
 
-    s = s.replace(u"&", u"&amp;")
-    s = s.replace(u"<", u"&lt;")
-    s = s.replace(u">", u"&gt;")
-    s = s.replace(u"\"", u"&quot;")
-    s = s.replace(u"'", u"&#39;")
-    return s
+def get_throttle():
+    return SyncThrottle(os.path.join(get_model_staging_folder(), THROTTLE_STATE_NAME),
+                        MIN_EXPORT_INTERVAL_S, FORCE_EXPORT_EVERY_N_SYNCS, MAX_EXPORT_AGE_S)
 
 
-def csv_to_html(csv_path, html_path):
-    """Конвертация CSV -> HTML + фильтры по Family и Category."""
-    try:
-        text = read_csv_text(csv_path)
-        if not text:
-            raise Exception("Could not read CSV text")
-
-        lines = text.splitlines()
-        rows = []
-        for line in lines:
-            if line.strip() == "":
-                continue
-            rows.append(parse_csv_line(line))
+def get_export_queue():
+    """Одна очередь на сеанс Revit (хранится в pyRevit env vars)."""
+    queue = envvars.get_pyrevit_env_var(QUEUE_ENVVAR)
+    if queue is None:
+        queue = CoalescingJobQueue("SHN BOQ export")
+        envvars.set_pyrevit_env_var(QUEUE_ENVVAR, queue)
+    return queue
 
-        if not rows:
-            rows = [[u"NO DATA"]]
 
-        header = rows[0]
+def get_session_id():
+    session = envvars.get_pyrevit_env_var(SESSION_ENVVAR)
+    if session is None:
+        session = "{:.6f}".format(time.time())
+        envvars.set_pyrevit_env_var(SESSION_ENVVAR, session)
+    return session
+
+
+def get_schedule_cache():
+    """Кэш (документ, имя спецификации) -> ElementId на сеанс Revit."""
+    cache = envvars.get_pyrevit_env_var(SCHEDULE_CACHE_ENVVAR)
+    if cache is None:
+        cache = NameIdCache(MISSING_SCHEDULE_RESCAN_S)
+        envvars.set_pyrevit_env_var(SCHEDULE_CACHE_ENVVAR, cache)
+    return cache
 
-        # --- Поиск индекса колонки Family ---
-        fam_index = -1
-        target_family_header = (FILTER_FAMILY_COLUMN_NAME or u"").strip().lower()
-        for i, h in enumerate(header):
-            hn = (h or u"").strip().lower()
-            if hn == target_family_header:
-                fam_index = i
-                break
 
-        # --- Поиск индекса колонки Category (по имени из настройки) ---
-        cat_index = -1
-        target_cat_header = (FILTER_CATEGORY_COLUMN_NAME or u"").strip().lower()
-        if target_cat_header:
-            for i, h in enumerate(header):
-                hn = (h or u"").strip().lower()
-                if hn == target_cat_header:
-                    cat_index = i
-                    break
-
-        # Список уникальных значений для фильтров
-        family_values = []
-        if fam_index >= 0:
-            seen = set()
-            for r in rows[1:]:
-                if fam_index < len(r):
-                    val = (r[fam_index] or u"").strip()
-                    if val and val not in seen:
-                        seen.add(val)
-                        family_values.append(val)
-            family_values.sort()
-
-        category_values = []
-        if cat_index >= 0:
-            seen = set()
-            for r in rows[1:]:
-                if cat_index < len(r):
-                    val = (r[cat_index] or u"").strip()
-                    if val and val not in seen:
-                        seen.add(val)
-                        category_values.append(val)
-            category_values.sort()
-
-        current_date = time.strftime("%Y-%m-%d %H:%M")
-
-        # --- HTML HEADER + CSS ---
-        html_content = u"""<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="utf-8">
-    <style>
-        body { font-family: Arial, sans-serif; padding: 20px; background-color: #fff; }
-        h2 { text-align: center; margin-bottom: 5px; color: #333; }
-        p.info { text-align: center; color: gray; font-size: 12px; margin-top: 0; margin-bottom: 20px; }
-        table.data-table {
-            width: 100%;
-            border-collapse: collapse;
-            font-size: 12px;
-            box-shadow: 0 0 20px rgba(0, 0, 0, 0.15);
-        }
-        th, td {
-            border: 1px solid #dddddd;
-            padding: 8px 12px;
-            text-align: left;
-            vertical-align: top;
-        }
-        th {
-            background-color: #009879;
-            color: #ffffff;
-            font-weight: bold;
-            position: sticky; top: 0;
-        }
-        tr:nth-child(even) { background-color: #f3f3f3; }
-        tr:hover { background-color: #f1f1f1; }
-
-        .filter-bar { margin: 10px 0 15px 0; }
-        .dropdown { position: relative; display: inline-block; margin-right: 10px; }
-        .dropbtn {
-            padding: 6px 10px;
-            border: 1px solid #ccc;
-            background-color: #f8f8f8;
-            cursor: pointer;
-            font-size: 12px;
-        }
-        .dropdown-content {
-            display: none;
-            position: absolute;
-            background-color: #ffffff;
-            min-width: 220px;
-            border: 1px solid #ccc;
-            padding: 8px;
-            box-shadow: 0 2px 8px rgba(0,0,0,0.15);
-            z-index: 100;
-            max-height: 300px;
-            overflow-y: auto;
-        }
-        .dropdown:hover .dropdown-content { display: block; }
-        .dropdown-content label {
-            display: block;
-            font-size: 12px;
-            margin-bottom: 2px;
-            cursor: pointer;
-        }
-        .filter-actions {
-            font-size: 11px;
-            margin-bottom: 4px;
-        }
-        .filter-actions a {
-            cursor: pointer;
-            text-decoration: underline;
-        }
-    </style>
-</head>
-<body>
-"""
-
-        # --- ЗАГОЛОВОК И ИНФО ---
-        html_content += (
-            u'    <h2>' + html_escape(TARGET_SCHEDULE_NAME) + u'</h2>\n'
-            u'    <p class="info">Model: ' + html_escape(doc.Title or u"") +
-            u' | Date: ' + html_escape(current_date) + u'</p>\n'
+# ---------- СТРОКИ -> HTML / XLSX ----------
+
+def build_reports(rows, out_folder, schedule_name, base, model_title,
+                  previous_csv=None, previous_date=u"", write_csv=False, timer=None):
+    """
+    Один проход по строкам: они сразу уходят в HTML, XLSX, итоги по группам,
+    (если есть предыдущая выгрузка) в отчёт изменений и, при write_csv,
+    в CSV-отчёт.
+    timer (StageTimer) получает время каждого отчёта (html, xlsx, csv,
+    summary, diff).
+    Возвращает словарь {"rows", "html", "xlsx", "csv", "summary", "delta"}.
+    """
+    timer = timer or StageTimer(enabled=False)
+    html_path = os.path.join(out_folder, base + ".html")
+    html_writer = None
+    xlsx_writer = None
+    csv_writer = None
+    summary_writer = None
+    diff_writer = None
+    sinks = {}  # writer -> sink для feed_rows (с замером времени или он же)
+    if write_csv:
+        try:
+            csv_writer = CsvWriter(os.path.join(out_folder, base + ".csv"))
+            sinks[csv_writer] = timer.wrap_sink(csv_writer, "csv")
+        except Exception:
+            pass
+    try:
+        html_writer = BoqHtmlWriter.to_file(
+            html_path,
+            schedule_name,
+            model_title,
+            FILTER_FAMILY_COLUMN_NAME,
+            FILTER_CATEGORY_COLUMN_NAME
         )
+        sinks[html_writer] = timer.wrap_sink(html_writer, "html")
+    except Exception:
+        pass
+    try:
+        xlsx_writer = XlsxWriter(os.path.join(out_folder, base + ".xlsx"), schedule_name)
+        sinks[xlsx_writer] = timer.wrap_sink(xlsx_writer, "xlsx")
+    except Exception:
+        pass
+    try:
+        summary_html, summary_csv = summary_file_names(base)
+        summary_writer = GroupSummaryWriter(
+            os.path.join(out_folder, summary_html),
+            os.path.join(out_folder, summary_csv),
+            SUMMARY_GROUP_COLUMN_NAMES,
+            schedule_name,
+            model_title
+        )
+        sinks[summary_writer] = timer.wrap_sink(summary_writer, "summary")
+    except Exception:
+        pass
+    if previous_csv and os.path.exists(previous_csv):
+        try:
+            delta_html, delta_json = delta_file_names(base)
+            with timer.stage("diff"):
+                diff_writer = BoqDiffWriter(
+                    iter_csv_rows(previous_csv),
+                    DIFF_KEY_COLUMN_NAMES,
+                    os.path.join(out_folder, delta_html),
+                    os.path.join(out_folder, delta_json),
+                    schedule_name,
+                    model_title,
+                    previous_date,
+                    keep_delta=KEEP_SNAPSHOT_HISTORY
+                )
+            sinks[diff_writer] = timer.wrap_sink(diff_writer, "diff")
+        except Exception:
+            pass
 
-        # --- ПАНЕЛЬ ФИЛЬТРОВ ---
-        if (fam_index >= 0 and family_values) or (cat_index >= 0 and category_values):
-            html_content += u'    <div class="filter-bar">\n'
-
-            # Filter by Family
-            if fam_index >= 0 and family_values:
-                html_content += u"""        <div class="dropdown">
-            <button class="dropbtn">Filter by """ + html_escape(FILTER_FAMILY_COLUMN_NAME) + u"""</button>
-            <div class="dropdown-content family-filter">
-                <div class="filter-actions">
-                    <a id="fam-select-all">Select all</a> |
-                    <a id="fam-select-none">Clear all</a>
-                </div>
-"""
-                for val in family_values:
-                    esc_val = html_escape(val)
-                    html_content += (
-                        u'                <label><input type="checkbox" value="' +
-                        esc_val + u'" checked> ' + esc_val + u'</label>\n'
-                    )
-
-                html_content += u"""            </div>
-        </div>
-"""
-
-            # Filter by Category
-            if cat_index >= 0 and category_values:
-                html_content += u"""        <div class="dropdown">
-            <button class="dropbtn">Filter by """ + html_escape(FILTER_CATEGORY_COLUMN_NAME) + u"""</button>
-            <div class="dropdown-content category-filter">
-                <div class="filter-actions">
-                    <a id="cat-select-all">Select all</a> |
-                    <a id="cat-select-none">Clear all</a>
-                </div>
-"""
-                for val in category_values:
-                    esc_val = html_escape(val)
-                    html_content += (
-                        u'                <label><input type="checkbox" value="' +
-                        esc_val + u'" checked> ' + esc_val + u'</label>\n'
-                    )
-
-                html_content += u"""            </div>
-        </div>
-"""
-
-            html_content += u'    </div>\n'
-
-        # --- ТАБЛИЦА ---
-        html_content += u'    <table class="data-table">\n'
-        # header
-        html_content += u'    <thead>\n        <tr>\n'
-        for cell in header:
-            cell_data = cell if cell is not None else u""
-            cell_data = html_escape(cell_data.strip())
-            if cell_data == u"":
-                cell_data = u"&nbsp;"
-            html_content += u'            <th>' + cell_data + u'</th>\n'
-        html_content += u'        </tr>\n    </thead>\n'
-
-        # body
-        html_content += u'    <tbody>\n'
-        for row in rows[1:]:
-            fam_val = u""
-            if fam_index >= 0 and fam_index < len(row):
-                val = row[fam_index] or u""
-                fam_val = val.strip()
-
-            cat_val = u""
-            if cat_index >= 0 and cat_index < len(row):
-                val = row[cat_index] or u""
-                cat_val = val.strip()
-
-            tr_open = u'        <tr class="data-row" data-family="' + html_escape(fam_val) + \
-                      u'" data-category="' + html_escape(cat_val) + u'">'
-            html_content += tr_open
-
-            for j, cell in enumerate(row):
-                cell_data = cell if cell is not None else u""
-                if isinstance(cell_data, bytes):
-                    try:
-                        cell_data = cell_data.decode('utf-8')
-                    except:
-                        try:
-                            cell_data = cell_data.decode('cp1251')
-                        except:
-                            cell_data = cell_data.decode(errors='ignore')
-
-                cell_data = cell_data.strip()
-                if cell_data == u"":
-                    cell_data = u"&nbsp;"
-                else:
-                    cell_data = html_escape(cell_data)
-
-                html_content += u"<td>" + cell_data + u"</td>"
-
-            html_content += u"</tr>\n"
-
-        html_content += u'    </tbody>\n</table>\n'
-
-        # --- JS ДЛЯ ОБОИХ ФИЛЬТРОВ ---
-        html_content += u"""
-    <script>
-    document.addEventListener('DOMContentLoaded', function() {
-        var famCheckboxes = document.querySelectorAll('.family-filter input[type="checkbox"]');
-        var catCheckboxes = document.querySelectorAll('.category-filter input[type="checkbox"]');
-
-        function getActiveValues(nodeList) {
-            var result = [];
-            if (!nodeList) return result;
-            for (var i = 0; i < nodeList.length; i++) {
-                if (nodeList[i].checked) {
-                    result.push(nodeList[i].value);
-                }
-            }
-            return result;
-        }
-
-        function updateVisibility() {
-            var activeFam = getActiveValues(famCheckboxes);
-            var activeCat = getActiveValues(catCheckboxes);
-
-            var rows = document.querySelectorAll('table.data-table tbody tr.data-row');
-            for (var j = 0; j < rows.length; j++) {
-                var row = rows[j];
-                var vFam = row.getAttribute('data-family') || '';
-                var vCat = row.getAttribute('data-category') || '';
-
-                var famOK = (activeFam.length === 0) || (activeFam.indexOf(vFam) !== -1);
-                var catOK = (activeCat.length === 0) || (activeCat.indexOf(vCat) !== -1);
-
-                if (famOK && catOK) {
-                    row.style.display = '';
-                } else {
-                    row.style.display = 'none';
-                }
-            }
-        }
-
-        // события family
-        for (var i = 0; i < famCheckboxes.length; i++) {
-            famCheckboxes[i].addEventListener('change', updateVisibility);
-        }
-        var famAll = document.getElementById('fam-select-all');
-        var famNone = document.getElementById('fam-select-none');
-        if (famAll) {
-            famAll.addEventListener('click', function(e) {
-                e.preventDefault();
-                for (var i = 0; i < famCheckboxes.length; i++) {
-                    famCheckboxes[i].checked = true;
-                }
-                updateVisibility();
-            });
-        }
-        if (famNone) {
-            famNone.addEventListener('click', function(e) {
-                e.preventDefault();
-                for (var i = 0; i < famCheckboxes.length; i++) {
-                    famCheckboxes[i].checked = false;
-                }
-                updateVisibility();
-            });
-        }
-
-        // события category
-        for (var i = 0; i < catCheckboxes.length; i++) {
-            catCheckboxes[i].addEventListener('change', updateVisibility);
-        }
-        var catAll = document.getElementById('cat-select-all');
-        var catNone = document.getElementById('cat-select-none');
-        if (catAll) {
-            catAll.addEventListener('click', function(e) {
-                e.preventDefault();
-                for (var i = 0; i < catCheckboxes.length; i++) {
-                    catCheckboxes[i].checked = true;
-                }
-                updateVisibility();
-            });
-        }
-        if (catNone) {
-            catNone.addEventListener('click', function(e) {
-                e.preventDefault();
-                for (var i = 0; i < catCheckboxes.length; i++) {
-                    catCheckboxes[i].checked = false;
-                }
-                updateVisibility();
-            });
-        }
-
-        updateVisibility();
-    });
-    </script>
-"""
-
-        html_content += u"</body></html>"
-
-        import codecs
-        with codecs.open(html_path, 'w', encoding='utf-8') as hf:
-            hf.write(html_content)
-
-        return True
+    order = [w for w in (csv_writer, html_writer, xlsx_writer, summary_writer, diff_writer)
+             if w in sinks]
+    row_count, errors = feed_rows(timer.time_iter(rows, "read"),
+                                  [sinks[w] for w in order])
 
-    except Exception as e:
+    def built(writer):
+        return writer is not None and sinks[writer] not in errors
+
+    if html_writer is not None and not built(html_writer):
         try:
-            import codecs
-            err_html = u"""<!DOCTYPE html>
-<html><head><meta charset="utf-8"></head>
-<body>
-<p style="color:red;">Error while generating HTML from CSV.</p>
-<p>{err}</p>
-</body></html>""".format(err=html_escape(unicode(e)))
-            with codecs.open(html_path, 'w', encoding='utf-8') as hf:
-                hf.write(err_html)
+            write_error_html(html_path, errors[sinks[html_writer]])
         except:
             pass
-        return False
 
+    delta = None
+    delta_detail = None
+    if built(diff_writer):
+        delta = diff_writer.summary
+        delta_detail = diff_writer.delta
+
+    return {
+        "rows": row_count,
+        "html": built(html_writer),
+        "xlsx": built(xlsx_writer),
+        "csv": not write_csv or built(csv_writer),
+        "summary": built(summary_writer),
+        "delta": delta,
+        "delta_detail": delta_detail,
+    }
+
+
+# ---------- ФОНОВОЕ ЗАДАНИЕ ----------
+
+def publish_reports(job_folder, export_folder, names, extra_targets=(), commit_names=()):
+    """
+    Переносит готовые отчёты из папки задания в локальный спул и публикует
+    весь спул на сервер (в том числе отчёты, не ушедшие при прошлых sync).
+    extra_targets - [(папка на сервере, [имена])] для файлов вне папки
+    модели (история); они ставятся в спул раньше отчётов. commit_names -
+    манифесты: не публикуются, если отчёт был занят и лёг как *_new.
+    Возвращает True, если отчёты этого задания уже на сервере.
+    """
+    def job_files(file_names):
+        return dict((name, os.path.join(job_folder, name)) for name in file_names
+                    if os.path.exists(os.path.join(job_folder, name)))
+
+    spool = ReportSpool()
+    entries = []
+    for target, file_names in extra_targets:
+        entries.append(spool.stage(target, job_files(file_names), share_root=SERVER_ROOT_PATH))
+    entries.append(spool.stage(export_folder, job_files(names), share_root=SERVER_ROOT_PATH,
+                               commit_files=commit_names))
+    spool.flush()
+    return not any(os.path.exists(entry) for entry in entries)
+
+
+def report_signature(schedule_name):
+    """Всё, кроме данных, от чего зависит содержимое отчётов."""
+    return (REPORT_GENERATOR_VERSION, schedule_name,
+            FILTER_FAMILY_COLUMN_NAME, FILTER_CATEGORY_COLUMN_NAME,
+            u"|".join(SUMMARY_GROUP_COLUMN_NAMES))
 
-def convert_csv_to_xlsx(csv_path, xlsx_path):
-    """Конвертация CSV -> XLSX через Excel Interop."""
-    if not Excel:
-        return False
 
-    ex_app = None
-    workbook = None
+def write_history_segment(job_folder, base, schedule_name, digest, manifest,
+                          delta, header, csv_path, status):
+    """
+    Сегмент истории снимков в папке задания: дельта от прошлого снимка,
+    если previous.csv совпадает с последней генерацией на сервере, иначе
+    полный снимок. Возвращает число дельт после последнего полного снимка.
+    """
+    previous = read_json(previous_info_path(job_folder, base), default={}) or {}
+    base_hash = manifest.get("content_hash") or u""
+    chain = manifest.get("history_deltas")
+    meta = {
+        "schedule": schedule_name,
+        "content_hash": digest,
+        "base_hash": base_hash,
+        "generated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    name = segment_file_name(digest)
+    path = os.path.join(job_folder, name)
+
+    if (delta is not None and base_hash and chain is not None
+            and chain < HISTORY_FULL_EVERY
+            and previous.get("content_hash") == base_hash
+            and previous.get("header") == header == delta["header"]):
+        write_delta_segment(path, delta, meta)
+        chain += 1
+        status["history_kind"] = "delta"
+    else:
+        write_full_segment(path, iter_csv_rows(csv_path), meta)
+        chain = 0
+        status["history_kind"] = "full"
+    status["history_file"] = name
+    return chain
+
+
+def read_csv_header(csv_path):
+    """Заголовок CSV (нормализованный, как в diff), файл закрывается сразу."""
+    rows = iter_csv_rows(csv_path)
     try:
-        ex_app = Excel.ApplicationClass()
-        ex_app.Visible = False
-        ex_app.DisplayAlerts = False
+        return [to_text(h).strip() for h in next(rows, None) or []]
+    finally:
+        rows.close()
 
-        workbook = ex_app.Workbooks.Open(csv_path, Format=6, Delimiter=",")
-        ws = workbook.Worksheets[1]
 
-        ws.UsedRange.Columns.AutoFit()
-        ws.Rows[1].Font.Bold = True
-        ws.UsedRange.Borders.LineStyle = 1
+def convert_schedule(job_folder, export_folder, model_title, source):
+    """
+    Одна спецификация в потоке пула: хэш, сравнение с манифестом и,
+    если данные изменились, HTML / XLSX / CSV / отчёт изменений.
+    Возвращает словарь статуса; готовые файлы остаются в папке задания.
+    """
+    name = source["schedule"]
+    base = source["base"]
+    rows = source.get("rows")
+    status = dict(source.get("timings") or {})
+    status.update({"schedule": name, "base": base})
+    if source.get("error"):
+        status["result"] = "error: {}".format(source["error"])
+        return status
+
+    csv_path = os.path.join(job_folder, base + ".csv")
+
+    t = time.time()
+    if rows is None:
+        digest = file_digest(csv_path, report_signature(name))
+    else:
+        digest = rows_digest(rows, report_signature(name))
+    status["content_hash"] = digest
+    status["hash_s"] = round(time.time() - t, 3)
+
+    manifest = read_manifest(os.path.join(export_folder, manifest_file_name(base)))
+    if manifest_matches(manifest, digest, export_folder, report_file_names(base)):
+        # данные не менялись - отчёты на сервере актуальны
+        status["decision"] = "skipped"
+        status["result"] = "ok"
+        status["manifest"] = manifest
+        return status
+
+    status["decision"] = "regenerated"
+    previous_csv = previous_csv_path(job_folder, base)
+    timer = StageTimer(STAGE_TIMING_ENABLED)
+    t = time.time()
+    if rows is None:
+        rows = iter_csv_rows(csv_path, timer=timer if timer.enabled else None)
+    built = build_reports(rows, job_folder, name, base, model_title,
+                          previous_csv, manifest.get("generated_at", u""),
+                          write_csv=source.get("rows") is not None, timer=timer)
+    all_ok = built["html"] and built["xlsx"] and built["csv"]
+    status["rows"] = built["rows"]
+    status["html"] = built["html"]
+    status["xlsx"] = built["xlsx"]
+    status["csv"] = built["csv"]
+    status["summary"] = built["summary"]
+    status["delta"] = built["delta"]
+    status["build_s"] = round(time.time() - t, 3)
+
+    if all_ok:
+        header = read_csv_header(csv_path)
+        history_deltas = None
+        if KEEP_SNAPSHOT_HISTORY:
+            try:
+                with timer.stage("history"):
+                    history_deltas = write_history_segment(
+                        job_folder, base, name, digest, manifest, built["delta_detail"],
+                        header, csv_path, status)
+            except Exception as e:
+                status["history_kind"] = "error: {}".format(e)
+        built = None  # полный diff больше не нужен
+
+        # манифест уходит на сервер вместе с отчётами, одной пачкой
+        status["manifest"] = write_manifest(
+            os.path.join(job_folder, manifest_file_name(base)), digest,
+            generator_version=REPORT_GENERATOR_VERSION,
+            schedule=name, rows=status["rows"], delta=status["delta"],
+            summary=status["summary"],
+            history_deltas=history_deltas)
+        shutil.copyfile(csv_path, previous_csv)
+        write_json(previous_info_path(job_folder, base),
+                   {"content_hash": digest, "header": header})
+        status["result"] = "ok"
+    else:
+        status["result"] = "partial"
+
+    stages = timer.as_dict()
+    if "read_s" in stages:
+        # read = чтение источника целиком; без декодирования файла это разбор
+        stages["parse_s"] = round(stages["read_s"] - stages.get("decode_s", 0.0), 3)
+    status.update(stages)
+    status["bytes"] = file_sizes(job_folder, report_file_names(base) + summary_file_names(base) +
+                                 delta_file_names(base) + [status.get("history_file") or u""])
+    return status
+
+
+def file_sizes(folder, names):
+    """{имя файла: размер в байтах} для существующих файлов."""
+    sizes = {}
+    for name in names:
+        path = os.path.join(folder, name)
+        if name and os.path.isfile(path):
+            sizes[name] = os.path.getsize(path)
+    return sizes
+
+
+def index_entry(status):
+    """Строка index.html для одной спецификации (по статусу задания и манифесту)."""
+    base = status.get("base")
+    manifest = status.get("manifest") or {}
+    entry = {
+        "schedule": status.get("schedule"),
+        "rows": manifest.get("rows", status.get("rows")),
+        "generated_at": manifest.get("generated_at"),
+        "delta": manifest.get("delta"),
+    }
+    if not manifest:
+        entry["error"] = status.get("result")
+        return entry
+    html_name, xlsx_name, csv_name = base + ".html", base + ".xlsx", base + ".csv"
+    entry["links"] = [(u"HTML", html_name), (u"XLSX", xlsx_name), (u"CSV", csv_name)]
+    if manifest.get("summary"):
+        entry["links"].append((u"Totals", summary_file_names(base)[0]))
+    if manifest.get("delta"):
+        entry["links"].append((u"Changes", delta_file_names(base)[0]))
+    return entry
+
+
+def run_report_job(job_folder, export_folder, model_title, job, sources, api_timings,
+                   throttle=None):
+    """
+    Все спецификации sync в фоновом потоке: конвертация в пуле потоков,
+    index.html и публикация на сервер одной пачкой.
+    sources - список словарей, собранных в API-потоке (schedule, base,
+    rows или CSV в папке задания, timings, error).
+    api_timings - тайминги API-потока (поиск спецификаций, чтение/выгрузка).
+    throttle - SyncThrottle модели, отмечает выполненную конвертацию.
+    """
+    started = time.time()
+    index_update = None
+    status = dict(api_timings)
+    status.update({
+        "model": model_title,
+        "queued_s": round(started - job.submitted_at, 3),
+        "coalesced_syncs": job.coalesced,
+        "started": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(started)),
+    })
+    try:
+        results = map_parallel(
+            lambda source: convert_schedule(job_folder, export_folder, model_title, source),
+            sources, REPORT_WORKERS)
+        schedules = []
+        for source, (result, error) in zip(sources, results):
+            if error:
+                result = {"schedule": source["schedule"], "base": source["base"],
+                          "result": "error: {}".format(error.strip().splitlines()[-1])}
+            schedules.append(result)
+        # строки больше не нужны - не держим их в памяти до следующего sync
+        for source in sources:
+            source.pop("rows", None)
+
+        names = []
+        manifests = []
+        history = []
+        for item in schedules:
+            if item.get("decision") == "regenerated":
+                base = item["base"]
+                names += report_file_names(base) + summary_file_names(base) + \
+                    delta_file_names(base)
+                manifests.append(manifest_file_name(base))
+                if item.get("history_file"):
+                    history.append((os.path.join(export_folder, HISTORY_DIR_NAME, base),
+                                    [item["history_file"]]))
+
+        names += manifests
+
+        entries = [index_entry(item) for item in schedules]
+        if names or not os.path.exists(os.path.join(export_folder, INDEX_FILE_NAME)):
+            write_index_html(os.path.join(job_folder, INDEX_FILE_NAME), model_title, entries)
+            names.append(INDEX_FILE_NAME)
+
+        for item in schedules:
+            item.pop("manifest", None)
+        status["schedules"] = schedules
+        status["regenerated"] = len([s for s in schedules if s.get("decision") == "regenerated"])
+
+        t = time.time()
+        if names:
+            published = publish_reports(job_folder, export_folder, names, history, manifests)
+        else:
+            # ничего не менялось - только отчёты, застрявшие в спуле с прошлых sync
+            ReportSpool().flush()
+            published = True
+        status["publish_s"] = round(time.time() - t, 3)
+        if any(item.get("result") != "ok" for item in schedules):
+            status["result"] = "partial"
+        elif not published:
+            status["result"] = "queued: server not reachable, reports kept in local spool"
+        else:
+            status["result"] = "ok"
 
-        if os.path.exists(xlsx_path):
+        if names and SERVER_INDEX_ROOT:
+            # уходит на сервер через спул вместе с записью о sync (после отчётов)
+            index_update = model_index_update(export_folder, schedules, entries,
+                                              status["result"])
+    except Exception as e:
+        status["result"] = "error: {}".format(e)
+    finally:
+        status["duration_s"] = round(time.time() - started, 3)
+        status["finished"] = time.strftime("%Y-%m-%d %H:%M:%S")
+        if throttle is not None:
+            throttle.on_export()
+        try:
+            write_sync_record(export_folder, status, write_status=True,
+                              index_update=index_update)
+        finally:
+            shutil.rmtree(job_folder, ignore_errors=True)
+
+
+def model_index_update(export_folder, schedules, entries, result):
+    """
+    Запись этой модели для общего индекса на сервере (без обхода дерева
+    папок) - аргументы update_server_index для записи спула.
+    Размер: новые отчёты - по папке задания, прочие - по серверу.
+    """
+    size = 0
+    for item in schedules:
+        base = item.get("base")
+        names = report_file_names(base) + summary_file_names(base)
+        if item.get("bytes"):
+            size += sum(v for name, v in item["bytes"].items() if name in names)
+            continue
+        for name in names:
+            path = os.path.join(export_folder, name)
             try:
-                os.remove(xlsx_path)
-            except:
+                if os.path.isfile(path):
+                    size += os.path.getsize(path)
+            except OSError:
                 pass
+    record = {
+        "last_export": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "result": result,
+        "rows": sum(e.get("rows") or 0 for e in entries),
+        "bytes": size,
+        "schedules": dict((e["schedule"], e.get("rows")) for e in entries),
+        "links": [(u"Index", INDEX_FILE_NAME)] + [
+            (e["schedule"], e["links"][0][1]) for e in entries if e.get("links")],
+    }
+    project_folder, model = os.path.split(export_folder)
+    return {
+        "index_root": SERVER_INDEX_ROOT,
+        "kind": "boq",
+        "project": os.path.basename(project_folder),
+        "model": model,
+        "folder": export_folder,
+        "record": record,
+    }
+
+
+def write_sync_record(export_folder, status, write_status=False, index_update=None):
+    """
+    Запись о sync в лог папки модели (и в лог медленных sync, если
+    API-поток + фоновое задание дольше SLOW_SYNC_THRESHOLD_S), статус и
+    запись общего индекса - одной записью спула: если сервер недоступен
+    или папки модели ещё нет, запись ждёт в спуле, а не теряется.
+    """
+    total = status.get("api_thread_s", 0.0) + status.get("duration_s", 0.0)
+    status["total_s"] = round(total, 3)
+    status["slow"] = total > SLOW_SYNC_THRESHOLD_S
+    local = tempfile.mkdtemp(prefix="SHN_BOQ_status_")
+    try:
+        files = {}
+        logs = [SYNC_LOG_FILE_NAME] + ([SLOW_SYNC_LOG_FILE_NAME] if status["slow"] else [])
+        for name in logs:
+            files[name] = os.path.join(local, name)
+            append_log_record(files[name], status)
+        if write_status:
+            files[STATUS_FILE_NAME] = os.path.join(local, STATUS_FILE_NAME)
+            write_json(files[STATUS_FILE_NAME], status)
+        spool = ReportSpool()
+        spool.stage(export_folder, files, share_root=SERVER_ROOT_PATH,
+                    append_files=logs, index_update=index_update)
+    finally:
+        shutil.rmtree(local, ignore_errors=True)
+    spool.flush()
 
-        workbook.SaveAs(xlsx_path, 51)  # 51 = xlOpenXMLWorkbook (xlsx)
-        return True
+
+def report_hook_error(export_folder, stage, error, api_timings):
+    """
+    Ошибка в API-потоке: запись в лог делает фоновая очередь (сеть не
+    трогаем из Revit). Ключ отдельный, чтобы не вытеснять задание отчётов.
+    """
+    status = dict(api_timings)
+    status.update({
+        "model": doc.Title or u"",
+        "stage": stage,
+        "result": u"error: {}".format(error),
+        "finished": time.strftime("%Y-%m-%d %H:%M:%S"),
+    })
+    try:
+        get_export_queue().submit(ExportJob(
+            export_folder + "|error", lambda: write_sync_record(export_folder, status)))
     except Exception:
-        return False
-    finally:
-        try:
-            if workbook:
-                workbook.Close(SaveChanges=False)
-        except:
-            pass
+        pass
+
+
+def submit_report_job(queue, job_folder, export_folder, model_title, sources, api_timings,
+                      throttle, run_at=0.0):
+    """Ставит задание отчётов в очередь (папка задания удаляется, если его вытеснят)."""
+    job = ExportJob(export_folder, None,
+                    discard=lambda: shutil.rmtree(job_folder, ignore_errors=True),
+                    not_before=run_at)
+    job.run = lambda: run_report_job(job_folder, export_folder, model_title, job,
+                                     sources, api_timings, throttle)
+    queue.submit(job)
+    return job
+
+
+def persist_deferred_job(queue, job_folder, export_folder, model_title, sources,
+                         api_timings, run_at):
+    """
+    Отложенное задание пишется на диск (фоновым заданием, не в API-потоке),
+    чтобы "Sync and Close" до run_at не потерял последние данные.
+    """
+    info = {
+        "session": get_session_id(),
+        "export_folder": export_folder,
+        "model_title": model_title,
+        "api_timings": api_timings,
+        "run_at": run_at,
+    }
+    queue.submit(ExportJob(export_folder + "|persist",
+                           lambda: persist_job(job_folder, info, sources)))
+
+
+def resume_orphaned_jobs(queue):
+    """
+    Задания, отложенные в закрытом сеансе Revit, запускаются сразу.
+    Вызывается до постановки нового задания: если это та же модель,
+    новое задание (с более свежими данными) вытеснит старое.
+    """
+    session = get_session_id()
+    for job_folder, marker in find_orphaned_jobs(STAGING_ROOT, session):
         try:
-            if ex_app:
-                ex_app.Quit()
-        except:
-            pass
+            if not claim_job(job_folder, marker, session):
+                continue
+            sources = load_job_sources(job_folder, marker)
+        except Exception:
+            shutil.rmtree(job_folder, ignore_errors=True)
+            continue
+        api_timings = dict(marker.get("api_timings") or {})
+        api_timings["resumed"] = True
+        throttle = SyncThrottle(os.path.join(os.path.dirname(job_folder), THROTTLE_STATE_NAME),
+                                MIN_EXPORT_INTERVAL_S, FORCE_EXPORT_EVERY_N_SYNCS,
+                                MAX_EXPORT_AGE_S)
+        submit_report_job(queue, job_folder, marker["export_folder"],
+                          marker.get("model_title") or u"", sources, api_timings, throttle)
+
+
+# ---------- ВЫГРУЗКА ИЗ REVIT ----------
+
+def resolve_schedule(element_id, name):
+    """Вид по ElementId из кэша, если он всё ещё та же спецификация."""
+    v = doc.GetElement(element_id)
+    if isinstance(v, ViewSchedule) and not v.IsTemplate and v.Name == name:
+        return v
+    return None
+
+
+def scan_schedules(names):
+    """Один проход коллектора: {имя: (ElementId, вид)} для names."""
+    wanted = set(names)
+    found = {}
+    collector = FilteredElementCollector(doc).OfClass(ViewSchedule)
+    for v in collector:
+        if v.IsTemplate:
+            continue
+        name = v.Name
+        if name in wanted and name not in found:
+            found[name] = (v.Id, v)
+            if len(found) == len(wanted):
+                break
+    return found
+
+
+def find_target_schedules():
+    """
+    {имя спецификации: вид} для TARGET_SCHEDULE_NAMES. После первого sync
+    виды берутся по закэшированным ElementId, коллектор нужен только
+    для удалённых / переименованных / ещё не найденных спецификаций.
+    """
+    return get_schedule_cache().lookup(doc.PathName or doc.Title, TARGET_SCHEDULE_NAMES,
+                                       resolve_schedule, scan_schedules)
+
 
+def read_schedule_rows(target_view, timings):
+    """
+    Быстрый путь в API-потоке: текст ячеек тела спецификации в память.
+    Возвращает список строк или None (тогда используется Export в CSV).
+    """
+    try:
+        t = time.time()
+        table = ScheduleTable(target_view)
+        rows = read_table_rows(table, table.visible_columns())
+        timings["extract_s"] = round(time.time() - t, 3)
+    except Exception as e:
+        timings["extract_error"] = u"{}".format(e)
+        return None
+    if not rows:
+        return None
+    timings["source"] = "table"
+    return rows
+
+
+def export_schedule_csv(target_view, job_folder, base, timings):
+    """
+    Запасной шаг в API-потоке: выгрузка спецификации в локальный CSV.
+    В timings пишет export_s и wait_for_file_s.
+    """
+    filename_csv = base + ".csv"
+    full_csv_path = os.path.join(job_folder, filename_csv)
+
+    opt = ViewScheduleExportOptions()
+    opt.Title = False
+    opt.TextQualifier = ExportTextQualifier.DoubleQuote
+    opt.FieldDelimiter = ","
+
+    t = time.time()
+    target_view.Export(job_folder, filename_csv, opt)
+    timings["export_s"] = round(time.time() - t, 3)
+    timings["source"] = "csv"
+
+    ready, waited = wait_for_file(full_csv_path, EXPORT_WAIT_DEADLINE_S)
+    timings["wait_for_file_s"] = round(waited, 3)
+    if not ready:
+        return None
+    return full_csv_path
+
+
+def collect_schedule_sources(views, job_folder):
+    """Данные всех найденных спецификаций (в API-потоке) для фонового задания."""
+    sources = []
+    for name in TARGET_SCHEDULE_NAMES:
+        view = views.get(name)
+        if view is None:
+            continue
+        source = {"schedule": name, "base": clean_filename(name), "timings": {}}
         try:
-            import System.Runtime.InteropServices
-            if workbook:
-                System.Runtime.InteropServices.Marshal.ReleaseComObject(workbook)
-            if ex_app:
-                System.Runtime.InteropServices.Marshal.ReleaseComObject(ex_app)
-        except:
-            pass
+            if EXTRACT_FROM_TABLE:
+                source["rows"] = read_schedule_rows(view, source["timings"])
+            if source.get("rows") is None and \
+                    not export_schedule_csv(view, job_folder, source["base"], source["timings"]):
+                source["error"] = "exported CSV not ready"
+        except Exception as e:
+            source["error"] = u"{}".format(e)
+        sources.append(source)
+    return sources
 
 
 def main():
-    if not os.path.exists(SERVER_ROOT_PATH):
-        return
-
+    # Доступность сервера здесь не проверяем: отчёты строятся локально,
+    # а спул отправит их, когда сервер будет доступен
     export_folder = get_export_folder()
     if not export_folder:
         return
 
-    target_view = None
+    api_started = time.time()
+    api_timings = {}
     try:
-        collector = FilteredElementCollector(doc).OfClass(ViewSchedule)
-        for v in collector:
-            if not v.IsTemplate and v.Name == TARGET_SCHEDULE_NAME:
-                target_view = v
-                break
-    except Exception:
+        views = find_target_schedules()
+        api_timings["lookup_s"] = round(time.time() - api_started, 3)
+    except Exception as e:
+        report_hook_error(export_folder, "lookup", e, api_timings)
         return
 
-    if not target_view:
+    if not views:
         return
 
-    filename_csv = FILE_NAME_BASE + ".csv"
-    full_csv_path = os.path.join(export_folder, filename_csv)
-
-    filename_html = FILE_NAME_BASE + ".html"
-    full_html_path = os.path.join(export_folder, filename_html)
-
-    filename_xlsx = FILE_NAME_BASE + ".xlsx"
-    full_xlsx_path = os.path.join(export_folder, filename_xlsx)
-
+    job_folder = None
+    stage = "export"
     try:
-        opt = ViewScheduleExportOptions()
-        opt.Title = False
-        opt.TextQualifier = ExportTextQualifier.DoubleQuote
-        opt.FieldDelimiter = ","
-
-        if os.path.exists(full_csv_path):
-            try:
-                os.remove(full_csv_path)
-            except:
-                filename_csv = FILE_NAME_BASE + "_new.csv"
-                full_csv_path = os.path.join(export_folder, filename_csv)
-
-        target_view.Export(export_folder, filename_csv, opt)
-
-        max_retries = 10
-        for _ in range(max_retries):
-            if os.path.exists(full_csv_path):
-                try:
-                    with open(full_csv_path, 'rb'):
-                        pass
-                    break
-                except:
-                    time.sleep(0.5)
-            else:
-                time.sleep(0.5)
-
-        if not os.path.exists(full_csv_path):
+        job_folder = make_job_folder()
+        sources = collect_schedule_sources(views, job_folder)
+        api_timings["api_thread_s"] = round(time.time() - api_started, 3)
+        if all(source.get("error") for source in sources):
+            shutil.rmtree(job_folder, ignore_errors=True)
+            report_hook_error(export_folder, stage,
+                              u"; ".join(u"{}: {}".format(s["schedule"], s["error"])
+                                         for s in sources), api_timings)
             return
 
-        csv_to_html(full_csv_path, full_html_path)
-        convert_csv_to_xlsx(full_csv_path, full_xlsx_path)
+        stage = "submit"
+        model_title = doc.Title or u""
+        queue = get_export_queue()
+        try:
+            resume_orphaned_jobs(queue)
+        except Exception:
+            pass
+        throttle = get_throttle()
+        run_at, reason = throttle.on_sync()
+        api_timings["throttle"] = reason
+        api_timings["deferred_s"] = round(max(0.0, run_at - time.time()), 1)
+        submit_report_job(queue, job_folder, export_folder, model_title, sources,
+                          api_timings, throttle, run_at)
+        if run_at > time.time():
+            persist_deferred_job(queue, job_folder, export_folder, model_title, sources,
+                                 api_timings, run_at)
 
-    except Exception:
-        pass
+    except Exception as e:
+        if job_folder:
+            shutil.rmtree(job_folder, ignore_errors=True)
+        report_hook_error(export_folder, stage, e, api_timings)
 
 
 main()
@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+"""
+Shared helpers for SHN report generation (BOQ sync hook, control panel).
+
+Everything in this package is plain Python (IronPython 2.7 / CPython 3)
+and must not import the Revit API, so it can be run and benchmarked
+outside of Revit.
+"""
@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+"""
+Reading of schedule CSV files exported by Revit.
+
+Revit writes schedules either as UTF-16 (with BOM) or in the machine ANSI
+codepage, so the encoding is sniffed from the first block of the file and
+the rest is decoded as a stream.
+"""
+
+import codecs
+import io
+import re
+
+ENCODING_SAMPLE_SIZE = 64 * 1024
+FALLBACK_ENCODINGS = ('utf-8', 'cp1255', 'cp1251')
+
+
+def detect_csv_encoding(csv_path, sample_size=ENCODING_SAMPLE_SIZE):
+    """
+    Угадывает кодировку CSV по BOM и первому блоку файла.
+    Возвращает имя кодировки или None, если файл не читается.
+    """
+    try:
+        with open(csv_path, 'rb') as fb:
+            sample = fb.read(sample_size)
+    except Exception:
+        return None
+
+    if sample.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if sample.startswith(codecs.BOM_UTF16_LE) or sample.startswith(codecs.BOM_UTF16_BE):
+        return 'utf-16'
+
+    for enc in FALLBACK_ENCODINGS:
+        try:
+            # final=False: the sample may end in the middle of a character
+            codecs.getincrementaldecoder(enc)().decode(sample, False)
+            return enc
+        except Exception:
+            continue
+    return 'utf-8'
+
+
+def read_csv_text(csv_path):
+    """Чтение CSV-файла целиком с попыткой угадать кодировку."""
+    enc = detect_csv_encoding(csv_path)
+    if not enc:
+        return None
+    try:
+        with io.open(csv_path, 'r', encoding=enc, errors='replace') as f:
+            return f.read()
+    except Exception:
+        return None
+
+
+def parse_csv_line(line, delimiter=",", quote='"'):
+    """
+    Посимвольный CSV-парсер одной строки (медленный путь):
+    - понимает кавычки
+    - запятые внутри кавычек не считаются разделителем
+    - "" внутри строки -> одна "
+    Используется как запасной вариант для нестандартных записей.
+    """
+    cells = []
+    current = []
+    in_quotes = False
+    i = 0
+    length = len(line)
+
+    while i < length:
+        ch = line[i]
+
+        if ch == quote:
+            if in_quotes and i + 1 < length and line[i + 1] == quote:
+                current.append(quote)
+                i += 1
+            else:
+                in_quotes = not in_quotes
+        elif ch == delimiter and not in_quotes:
+            cells.append(u"".join(current))
+            current = []
+        else:
+            current.append(ch)
+        i += 1
+
+    cells.append(u"".join(current))
+    return cells
+
+
+# ---------- RFC 4180 TOKENIZER ----------
+
+_FIELD_PATTERNS = {}
+
+
+def _field_pattern(delimiter, quote):
+    """Регулярка одного поля: куски без кавычек и "..." с удвоенными кавычками."""
+    key = (delimiter, quote)
+    pattern = _FIELD_PATTERNS.get(key)
+    if pattern is None:
+        d = re.escape(delimiter)
+        q = re.escape(quote)
+        pattern = re.compile(
+            u'(?:[^{q}{d}]+|{q}[^{q}]*(?:{q}{q}[^{q}]*)*{q})*'.format(q=q, d=d))
+        _FIELD_PATTERNS[key] = pattern
+    return pattern
+
+
+def _unquote_field(field, quote):
+    if quote not in field:
+        return field
+    if len(field) >= 2 and field[0] == quote and field[-1] == quote:
+        inner = field[1:-1]
+        doubled = quote + quote
+        # "" внутри -> ", одиночная кавычка внутри значит смешанное поле
+        if quote not in inner.replace(doubled, u""):
+            return inner.replace(doubled, quote)
+    # смешанное поле вида ab"c,d"e - как в посимвольном парсере
+    return u"".join(part.replace(quote + quote, quote) if i % 2 else part
+                    for i, part in enumerate(_split_quoted(field, quote)))
+
+
+def _split_quoted(field, quote):
+    """Делит поле на чередующиеся куски: вне кавычек / в кавычках."""
+    parts = []
+    i = 0
+    length = len(field)
+    while i < length:
+        if field[i] != quote:
+            j = field.find(quote, i)
+            if j < 0:
+                j = length
+            if len(parts) % 2:
+                parts.append(u"")
+            parts.append(field[i:j])
+            i = j
+        else:
+            j = i + 1
+            while True:
+                j = field.find(quote, j)
+                if j < 0 or j + 1 >= length or field[j + 1] != quote:
+                    break
+                j += 2
+            if j < 0:
+                j = length
+            if not len(parts) % 2:
+                parts.append(u"")
+            parts.append(field[i + 1:j])
+            i = j + 1
+    return parts
+
+
+def split_csv_record(record, delimiter=",", quote='"'):
+    """
+    Делит одну полную CSV-запись (может содержать переводы строк внутри
+    кавычек) на ячейки.
+    """
+    if quote not in record:
+        return record.split(delimiter)
+
+    # Revit по умолчанию берёт в кавычки каждую ячейку: "a","b","c".
+    # Разрез по "," верен, если в каждой ячейке остались только парные "".
+    if len(record) >= 2 and record[0] == quote and record[-1] == quote:
+        doubled = quote + quote
+        cells = record[1:-1].split(quote + delimiter + quote)
+        for i, cell in enumerate(cells):
+            if quote in cell:
+                if quote in cell.replace(doubled, u""):
+                    break
+                cells[i] = cell.replace(doubled, quote)
+        else:
+            return cells
+
+    match = _field_pattern(delimiter, quote).match
+    cells = []
+    pos = 0
+    length = len(record)
+    while True:
+        m = match(record, pos)
+        end = m.end()
+        cells.append(_unquote_field(record[pos:end], quote))
+        if end >= length:
+            return cells
+        if record[end] != delimiter:
+            # незакрытая кавычка - разбираем остаток посимвольно
+            tail = parse_csv_line(record[pos:], delimiter, quote)
+            cells[-1:] = tail
+            return cells
+        pos = end + 1
+        if pos == length:
+            cells.append(u"")
+            return cells
+
+
+def iter_csv_records(lines, quote='"'):
+    """
+    Склеивает физические строки в логические CSV-записи.
+
+    Состояние автомата - чётность числа кавычек: пока она нечётная, мы
+    внутри поля в кавычках и перевод строки принадлежит значению ячейки.
+    Пустые записи пропускаются.
+    """
+    pending = []
+    in_quotes = False
+    for line in lines:
+        if line.count(quote) % 2:
+            in_quotes = not in_quotes
+        if in_quotes:
+            pending.append(line)
+            continue
+        if pending:
+            pending.append(line)
+            line = u"".join(pending)
+            pending = []
+        record = line.rstrip(u"\r\n")
+        if record.strip():
+            yield record
+
+    if pending:
+        record = u"".join(pending).rstrip(u"\r\n")
+        if record.strip():
+            yield record
+
+
+def iter_csv_stream(stream, delimiter=",", quote='"'):
+    """Разбирает текстовый поток (открытый с newline='') в строки-списки."""
+    for record in iter_csv_records(stream, quote):
+        yield split_csv_record(record, delimiter, quote)
+
+
+def parse_csv_text(text, delimiter=",", quote='"'):
+    """Разбирает весь декодированный CSV-текст, возвращает список строк."""
+    return list(iter_csv_stream(io.StringIO(text, newline=u""), delimiter, quote))
+
+
+def iter_csv_rows(csv_path, delimiter=",", timer=None):
+    """
+    Потоково читает CSV-файл и отдаёт распарсенные строки (списки ячеек).
+    Ячейки в кавычках могут содержать переводы строк и "". Строки из одних
+    пустых ячеек (разделители групп) пропускаются - как в tablesource.
+    timer (timing.StageTimer) - время чтения/декодирования строк файла
+    идёт в стадию "decode".
+    """
+    enc = detect_csv_encoding(csv_path)
+    if not enc:
+        raise IOError("Could not read CSV: {}".format(csv_path))
+
+    with io.open(csv_path, 'r', encoding=enc, errors='replace', newline='') as f:
+        lines = f if timer is None else timer.time_iter(f, "decode")
+        for row in iter_csv_stream(lines, delimiter):
+            if any(cell.strip() for cell in row):
+                yield row
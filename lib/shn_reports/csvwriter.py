@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""
+CSV report writer (sink for pipeline.feed_rows).
+
+Writes the schedule the way Revit's export does with DoubleQuote text
+qualifier: every cell quoted, CRLF line ends. UTF-8 with BOM, so Excel
+opens Hebrew / Cyrillic text correctly and csvreader detects it at once.
+"""
+
+import io
+import os
+
+from shn_reports.textutil import to_text
+
+
+def quote_csv_cell(value, quote=u'"'):
+    return quote + to_text(value).replace(quote, quote + quote) + quote
+
+
+class CsvWriter(object):
+    """Потоковая запись CSV: write_header(header) -> write_row(row)... -> close()."""
+
+    def __init__(self, csv_path, delimiter=u",", encoding='utf-8-sig'):
+        self.csv_path = csv_path
+        self.delimiter = delimiter
+        self.row_count = 0
+        self._file = io.open(csv_path, 'w', encoding=encoding, newline=u'')
+
+    def _write(self, cells):
+        self._file.write(self.delimiter.join(quote_csv_cell(c) for c in cells) + u"\r\n")
+
+    def write_header(self, header):
+        self._write(header)
+
+    def write_row(self, row):
+        self._write(row)
+        self.row_count += 1
+
+    def close(self):
+        self._file.close()
+
+    def discard(self):
+        try:
+            self._file.close()
+        except Exception:
+            pass
+        try:
+            os.remove(self.csv_path)
+        except OSError:
+            pass
@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+"""
+Row-level diff between two BOQ exports.
+
+Rows are matched by key columns (e.g. Family + Type). The previous export
+is loaded into a dict key -> row once, then every new row is looked up and
+popped, so the whole diff is O(old + new). Rows with a repeated key are
+matched by occurrence (1st with 1st, 2nd with 2nd ...). Columns are
+matched by header name, so added / removed columns do not shift values.
+The key is resolved against both headers: if either export lacks a key
+column, both sides are matched by the whole row (old rows aligned to the
+new columns).
+"""
+
+import io
+import json
+import time
+
+from shn_reports.htmlreport import find_column
+from shn_reports.textutil import html_escape, text_type, to_text
+
+
+def _norm(value):
+    return to_text(value).strip()
+
+
+class RowDiffer(object):
+    """
+    Ключевой diff: RowDiffer(old_rows, keys) -> set_header(h) -> add(row)... -> finish().
+    old_rows - итератор строк предыдущей выгрузки (первая строка - заголовок);
+    строки читаются сразу, файл можно закрыть.
+    """
+
+    def __init__(self, old_rows, key_columns):
+        self.key_columns = list(key_columns or [])
+        old_rows = iter(old_rows)
+        self.old_header = [_norm(h) for h in (next(old_rows, None) or [])]
+        self.header = []
+        self.added = []
+        self.changed = []
+        self.unchanged = 0
+        # индекс по ключу строится в set_header, когда известны оба заголовка
+        self._old_rows = [[_norm(c) for c in row] for row in old_rows]
+        self._old = None
+        self._seen = {}
+
+    def _key_indexes(self):
+        """(индексы ключа в старом, в новом заголовке) или (None, None)."""
+        old = [find_column(self.old_header, name) for name in self.key_columns]
+        new = [find_column(self.header, name) for name in self.key_columns]
+        if not self.key_columns or -1 in old or -1 in new:
+            return None, None  # ключа нет хотя бы с одной стороны - ключом служит вся строка
+        return old, new
+
+    def _row_key(self, values, key_indexes):
+        if key_indexes is None:
+            width = len(self.header)
+            return tuple(values) + (u"",) * (width - len(values))
+        return tuple(values[i] if i < len(values) else u"" for i in key_indexes)
+
+    @staticmethod
+    def _occurrence_key(key, seen):
+        n = seen.get(key, 0)
+        seen[key] = n + 1
+        return key + (n,)
+
+    def set_header(self, header):
+        self.header = [_norm(h) for h in header]
+        # индекс колонки старой выгрузки для каждой колонки новой (или -1)
+        old_pos = dict((name, i) for i, name in enumerate(self.old_header))
+        self._old_index = [old_pos.get(name, -1) for name in self.header]
+        self._same_layout = self.header == self.old_header
+
+        old_keys, self._new_keys = self._key_indexes()
+        self._old = {}
+        seen = {}
+        for index, values in enumerate(self._old_rows):
+            if old_keys is None:
+                key = self._row_key(self._align_old(values), None)
+            else:
+                key = self._row_key(values, old_keys)
+            self._old[self._occurrence_key(key, seen)] = (index, values)
+        self._old_rows = None
+        self._seen = {}
+
+    def _align_old(self, old_values):
+        if self._same_layout:
+            return old_values
+        return [old_values[i] if 0 <= i < len(old_values) else u""
+                for i in self._old_index]
+
+    def add(self, row):
+        values = [_norm(c) for c in row]
+        key = self._occurrence_key(self._row_key(values, self._new_keys), self._seen)
+        old = self._old.pop(key, None)
+        if old is None:
+            self.added.append(values)
+            return
+
+        old_values = self._align_old(old[1])
+        width = max(len(values), len(old_values))
+        changed_cols = [i for i in range(width)
+                        if (values[i] if i < len(values) else u"") !=
+                           (old_values[i] if i < len(old_values) else u"")]
+        if changed_cols:
+            self.changed.append((key[:-1], old_values, values, changed_cols))
+        else:
+            self.unchanged += 1
+
+    def finish(self):
+        """Возвращает словарь с результатом (оставшиеся старые строки = удалённые)."""
+        if self._old is None:
+            self.set_header(self.old_header)  # новых строк не было вовсе
+        removed = [self._align_old(values) for _, values in
+                   sorted(self._old.values(), key=lambda item: item[0])]
+        self._old = {}
+
+        def col_name(i):
+            return self.header[i] if i < len(self.header) else u"#{}".format(i + 1)
+
+        return {
+            "key_columns": self.key_columns if self._new_keys is not None else [],
+            "header": self.header,
+            "removed_columns": [h for h in self.old_header if h and h not in self.header],
+            "added_columns": [h for h in self.header if h and h not in self.old_header],
+            "summary": {
+                "added": len(self.added),
+                "removed": len(removed),
+                "changed": len(self.changed),
+                "unchanged": self.unchanged,
+            },
+            "added": self.added,
+            "removed": removed,
+            "changed": [
+                {
+                    "key": list(key),
+                    "row": new_values,
+                    # [индекс колонки, имя колонки, старое значение, новое значение]
+                    "changes": [[i, col_name(i),
+                                 old_values[i] if i < len(old_values) else u"",
+                                 new_values[i] if i < len(new_values) else u""]
+                                for i in cols],
+                }
+                for key, old_values, new_values, cols in self.changed
+            ],
+        }
+
+
+def diff_rows(old_rows, new_rows, key_columns):
+    """Diff двух итераторов строк (первая строка каждого - заголовок)."""
+    new_rows = iter(new_rows)
+    differ = RowDiffer(old_rows, key_columns)
+    differ.set_header(next(new_rows, None) or [])
+    for row in new_rows:
+        differ.add(row)
+    return differ.finish()
+
+
+# ---------- DELTA REPORT ----------
+
+DELTA_STYLE = u"""
+        body { font-family: Arial, sans-serif; padding: 20px; background-color: #fff; }
+        h2 { text-align: center; margin-bottom: 5px; color: #333; }
+        h3 { margin: 25px 0 8px 0; color: #333; }
+        p.info { text-align: center; color: gray; font-size: 12px; margin-top: 0; margin-bottom: 20px; }
+        .summary { text-align: center; font-size: 14px; margin-bottom: 10px; }
+        .summary span { margin: 0 10px; }
+        table { width: 100%; border-collapse: collapse; font-size: 12px; }
+        th, td { border: 1px solid #dddddd; padding: 6px 10px; text-align: left; vertical-align: top; }
+        th { background-color: #009879; color: #ffffff; }
+        tr.added td { background-color: #e8f8ec; }
+        tr.removed td { background-color: #fdecea; color: #777; }
+        td.changed { background-color: #fff3c4; font-weight: bold; }
+        td.changed del { color: #b00020; font-weight: normal; margin-right: 6px; }
+"""
+
+
+def _table_head(header):
+    return u"<table><thead><tr>" + u"".join(
+        u"<th>" + (html_escape(h) or u"&nbsp;") + u"</th>" for h in header) + u"</tr></thead><tbody>\n"
+
+
+def _plain_row(css_class, values, width):
+    cells = [html_escape(values[i]) if i < len(values) else u"" for i in range(width)]
+    return u'<tr class="' + css_class + u'">' + u"".join(
+        u"<td>" + (c or u"&nbsp;") + u"</td>" for c in cells) + u"</tr>\n"
+
+
+def write_delta_html(html_path, delta, title, model_title, previous_date=u""):
+    header = delta["header"]
+    width = len(header)
+    summary = delta["summary"]
+
+    with io.open(html_path, 'w', encoding='utf-8') as f:
+        f.write(u'<!DOCTYPE html>\n<html>\n<head>\n    <meta charset="utf-8">\n    <style>' +
+                DELTA_STYLE + u'    </style>\n</head>\n<body>\n')
+        f.write(u'    <h2>' + html_escape(title) + u' - changes since last sync</h2>\n')
+        f.write(u'    <p class="info">Model: ' + html_escape(model_title) +
+                u' | Date: ' + html_escape(time.strftime("%Y-%m-%d %H:%M")) +
+                (u' | Previous: ' + html_escape(previous_date) if previous_date else u"") +
+                u' | Key: ' + html_escape(u" + ".join(delta["key_columns"]) or u"whole row") +
+                u'</p>\n')
+        f.write(u'    <div class="summary"><span>Added: <b>{added}</b></span>'
+                u'<span>Removed: <b>{removed}</b></span>'
+                u'<span>Changed: <b>{changed}</b></span>'
+                u'<span>Unchanged: {unchanged}</span></div>\n'.format(**summary))
+        if delta["added_columns"] or delta["removed_columns"]:
+            f.write(u'    <p class="info">Columns added: ' +
+                    html_escape(u", ".join(delta["added_columns"]) or u"-") +
+                    u' | Columns removed: ' +
+                    html_escape(u", ".join(delta["removed_columns"]) or u"-") + u'</p>\n')
+
+        if delta["changed"]:
+            f.write(u'    <h3>Changed rows</h3>\n' + _table_head(header))
+            for item in delta["changed"]:
+                old_by_col = dict((c[0], c[2]) for c in item["changes"])
+                parts = [u'<tr>']
+                for i in range(width):
+                    value = item["row"][i] if i < len(item["row"]) else u""
+                    if i in old_by_col:
+                        parts.append(u'<td class="changed"><del>' + html_escape(old_by_col[i]) +
+                                     u'</del>' + html_escape(value) + u'</td>')
+                    else:
+                        parts.append(u'<td>' + (html_escape(value) or u"&nbsp;") + u'</td>')
+                parts.append(u'</tr>\n')
+                f.write(u"".join(parts))
+            f.write(u'</tbody></table>\n')
+
+        if delta["added"]:
+            f.write(u'    <h3>Added rows</h3>\n' + _table_head(header))
+            for values in delta["added"]:
+                f.write(_plain_row(u"added", values, width))
+            f.write(u'</tbody></table>\n')
+
+        if delta["removed"]:
+            f.write(u'    <h3>Removed rows</h3>\n' + _table_head(header))
+            for values in delta["removed"]:
+                f.write(_plain_row(u"removed", values, width))
+            f.write(u'</tbody></table>\n')
+
+        if not (delta["changed"] or delta["added"] or delta["removed"]):
+            f.write(u'    <p class="info">No row changes.</p>\n')
+
+        f.write(u'</body></html>')
+
+
+def write_delta_json(json_path, delta, **info):
+    data = dict(info)
+    data.update(delta)
+    text = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    with io.open(json_path, 'w', encoding='utf-8') as f:
+        f.write(text_type(text))
+
+
+class BoqDiffWriter(object):
+    """
+    Sink для pipeline.feed_rows: сравнивает новые строки с предыдущей
+    выгрузкой и на close() пишет delta HTML + JSON.
+    keep_delta=True оставляет полный результат diff в .delta (для истории).
+    """
+
+    def __init__(self, old_rows, key_columns, html_path, json_path,
+                 title, model_title, previous_date=u"", keep_delta=False):
+        self.differ = RowDiffer(old_rows, key_columns)
+        self.html_path = html_path
+        self.json_path = json_path
+        self.title = title
+        self.model_title = model_title
+        self.previous_date = previous_date
+        self.keep_delta = keep_delta
+        self.summary = None
+        self.delta = None
+
+    def write_header(self, header):
+        self.differ.set_header(header)
+
+    def write_row(self, row):
+        self.differ.add(row)
+
+    def close(self):
+        delta = self.differ.finish()
+        self.summary = delta["summary"]
+        if self.keep_delta:
+            self.delta = delta
+        write_delta_json(self.json_path, delta,
+                         schedule=self.title, model=self.model_title,
+                         previous_generated=self.previous_date,
+                         generated_at=time.strftime("%Y-%m-%d %H:%M:%S"))
+        write_delta_html(self.html_path, delta, self.title, self.model_title,
+                         self.previous_date)
+
+    def discard(self):
+        self.differ = None
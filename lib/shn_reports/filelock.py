@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""
+Lock files shared by separate pyRevit engines and machines.
+
+The lock is a file created with O_EXCL (atomic on local disks and SMB
+shares). A lock older than stale_s is treated as abandoned - Revit may
+have been closed in the middle of the locked work.
+"""
+
+import os
+import time
+
+
+def acquire_lock(lock_path, stale_s, timeout_s=0.0, poll_s=0.2):
+    """Создаёт lock-файл. Возвращает True, если блокировка получена."""
+    deadline = time.time() + timeout_s
+    while True:
+        try:
+            if time.time() - os.path.getmtime(lock_path) > stale_s:
+                os.remove(lock_path)
+        except OSError:
+            pass
+        try:
+            os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except OSError:
+            if time.time() >= deadline:
+                return False
+        time.sleep(poll_s)
+
+
+def release_lock(lock_path):
+    try:
+        os.remove(lock_path)
+    except OSError:
+        pass
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+Waiting for a file written by another component (e.g. Revit schedule Export).
+
+The file is ready as soon as it can be opened exclusively (the writer has
+closed it). Where an exclusive open cannot be tested (no .NET), the file
+is ready once its size stays the same between two checks. Checks are
+repeated with short exponential backoff up to a deadline.
+"""
+
+import os
+import time
+
+try:
+    from System.IO import File, FileMode, FileAccess, FileShare
+    SHARE_NONE = getattr(FileShare, "None")  # "None" - ключевое слово в Python 3
+except ImportError:  # CPython: нет .NET, остаётся только проверка размера
+    File = None
+
+
+def try_exclusive_open(path):
+    """True/False - удалось ли открыть файл без общего доступа; None - проверить нельзя."""
+    if File is None:
+        return None
+    try:
+        File.Open(path, FileMode.Open, FileAccess.Read, SHARE_NONE).Dispose()
+        return True
+    except Exception:
+        return False
+
+
+def wait_for_file(path, deadline_s=5.0, first_delay_s=0.01, max_delay_s=0.25,
+                  exclusive_open=try_exclusive_open):
+    """
+    Ждёт готовности файла. Возвращает (ready, waited_s).
+    """
+    started = time.time()
+    delay = first_delay_s
+    last_size = None
+
+    while True:
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = None
+
+        if size is not None:
+            exclusive = exclusive_open(path)
+            if exclusive:
+                return True, time.time() - started
+            if exclusive is None and size > 0 and size == last_size:
+                return True, time.time() - started
+        last_size = size
+
+        elapsed = time.time() - started
+        if elapsed >= deadline_s:
+            return False, elapsed
+        time.sleep(min(delay, max_delay_s, deadline_s - elapsed))
+        delay *= 2
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+Report freshness of a model / project, read from what the sync hook
+already writes to the server:
+
+    <model folder>\\SHN_Reports_sync_log.jsonl   one record per sync job
+    <model folder>\\SHN_Reports_status.json      last record of the model
+
+Only the tail of the sync log is read (the file grows forever), and
+only the small status file of every other model in the project.
+FreshnessCache keeps the results for the Revit session, so reopening
+the panel does not touch the share again until ttl_s has passed.
+"""
+
+import io
+import json
+import os
+import threading
+import time
+
+from shn_reports.jsonfile import read_json
+
+LOG_TAIL_RECORDS = 50
+LOG_TAIL_BYTES = 256 * 1024
+
+# Суммарные / служебные поля записи sync - не стадии
+NOT_STAGES = frozenset(["api_thread_s", "duration_s", "total_s", "queued_s", "deferred_s",
+                        "build_s", "read_s"])
+
+
+def tail_log_records(log_path, limit=LOG_TAIL_RECORDS, max_bytes=LOG_TAIL_BYTES):
+    """Последние limit записей JSON-lines лога (читается только хвост файла)."""
+    if not os.path.isfile(log_path):
+        return []
+    with io.open(log_path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(max(0, size - max_bytes))
+        data = f.read()
+    lines = data.split(b"\n")
+    if size > max_bytes:
+        lines = lines[1:]  # первая строка обрезана посередине
+    records = []
+    for line in lines[-(limit + 1):]:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            records.append(json.loads(line.decode('utf-8')))
+        except ValueError:
+            continue
+    return records[-limit:]
+
+
+def _is_ok(record):
+    return record.get("result") == "ok"
+
+
+def _stage_seconds(record):
+    """{стадия_s: секунды} задания: стадии всех спецификаций складываются."""
+    stages = {}
+    for item in [record] + list(record.get("schedules") or []):
+        for key, value in item.items():
+            if key.endswith("_s") and key not in NOT_STAGES and \
+                    isinstance(value, (int, float)):
+                stages[key] = stages.get(key, 0.0) + value
+    return stages
+
+
+def summarize_records(records):
+    """
+    Сводка по записям лога (старые первыми): последний успешный экспорт,
+    тренд длительности, пропущенные / перегенерированные спецификации,
+    самая медленная стадия (в среднем по заданиям).
+    """
+    summary = {
+        "syncs": len(records),
+        "last_sync": None,
+        "last_result": None,
+        "last_success": None,
+        "errors": 0,
+        "skipped": 0,
+        "regenerated": 0,
+        "trend": [],            # [(finished, total_s, regenerated, skipped, result)]
+        "slowest_stage": None,  # (имя, средние секунды)
+    }
+    stage_totals = {}
+    jobs = 0
+    for record in records:
+        finished = record.get("finished")
+        summary["last_sync"] = finished
+        summary["last_result"] = record.get("result")
+        if _is_ok(record):
+            summary["last_success"] = finished
+        elif record.get("result"):
+            summary["errors"] += 1
+        decisions = [s.get("decision") for s in record.get("schedules") or []]
+        skipped = decisions.count("skipped")
+        regenerated = decisions.count("regenerated")
+        summary["skipped"] += skipped
+        summary["regenerated"] += regenerated
+        summary["trend"].append((finished, record.get("total_s"), regenerated, skipped,
+                                 record.get("result")))
+        if record.get("schedules") is not None:
+            jobs += 1
+            for name, seconds in _stage_seconds(record).items():
+                stage_totals[name] = stage_totals.get(name, 0.0) + seconds
+    if stage_totals:
+        name = max(stage_totals, key=lambda k: stage_totals[k])
+        summary["slowest_stage"] = (name[:-2], stage_totals[name] / jobs)
+    return summary
+
+
+def duration_change(trend, window=5):
+    """Средняя длительность последних window заданий против предыдущих window (или None)."""
+    values = [t[1] for t in trend if isinstance(t[1], (int, float))]
+    if len(values) < 2:
+        return None
+    recent = values[-window:]
+    before = values[-2 * window:-window] or values[:1]
+    return sum(recent) / len(recent), sum(before) / len(before)
+
+
+def model_freshness(model_folder, log_name, status_name):
+    summary = summarize_records(tail_log_records(os.path.join(model_folder, log_name)))
+    if summary["last_sync"] is None:
+        # лога ещё нет (или он недоступен) - хотя бы последний статус
+        status = read_json(os.path.join(model_folder, status_name), default=None)
+        if status:
+            summary = summarize_records([status])
+    return summary
+
+
+def project_freshness(project_folder, status_name):
+    """[(модель, статус последнего задания)] по всем моделям проекта."""
+    models = []
+    if not os.path.isdir(project_folder):
+        return models
+    for name in sorted(os.listdir(project_folder), key=lambda n: n.lower()):
+        path = os.path.join(project_folder, name, status_name)
+        if not os.path.isfile(path):
+            continue
+        status = read_json(path, default=None)
+        if status:
+            models.append((name, status))
+    return models
+
+
+class FreshnessCache(object):
+    """Результаты загрузки по ключу (папка модели) на ttl_s секунд."""
+
+    def __init__(self, ttl_s=60.0):
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._items = {}  # key -> (loaded_at, value)
+
+    def get(self, key, load):
+        """(значение, loaded_at); load() вызывается, только если кэш устарел."""
+        with self._lock:
+            item = self._items.get(key)
+        if item is not None and time.time() - item[0] <= self.ttl_s:
+            return item[1], item[0]
+        value = load()
+        loaded_at = time.time()
+        with self._lock:
+            self._items[key] = (loaded_at, value)
+        return value, loaded_at
+
+    def forget(self, key=None):
+        with self._lock:
+            if key is None:
+                self._items.clear()
+            else:
+                self._items.pop(key, None)
@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+"""
+Append-only snapshot history of a schedule.
+
+Every regenerated report adds one small segment file (gzip'd JSON lines)
+to the history folder of the schedule; existing segments are never
+rewritten, so several users syncing the same model only ever add files.
+A segment is either a full snapshot or only the rows that changed since
+the previous segment:
+
+    {"kind": "full" | "delta", "content_hash": ..., "base_hash": ...,
+     "generated_at": ..., "header": [...], ...}   <- first line
+    ["+", row]            added row
+    ["-", row]            removed row
+    ["~", old_row, row]   changed row
+    {"rows": N}           last line of a full snapshot (rows are streamed,
+                          the count is only known at the end)
+
+A delta is only valid on top of the snapshot with content_hash ==
+base_hash. The writer starts a new full snapshot when it can not
+guarantee that (different base, new columns) and every FULL_EVERY deltas,
+so a past snapshot is rebuilt from the last full segment plus a few
+deltas instead of reading every export. sqlite3 is not available in
+IronPython, hence plain files.
+"""
+
+import gzip
+import json
+import os
+import re
+import time
+
+from shn_reports.htmlreport import find_column
+from shn_reports.textutil import text_type, to_text
+
+SEGMENT_SUFFIX = ".jsonl.gz"
+SEGMENT_NAME_RE = re.compile(r"^\d{8}_\d{6}_[0-9a-f]{8}\.jsonl\.gz$")
+FULL_EVERY = 20
+
+
+def _norm(value):
+    return to_text(value).strip()
+
+
+def segment_file_name(content_hash, now=None):
+    """Имена сортируются по времени: 20240131_154500_<hash8>.jsonl.gz"""
+    now = time.time() if now is None else now
+    return u"{}_{}{}".format(time.strftime("%Y%m%d_%H%M%S", time.localtime(now)),
+                             content_hash[:8], SEGMENT_SUFFIX)
+
+
+def is_segment_name(name):
+    """True для имён segment_file_name() (а не, например, сжатых логов)."""
+    return SEGMENT_NAME_RE.match(name) is not None
+
+
+class _SegmentWriter(object):
+
+    def __init__(self, path, meta):
+        self.path = path
+        self._raw = open(path, 'wb')
+        self._gz = gzip.GzipFile(fileobj=self._raw, mode='wb')
+        self._write(meta)
+
+    def _write(self, item):
+        line = text_type(json.dumps(item, ensure_ascii=False, separators=(',', ':')))
+        self._gz.write((line + u"\n").encode('utf-8'))
+
+    def add(self, row):
+        self._write([u"+", row])
+
+    def remove(self, row):
+        self._write([u"-", row])
+
+    def change(self, old_row, row):
+        self._write([u"~", old_row, row])
+
+    def trailer(self, info):
+        self._write(info)
+
+    def close(self):
+        self._gz.close()
+        self._raw.close()
+
+
+def write_full_segment(path, rows, meta):
+    """
+    Полный снимок из итератора строк (первая строка - заголовок), потоком:
+    в памяти одна строка. Число строк - последней записью. Возвращает его.
+    """
+    rows = iter(rows)
+    header = [_norm(h) for h in (next(rows, None) or [])]
+    info = dict(meta)
+    info.update({"kind": "full", "header": header})
+    writer = _SegmentWriter(path, info)
+    count = 0
+    try:
+        for row in rows:
+            writer.add([_norm(c) for c in row])
+            count += 1
+        writer.trailer({"rows": count})
+    finally:
+        writer.close()
+    return count
+
+
+def write_delta_segment(path, delta, meta):
+    """
+    Дельта из результата diff.RowDiffer.finish() (та же раскладка колонок,
+    что у базового снимка). Возвращает число записанных операций.
+    """
+    info = dict(meta)
+    info.update({"kind": "delta", "header": delta["header"], "summary": delta["summary"]})
+    writer = _SegmentWriter(path, info)
+    count = 0
+    try:
+        for row in delta["removed"]:
+            writer.remove(row)
+            count += 1
+        for item in delta["changed"]:
+            new_row = item["row"]
+            old_row = list(new_row)
+            for index, _name, old, _new in item["changes"]:
+                while len(old_row) <= index:
+                    old_row.append(u"")
+                old_row[index] = old
+            writer.change(old_row, new_row)
+            count += 1
+        for row in delta["added"]:
+            writer.add(row)
+            count += 1
+    finally:
+        writer.close()
+    return count
+
+
+# ---------- ЧТЕНИЕ ----------
+
+def _iter_lines(path):
+    with gzip.open(path, 'rb') as gz:
+        for line in gz:
+            line = line.strip()
+            if line:
+                yield json.loads(line.decode('utf-8'))
+
+
+def read_segment_meta(path):
+    """Первая строка сегмента (без чтения строк данных и итоговой записи)."""
+    for item in _iter_lines(path):
+        return item
+    return None
+
+
+def list_segments(history_folder):
+    """[(путь, meta)] в порядке записи; битые файлы пропускаются."""
+    result = []
+    if not os.path.isdir(history_folder):
+        return result
+    for name in sorted(os.listdir(history_folder)):
+        if not name.endswith(SEGMENT_SUFFIX):
+            continue
+        path = os.path.join(history_folder, name)
+        try:
+            meta = read_segment_meta(path)
+        except Exception:
+            continue
+        if meta:
+            result.append((path, meta))
+    return result
+
+
+def _chain(segments, until=None):
+    """
+    Сегменты, из которых собирается последний снимок (или снимок на момент
+    until - строка "YYYY-mm-dd HH:MM:SS"): последний полный + его дельты.
+    """
+    if until is not None:
+        segments = [s for s in segments if s[1].get("generated_at", u"") <= until]
+    start = None
+    for i, (_path, meta) in enumerate(segments):
+        if meta.get("kind") == "full":
+            start = i
+    if start is None:
+        return []
+    chain = [segments[start]]
+    current = segments[start][1].get("content_hash")
+    for path, meta in segments[start + 1:]:
+        if meta.get("base_hash") == current:
+            chain.append((path, meta))
+            current = meta.get("content_hash")
+    return chain
+
+
+class _Snapshot(object):
+    """Список строк с индексом по содержимому (дубликаты - по порядку)."""
+
+    def __init__(self):
+        self.rows = []
+        self._positions = {}
+        self.conflicts = 0
+
+    def add(self, row):
+        self._positions.setdefault(tuple(row), []).append(len(self.rows))
+        self.rows.append(row)
+
+    def _take(self, row):
+        positions = self._positions.get(tuple(row))
+        if not positions:
+            self.conflicts += 1
+            return None
+        return positions.pop(0)
+
+    def remove(self, row):
+        index = self._take(row)
+        if index is not None:
+            self.rows[index] = None
+
+    def change(self, old_row, row):
+        index = self._take(old_row)
+        if index is None:
+            self.add(row)
+            return
+        self.rows[index] = row
+        self._positions.setdefault(tuple(row), []).append(index)
+
+    def result(self):
+        return [row for row in self.rows if row is not None]
+
+
+def reconstruct_snapshot(history_folder, until=None):
+    """
+    Восстанавливает снимок спецификации. Возвращает (meta, rows), где
+    rows - список строк с заголовком первой, или (None, []) если истории нет.
+    """
+    chain = _chain(list_segments(history_folder), until)
+    if not chain:
+        return None, []
+    snapshot = _Snapshot()
+    meta = None
+    for path, _meta in chain:
+        for i, item in enumerate(_iter_lines(path)):
+            if isinstance(item, dict):
+                # первая строка - meta сегмента, итоговая ({"rows"}) дополняет её
+                meta = item if i == 0 else dict(meta, **item)
+                continue
+            op = item[0]
+            if op == u"+":
+                snapshot.add(item[1])
+            elif op == u"-":
+                snapshot.remove(item[1])
+            elif op == u"~":
+                snapshot.change(item[1], item[2])
+    meta = dict(meta)
+    meta["conflicts"] = snapshot.conflicts
+    return meta, [meta["header"]] + snapshot.result()
+
+
+def _quantity(row, index):
+    if index is None:
+        return 1.0
+    try:
+        return float(row[index].replace(u",", u"."))
+    except (IndexError, ValueError):
+        return 0.0
+
+
+def quantity_trend(history_folder, group_column=u"Family", quantity_column=u"Count"):
+    """
+    Тренд количества по группам через всю историю, без восстановления
+    снимков: итоги считаются прямо из операций сегментов.
+    quantity_column=None - считать строки.
+    Возвращает [(generated_at, {группа: количество})] по одному на сегмент.
+    """
+    trend = []
+    totals = {}
+    current = None
+    group_index = quantity_index = None
+    for path, meta in list_segments(history_folder):
+        kind = meta.get("kind")
+        if kind == "full":
+            totals = {}
+            header = meta.get("header") or []
+            group_index = find_column(header, group_column)
+            quantity_index = (find_column(header, quantity_column)
+                              if quantity_column else None)
+            if group_index < 0 or quantity_index == -1:
+                current = None
+                continue
+        elif current is None or meta.get("base_hash") != current:
+            continue  # разрыв цепочки - ждём следующий полный снимок
+
+        for item in _iter_lines(path):
+            if isinstance(item, dict):
+                continue
+            op = item[0]
+            if op in (u"-", u"~"):
+                row = item[1]
+                group = row[group_index] if group_index < len(row) else u""
+                totals[group] = totals.get(group, 0.0) - _quantity(row, quantity_index)
+            if op in (u"+", u"~"):
+                row = item[-1]
+                group = row[group_index] if group_index < len(row) else u""
+                totals[group] = totals.get(group, 0.0) + _quantity(row, quantity_index)
+
+        current = meta.get("content_hash")
+        trend.append((meta.get("generated_at"),
+                      dict((k, v) for k, v in totals.items() if abs(v) > 1e-9)))
+    return trend
@@ -0,0 +1,488 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming CSV -> HTML writer for the BOQ report.
+
+The data is not written as table rows. It is embedded as a compact JSON
+column store, in chunks of CHUNK_ROWS rows, each chunk column-major in a
+<script type="application/json"> block. Family / Category cells are stored
+as integer codes into per-column dictionaries that are written at the end
+together with the header and column width hints.
+
+In the browser the script builds a value -> row bitmap for every filter
+value once, so a checkbox click is a bitwise OR / AND over the bitmaps,
+and the table is virtual-scrolled: only the rows in the viewport are in
+the DOM. On the Python side memory is bounded by one chunk plus the
+filter dictionaries.
+"""
+
+import io
+import json
+import time
+
+from shn_reports.textutil import html_escape, text_type, to_text
+
+WRITE_BUFFER_SIZE = 1024 * 1024
+CHUNK_ROWS = 2000
+MIN_COLUMN_CHARS = 4
+MAX_COLUMN_CHARS = 40
+
+HTML_HEAD = u"""<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <style>
+        body { font-family: Arial, sans-serif; padding: 20px; background-color: #fff; margin: 0; }
+        h2 { text-align: center; margin-bottom: 5px; color: #333; }
+        p.info { text-align: center; color: gray; font-size: 12px; margin-top: 0; margin-bottom: 20px; }
+        .table-scroll {
+            height: calc(100vh - 190px);
+            min-height: 300px;
+            overflow: auto;
+            box-shadow: 0 0 20px rgba(0, 0, 0, 0.15);
+        }
+        table.data-table {
+            border-collapse: collapse;
+            table-layout: fixed;
+            font-size: 12px;
+        }
+        th, td {
+            border: 1px solid #dddddd;
+            padding: 0 12px;
+            height: 30px;
+            text-align: left;
+            white-space: nowrap;
+            overflow: hidden;
+            text-overflow: ellipsis;
+        }
+        th {
+            background-color: #009879;
+            color: #ffffff;
+            font-weight: bold;
+            position: sticky; top: 0;
+            z-index: 1;
+        }
+        tr.even td { background-color: #f3f3f3; }
+        tbody tr:hover td { background-color: #e6f4f1; }
+        tr.spacer td { border: none; padding: 0; height: auto; background: none; }
+
+        .filter-bar { margin: 10px 0 15px 0; }
+        .row-count { float: right; font-size: 12px; color: gray; line-height: 28px; }
+        .dropdown { position: relative; display: inline-block; margin-right: 10px; }
+        .dropbtn {
+            padding: 6px 10px;
+            border: 1px solid #ccc;
+            background-color: #f8f8f8;
+            cursor: pointer;
+            font-size: 12px;
+        }
+        .dropdown-content {
+            display: none;
+            position: absolute;
+            background-color: #ffffff;
+            min-width: 220px;
+            border: 1px solid #ccc;
+            padding: 8px;
+            box-shadow: 0 2px 8px rgba(0,0,0,0.15);
+            z-index: 100;
+            max-height: 300px;
+            overflow-y: auto;
+        }
+        .dropdown:hover .dropdown-content { display: block; }
+        .dropdown-content label {
+            display: block;
+            font-size: 12px;
+            margin-bottom: 2px;
+            cursor: pointer;
+        }
+        .filter-actions {
+            font-size: 11px;
+            margin-bottom: 4px;
+        }
+        .filter-actions a {
+            cursor: pointer;
+            text-decoration: underline;
+        }
+    </style>
+</head>
+<body>
+"""
+
+HTML_BODY = u"""    <div class="filter-bar"><span class="row-count" id="row-count"></span></div>
+    <div class="table-scroll" id="table-scroll">
+        <table class="data-table">
+            <colgroup id="boq-cols"></colgroup>
+            <thead><tr id="boq-head"></tr></thead>
+            <tbody id="boq-body"></tbody>
+        </table>
+    </div>
+"""
+
+HTML_SCRIPT = u"""
+    <script>
+    document.addEventListener('DOMContentLoaded', function() {
+        var ROW_HEIGHT = 31;   // 30px + граница, должно совпадать с CSS
+        var OVERSCAN = 15;
+
+        var meta = JSON.parse(document.getElementById('boq-meta').textContent);
+        var chunkNodes = document.querySelectorAll('script.boq-chunk');
+        var chunks = [];
+        for (var i = 0; i < chunkNodes.length; i++) {
+            chunks.push(JSON.parse(chunkNodes[i].textContent));
+        }
+
+        var header = meta.header;
+        var total = meta.rows;
+        var chunkRows = meta.chunk_rows;
+        var words = (total + 31) >>> 5;
+
+        // колонка -> словарь значений (для колонок-фильтров ячейки хранятся кодами)
+        var dictByCol = {};
+        for (var f = 0; f < meta.filters.length; f++) {
+            dictByCol[meta.filters[f].column] = meta.filters[f].values;
+        }
+
+        function cellValue(row, col) {
+            var chunk = chunks[(row / chunkRows) | 0];
+            var column = chunk[col];
+            if (!column) return '';
+            var v = column[row % chunkRows];
+            if (v === undefined || v === null) return '';
+            var dict = dictByCol[col];
+            return dict ? dict[v] : v;
+        }
+
+        function escapeHtml(s) {
+            return String(s).replace(/&/g, '&amp;').replace(/</g, '&lt;')
+                .replace(/>/g, '&gt;').replace(/"/g, '&quot;');
+        }
+
+        // ---------- ИНДЕКС: значение фильтра -> битовая маска строк ----------
+        var filters = [];
+        for (var f = 0; f < meta.filters.length; f++) {
+            var spec = meta.filters[f];
+            var bitmaps = [];
+            for (var v = 0; v < spec.values.length; v++) {
+                bitmaps.push(new Uint32Array(words));
+            }
+            for (var r = 0; r < total; r++) {
+                var chunk = chunks[(r / chunkRows) | 0];
+                var code = chunk[spec.column] ? chunk[spec.column][r % chunkRows] : null;
+                if (code !== null && code !== undefined) {
+                    bitmaps[code][r >>> 5] |= (1 << (r & 31));
+                }
+            }
+            filters.push({spec: spec, bitmaps: bitmaps, checkboxes: []});
+        }
+
+        // ---------- ПАНЕЛЬ ФИЛЬТРОВ ----------
+        var filterBar = document.querySelector('.filter-bar');
+        filters.forEach(function(flt, fi) {
+            var order = [];
+            for (var v = 0; v < flt.spec.values.length; v++) {
+                if (flt.spec.values[v] !== '') order.push(v);
+            }
+            if (!order.length) return;
+            order.sort(function(a, b) {
+                var x = flt.spec.values[a], y = flt.spec.values[b];
+                return x < y ? -1 : (x > y ? 1 : 0);
+            });
+
+            var html = '<button class="dropbtn">Filter by ' + escapeHtml(flt.spec.name) + '</button>' +
+                '<div class="dropdown-content"><div class="filter-actions">' +
+                '<a data-act="all">Select all</a> | <a data-act="none">Clear all</a></div>';
+            for (var k = 0; k < order.length; k++) {
+                html += '<label><input type="checkbox" value="' + order[k] + '" checked> ' +
+                        escapeHtml(flt.spec.values[order[k]]) + '</label>';
+            }
+            var box = document.createElement('div');
+            box.className = 'dropdown';
+            box.innerHTML = html + '</div>';
+            filterBar.appendChild(box);
+
+            flt.checkboxes = box.querySelectorAll('input[type="checkbox"]');
+            for (var c = 0; c < flt.checkboxes.length; c++) {
+                flt.checkboxes[c].addEventListener('change', applyFilters);
+            }
+            var links = box.querySelectorAll('.filter-actions a');
+            for (var l = 0; l < links.length; l++) {
+                links[l].addEventListener('click', function(e) {
+                    e.preventDefault();
+                    var state = this.getAttribute('data-act') === 'all';
+                    for (var c = 0; c < flt.checkboxes.length; c++) {
+                        flt.checkboxes[c].checked = state;
+                    }
+                    applyFilters();
+                });
+            }
+        });
+
+        // ---------- ТАБЛИЦА ----------
+        var colsHtml = '', headHtml = '';
+        for (var c = 0; c < header.length; c++) {
+            colsHtml += '<col style="width:' + (meta.widths[c] + 3) + 'ch">';
+            headHtml += '<th title="' + escapeHtml(header[c]) + '">' + (escapeHtml(header[c]) || '&nbsp;') + '</th>';
+        }
+        document.getElementById('boq-cols').innerHTML = colsHtml;
+        document.getElementById('boq-head').innerHTML = headHtml;
+
+        var scroller = document.getElementById('table-scroll');
+        var tbody = document.getElementById('boq-body');
+        var rowCount = document.getElementById('row-count');
+        var view = new Int32Array(0);   // индексы видимых (прошедших фильтр) строк
+        var pending = false;
+        var measured = false;
+
+        function applyFilters() {
+            var mask = new Uint32Array(words);
+            for (var w = 0; w < words; w++) mask[w] = 0xFFFFFFFF;
+
+            for (var f = 0; f < filters.length; f++) {
+                var flt = filters[f];
+                var active = [];
+                for (var c = 0; c < flt.checkboxes.length; c++) {
+                    if (flt.checkboxes[c].checked) active.push(+flt.checkboxes[c].value);
+                }
+                if (!active.length) continue;   // ничего не выбрано - фильтр не ограничивает
+
+                var group = new Uint32Array(words);
+                for (var a = 0; a < active.length; a++) {
+                    var bm = flt.bitmaps[active[a]];
+                    for (var w = 0; w < words; w++) group[w] |= bm[w];
+                }
+                for (var w = 0; w < words; w++) mask[w] &= group[w];
+            }
+
+            var result = new Int32Array(total);
+            var n = 0;
+            for (var w = 0; w < words; w++) {
+                var bits = mask[w];
+                while (bits) {
+                    var low = bits & -bits;
+                    var r = (w << 5) + (31 - Math.clz32(low));
+                    if (r < total) result[n++] = r;
+                    bits ^= low;
+                }
+            }
+            view = result.subarray(0, n);
+            rowCount.textContent = 'Rows: ' + n + ' of ' + total;
+            scroller.scrollTop = 0;
+            render();
+        }
+
+        function render() {
+            pending = false;
+            var first = Math.max(0, Math.floor(scroller.scrollTop / ROW_HEIGHT) - OVERSCAN);
+            var last = Math.min(view.length,
+                first + Math.ceil(scroller.clientHeight / ROW_HEIGHT) + 2 * OVERSCAN);
+            var span = header.length;
+
+            var html = '<tr class="spacer"><td colspan="' + span + '" style="height:' +
+                       (first * ROW_HEIGHT) + 'px"></td></tr>';
+            for (var i = first; i < last; i++) {
+                var r = view[i];
+                html += (i % 2) ? '<tr class="even">' : '<tr>';
+                for (var c = 0; c < span; c++) {
+                    var text = escapeHtml(cellValue(r, c));
+                    html += '<td title="' + text + '">' + (text || '&nbsp;') + '</td>';
+                }
+                html += '</tr>';
+            }
+            html += '<tr class="spacer"><td colspan="' + span + '" style="height:' +
+                    ((view.length - last) * ROW_HEIGHT) + 'px"></td></tr>';
+            tbody.innerHTML = html;
+
+            // реальная высота строки зависит от браузера/масштаба - меряем один раз
+            if (!measured && last > first) {
+                measured = true;
+                var h = tbody.rows[1].getBoundingClientRect().height;
+                if (h > 0 && Math.abs(h - ROW_HEIGHT) > 0.5) {
+                    ROW_HEIGHT = h;
+                    render();
+                }
+            }
+        }
+
+        scroller.addEventListener('scroll', function() {
+            if (!pending) {
+                pending = true;
+                window.requestAnimationFrame(render);
+            }
+        });
+        window.addEventListener('resize', render);
+
+        applyFilters();
+    });
+    </script>
+"""
+
+
+def find_column(header, column_name):
+    """Индекс колонки по имени (без учёта регистра и пробелов), либо -1."""
+    target = to_text(column_name).strip().lower()
+    if not target:
+        return -1
+    for i, h in enumerate(header):
+        if to_text(h).strip().lower() == target:
+            return i
+    return -1
+
+
+def json_script(data, element_id=None, css_class=None):
+    """<script type="application/json"> с экранированием "</" внутри данных."""
+    text = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    text = text_type(text).replace(u"</", u"<\\/")
+    attrs = u''
+    if element_id:
+        attrs += u' id="' + element_id + u'"'
+    if css_class:
+        attrs += u' class="' + css_class + u'"'
+    return u'    <script type="application/json"' + attrs + u'>' + text + u'</script>\n'
+
+
+class BoqHtmlWriter(object):
+    """
+    Пишет HTML-отчёт построчно в открытый текстовый поток.
+
+    Порядок вызовов: write_header(header) -> write_row(row)... -> close().
+    """
+
+    def __init__(self, stream, title, model_title,
+                 family_column=u"Family", category_column=u"Category",
+                 date_text=None):
+        self.stream = stream
+        self.title = title
+        self.model_title = model_title
+        self.family_column = family_column
+        self.category_column = category_column
+        self.date_text = date_text or time.strftime("%Y-%m-%d %H:%M")
+
+        self.header = []
+        self.widths = []
+        self.row_count = 0
+        # колонка -> (имя фильтра, {значение: код}, [значения по коду])
+        self._filters = {}
+        self._chunk = []
+        self._own_stream = False
+
+    @classmethod
+    def to_file(cls, html_path, *args, **kwargs):
+        """Открывает html_path (буферизованно) и пишет в него; close() закроет файл."""
+        stream = io.open(html_path, 'w', encoding='utf-8', buffering=WRITE_BUFFER_SIZE)
+        writer = cls(stream, *args, **kwargs)
+        writer._own_stream = True
+        return writer
+
+    def write_header(self, header):
+        self.header = [to_text(h).strip() for h in header]
+        self.widths = [len(h) for h in self.header]
+        for name in (self.family_column, self.category_column):
+            index = find_column(self.header, name)
+            if index >= 0 and index not in self._filters:
+                self._filters[index] = (to_text(name), {}, [])
+
+        self.stream.write(u"".join([
+            HTML_HEAD,
+            u'    <h2>', html_escape(self.title), u'</h2>\n',
+            u'    <p class="info">Model: ', html_escape(self.model_title),
+            u' | Date: ', html_escape(self.date_text), u'</p>\n',
+            HTML_BODY,
+        ]))
+
+    def write_row(self, row):
+        values = [to_text(cell).strip() for cell in row]
+        widths = self.widths
+        if len(values) > len(widths):
+            widths.extend([0] * (len(values) - len(widths)))
+        for i, value in enumerate(values):
+            if len(value) > widths[i]:
+                widths[i] = len(value)
+
+        for index, (_, codes, dictionary) in self._filters.items():
+            value = values[index] if index < len(values) else u""
+            code = codes.get(value)
+            if code is None:
+                code = len(dictionary)
+                codes[value] = code
+                dictionary.append(value)
+            if index < len(values):
+                values[index] = code
+            else:
+                values.extend([u""] * (index - len(values)) + [code])
+
+        self._chunk.append(values)
+        self.row_count += 1
+        if len(self._chunk) >= CHUNK_ROWS:
+            self._flush_chunk()
+
+    def _flush_chunk(self):
+        rows = self._chunk
+        if not rows:
+            return
+        width = max(len(r) for r in rows)
+        columns = []
+        for c in range(width):
+            columns.append([r[c] if c < len(r) else u"" for r in rows])
+        self.stream.write(json_script(columns, css_class=u"boq-chunk"))
+        self._chunk = []
+
+    def close(self):
+        self._flush_chunk()
+
+        header = list(self.header)
+        if len(self.widths) > len(header):
+            header.extend([u""] * (len(self.widths) - len(header)))
+        meta = {
+            "header": header,
+            "widths": [min(max(w, MIN_COLUMN_CHARS), MAX_COLUMN_CHARS) for w in self.widths],
+            "rows": self.row_count,
+            "chunk_rows": CHUNK_ROWS,
+            "filters": [{"name": name, "column": index, "values": dictionary}
+                        for index, (name, _, dictionary) in sorted(self._filters.items())],
+        }
+        self.stream.write(json_script(meta, element_id=u"boq-meta"))
+        self.stream.write(HTML_SCRIPT + u"</body></html>")
+        self._filters = {}
+        if self._own_stream:
+            self.stream.close()
+
+    def discard(self):
+        """Закрывает собственный файл без дописывания отчёта."""
+        if self._own_stream:
+            try:
+                self.stream.close()
+            except Exception:
+                pass
+
+
+def write_boq_html(rows, html_path, title, model_title,
+                   family_column=u"Family", category_column=u"Category"):
+    """
+    Записывает HTML-отчёт из итератора строк (первая строка - заголовок).
+    Возвращает количество строк данных.
+    """
+    rows = iter(rows)
+    header = next(rows, None) or [u"NO DATA"]
+
+    writer = BoqHtmlWriter.to_file(html_path, title, model_title,
+                                   family_column, category_column)
+    try:
+        writer.write_header(header)
+        for row in rows:
+            writer.write_row(row)
+    except Exception:
+        writer.discard()
+        raise
+    writer.close()
+    return writer.row_count
+
+
+def write_error_html(html_path, error):
+    """Пишет страницу с текстом ошибки вместо отчёта."""
+    err_html = u"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"></head>
+<body>
+<p style="color:red;">Error while generating HTML from CSV.</p>
+<p>{err}</p>
+</body></html>""".format(err=html_escape(error))
+    with io.open(html_path, 'w', encoding='utf-8') as hf:
+        hf.write(err_html)
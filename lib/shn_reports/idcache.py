@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+Session cache (document, element name) -> element id.
+
+The sync hook looks up the same few schedules by name on every sync. The
+first lookup scans the document; after that the cached ids are checked
+one by one (element still exists, same name) and only names that failed
+the check are scanned again. Names that were not found at all are
+re-scanned at most every rescan_s seconds, so a model without one of the
+configured schedules does not pay for a full scan on each sync.
+
+The cache itself knows nothing about Revit: the caller passes resolve()
+and scan() functions. Keep one instance per Revit session (pyRevit env
+vars), it must only be used from the API thread.
+"""
+
+import time
+
+DEFAULT_RESCAN_S = 10 * 60
+
+
+class NameIdCache(object):
+
+    def __init__(self, rescan_s=DEFAULT_RESCAN_S):
+        self.rescan_s = rescan_s
+        self._ids = {}      # doc_key -> {name: element_id}
+        self._absent = {}   # doc_key -> {name: время последнего поиска}
+        self.hits = 0
+        self.scans = 0
+
+    def lookup(self, doc_key, names, resolve, scan):
+        """
+        Возвращает {имя: элемент} для найденных имён.
+
+        resolve(element_id, name) -> элемент или None, если id больше не
+        подходит (элемент удалён или переименован).
+        scan(names) -> {имя: (element_id, элемент)} - полный проход по документу.
+        """
+        ids = self._ids.setdefault(doc_key, {})
+        absent = self._absent.setdefault(doc_key, {})
+        now = time.time()
+
+        found = {}
+        to_scan = []
+        for name in names:
+            element_id = ids.get(name)
+            element = resolve(element_id, name) if element_id is not None else None
+            if element is not None:
+                found[name] = element
+                self.hits += 1
+            elif element_id is not None:
+                del ids[name]
+                to_scan.append(name)
+            elif now - absent.get(name, 0) >= self.rescan_s:
+                to_scan.append(name)
+
+        if to_scan:
+            self.scans += 1
+            scanned = scan(to_scan)
+            for name in to_scan:
+                if name in scanned:
+                    element_id, element = scanned[name]
+                    ids[name] = element_id
+                    absent.pop(name, None)
+                    found[name] = element
+                else:
+                    absent[name] = now
+        return found
+
+    def forget(self, doc_key):
+        """Сбрасывает кэш документа (например, после закрытия)."""
+        self._ids.pop(doc_key, None)
+        self._absent.pop(doc_key, None)
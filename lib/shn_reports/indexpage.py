@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+index.html of a model report folder: one line per exported schedule with
+links to its HTML / XLSX / CSV / changes reports (relative links, so the
+page works from any mapped drive or UNC path).
+"""
+
+import io
+import time
+
+from shn_reports.textutil import html_escape
+
+INDEX_STYLE = u"""
+        body { font-family: Arial, sans-serif; padding: 20px; background-color: #fff; }
+        h2 { text-align: center; margin-bottom: 5px; color: #333; }
+        p.info { text-align: center; color: gray; font-size: 12px; margin-top: 0; margin-bottom: 20px; }
+        table { margin: 0 auto; border-collapse: collapse; font-size: 13px; min-width: 60%; }
+        th, td { border: 1px solid #dddddd; padding: 8px 12px; text-align: left; }
+        th { background-color: #009879; color: #ffffff; }
+        td.num { text-align: right; }
+        td.links a { margin-right: 12px; }
+        td.error { color: #b00020; }
+        .delta { color: gray; font-size: 12px; }
+"""
+
+
+def _delta_text(delta):
+    if not delta:
+        return u""
+    return u"+{added} / -{removed} / ~{changed}".format(**delta)
+
+
+def write_index_html(html_path, model_title, entries):
+    """
+    entries - список словарей:
+      schedule, rows, generated_at, delta (summary или None), error,
+      links - список (подпись, имя файла).
+    """
+    with io.open(html_path, 'w', encoding='utf-8') as f:
+        f.write(u'<!DOCTYPE html>\n<html>\n<head>\n    <meta charset="utf-8">\n'
+                u'    <title>' + html_escape(model_title) + u' - schedules</title>\n'
+                u'    <style>' + INDEX_STYLE + u'    </style>\n</head>\n<body>\n')
+        f.write(u'    <h2>' + html_escape(model_title) + u'</h2>\n')
+        f.write(u'    <p class="info">Schedules: ' + html_escape(len(entries)) +
+                u' | Updated: ' + html_escape(time.strftime("%Y-%m-%d %H:%M")) + u'</p>\n')
+        f.write(u'    <table><thead><tr><th>Schedule</th><th>Rows</th><th>Generated</th>'
+                u'<th>Changes</th><th>Reports</th></tr></thead><tbody>\n')
+        for entry in entries:
+            error = entry.get("error")
+            if error:
+                links = u'<td class="error">' + html_escape(error) + u'</td>'
+            else:
+                links = u'<td class="links">' + u"".join(
+                    u'<a href="' + html_escape(name) + u'">' + html_escape(label) + u'</a>'
+                    for label, name in entry.get("links") or []) + u'</td>'
+            rows = entry.get("rows")
+            f.write(u'<tr><td>' + html_escape(entry.get("schedule")) + u'</td>'
+                    u'<td class="num">' + (html_escape(rows) if rows is not None else u"-") + u'</td>'
+                    u'<td>' + html_escape(entry.get("generated_at") or u"-") + u'</td>'
+                    u'<td class="delta">' + html_escape(_delta_text(entry.get("delta"))) + u'</td>' +
+                    links + u'</tr>\n')
+        f.write(u'</tbody></table>\n</body></html>')
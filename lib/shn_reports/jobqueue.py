@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+Background job queue for report generation.
+
+One daemon worker thread runs jobs in submission order. Jobs are keyed
+(e.g. by model): submitting a job for a key that is still waiting in the
+queue replaces the waiting one, so several quick syncs of the same model
+collapse into a single report run with the latest data. A job can be
+deferred (not_before); a replacing job brings its own start time.
+
+Jobs must not touch the Revit API - everything they need is captured
+by the caller before submit().
+"""
+
+import threading
+import time
+import traceback
+
+
+class ExportJob(object):
+    """
+    Задание для очереди: run() выполняется в фоне, discard() - если задание
+    вытеснено. not_before - время (time.time()), раньше которого не запускать.
+    """
+
+    def __init__(self, key, run, discard=None, not_before=0.0):
+        self.key = key
+        self.run = run
+        self.discard = discard
+        self.not_before = not_before
+        self.submitted_at = time.time()
+        self.coalesced = 0
+
+
+class CoalescingJobQueue(object):
+
+    def __init__(self, name="SHN report worker"):
+        self.name = name
+        self._cond = threading.Condition()
+        self._order = []      # ключи в порядке постановки
+        self._pending = {}    # key -> ExportJob
+        self._running = None
+        self._thread = None
+        self.last_error = None
+
+    def submit(self, job):
+        """
+        Ставит задание в очередь. Если для того же ключа уже ждёт задание,
+        оно заменяется новым (старое получает discard()).
+        Возвращает True, если произошло слияние.
+        """
+        replaced = None
+        with self._cond:
+            old = self._pending.get(job.key)
+            if old is not None:
+                replaced = old
+                job.coalesced = old.coalesced + 1
+            else:
+                self._order.append(job.key)
+            self._pending[job.key] = job
+            self._ensure_worker()
+            self._cond.notify_all()
+
+        if replaced is not None and replaced.discard:
+            try:
+                replaced.discard()
+            except Exception:
+                pass
+        return replaced is not None
+
+    def pending_count(self):
+        with self._cond:
+            return len(self._pending)
+
+    def is_busy(self):
+        with self._cond:
+            return bool(self._pending) or self._running is not None
+
+    def wait_idle(self, timeout=None):
+        """Ждёт, пока очередь опустеет. Возвращает True, если дождались."""
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            while self._pending or self._running is not None:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def _ensure_worker(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._worker, name=self.name)
+            self._thread.daemon = True
+            self._thread.start()
+
+    def _next_ready(self):
+        """Ключ первого задания, которое уже можно запускать, и сколько ждать остальных."""
+        now = time.time()
+        wait = None
+        for key in self._order:
+            delay = self._pending[key].not_before - now
+            if delay <= 0:
+                return key, None
+            wait = delay if wait is None else min(wait, delay)
+        return None, wait
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while True:
+                    key, wait = self._next_ready()
+                    if key is not None:
+                        break
+                    self._cond.wait(wait)
+                self._order.remove(key)
+                job = self._pending.pop(key)
+                self._running = job
+
+            try:
+                job.run()
+            except Exception:
+                self.last_error = traceback.format_exc()
+            finally:
+                with self._cond:
+                    self._running = None
+                    self._cond.notify_all()
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""Small JSON state files (status, manifests) written via temp file + rename."""
+
+import io
+import json
+import os
+
+from shn_reports.textutil import text_type
+
+
+def read_json(path, default=None):
+    """Читает JSON-файл; при отсутствии или ошибке возвращает default."""
+    try:
+        with io.open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return default
+
+
+def write_json(path, data):
+    """Пишет JSON во временный файл рядом и подменяет им path."""
+    tmp_path = path + ".tmp"
+    text = json.dumps(data, indent=2, sort_keys=True, ensure_ascii=False)
+    with io.open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text_type(text))
+    if os.path.exists(path):
+        os.remove(path)
+    os.rename(tmp_path, path)
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+Change detection for generated reports.
+
+The schedule data (exported CSV file or rows read from the table) is
+hashed together with a generator signature
+(report code version + settings that change the output). The digest is
+stored in a small manifest next to the reports; if the next export has
+the same digest and the reports are still there, regeneration is skipped.
+"""
+
+import hashlib
+import os
+import time
+
+from shn_reports.jsonfile import read_json, write_json
+from shn_reports.textutil import to_text
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_digest(path, signature=()):
+    """SHA-1 содержимого файла + строки signature (версия генератора и т.п.)."""
+    h = hashlib.sha1()
+    for part in signature:
+        h.update(to_text(part).encode('utf-8'))
+        h.update(b"\0")
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def rows_digest(rows, signature=()):
+    """
+    SHA-1 строк спецификации + signature (для данных, прочитанных из
+    таблицы без файла). Ячейки и строки разделяются управляющими символами.
+    """
+    h = hashlib.sha1()
+    for part in signature:
+        h.update(to_text(part).encode('utf-8'))
+        h.update(b"\0")
+    for row in rows:
+        h.update(u"\x1f".join(to_text(c) for c in row).encode('utf-8'))
+        h.update(b"\x1e")
+    return h.hexdigest()
+
+
+def read_manifest(manifest_path):
+    return read_json(manifest_path, default={}) or {}
+
+
+def manifest_matches(manifest, digest, folder, file_names):
+    """True, если отчёты уже построены из тех же данных и все файлы на месте."""
+    if not manifest or manifest.get("content_hash") != digest:
+        return False
+    for name in file_names:
+        if not os.path.exists(os.path.join(folder, name)):
+            return False
+    return True
+
+
+def write_manifest(manifest_path, digest, **info):
+    data = dict(info)
+    data["content_hash"] = digest
+    data["generated_at"] = time.strftime("%Y-%m-%d %H:%M:%S")
+    write_json(manifest_path, data)
+    return data
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+Report jobs that survive closing Revit.
+
+The export queue lives in memory, so a job deferred by the throttle
+(not_before in the future) is lost if Revit is closed before it runs.
+persist_job() therefore writes everything the job needs into its local
+job folder: the rows read from the schedule tables as <base>.csv and a
+pending_job.json marker. A job that runs or is replaced removes its job
+folder, marker included - a marker that is still there after its run
+time (plus ORPHAN_GRACE_S) belongs to a session that is gone, and
+find_orphaned_jobs() hands it to the next sync, which runs it at once.
+"""
+
+import os
+import time
+
+from shn_reports.csvreader import iter_csv_rows
+from shn_reports.csvwriter import CsvWriter
+from shn_reports.jsonfile import read_json, write_json
+
+PENDING_FILE_NAME = "pending_job.json"
+CLAIM_SUFFIX = ".claim"
+# Живая сессия запускает задание в run_at; маркер старше run_at + этого - сирота
+ORPHAN_GRACE_S = 120
+
+
+def persist_job(job_folder, info, sources):
+    """
+    Сохраняет задание на диск. info - dict (export_folder, model_title,
+    api_timings, session, run_at); sources - как у run_report_job, строки
+    из таблиц пишутся в <base>.csv. Возвращает False, если папки задания
+    уже нет (задание выполнено или вытеснено).
+    """
+    if not os.path.isdir(job_folder):
+        return False
+    saved = []
+    for source in sources:
+        item = dict((k, v) for k, v in source.items() if k != "rows")
+        rows = source.get("rows")
+        if rows is not None:
+            writer = CsvWriter(os.path.join(job_folder, source["base"] + ".csv"))
+            try:
+                for i, row in enumerate(rows):
+                    if i == 0:
+                        writer.write_header(row)
+                    else:
+                        writer.write_row(row)
+            except Exception:
+                writer.discard()
+                raise
+            writer.close()
+            item["from_rows"] = True
+        saved.append(item)
+    marker = dict(info)
+    marker["sources"] = saved
+    marker["persisted_at"] = time.time()
+    if not os.path.isdir(job_folder):
+        return False
+    write_json(os.path.join(job_folder, PENDING_FILE_NAME), marker)
+    return True
+
+
+def find_orphaned_jobs(staging_root, session, now=None, grace_s=ORPHAN_GRACE_S):
+    """
+    [(папка задания, маркер)] заданий других сессий, которые должны были
+    выполниться больше grace_s назад. Папки: staging_root\\<модель>\\job_*.
+    """
+    now = time.time() if now is None else now
+    found = []
+    if not os.path.isdir(staging_root):
+        return found
+    for model in os.listdir(staging_root):
+        model_folder = os.path.join(staging_root, model)
+        if not os.path.isdir(model_folder):
+            continue
+        for name in sorted(os.listdir(model_folder)):
+            marker_path = os.path.join(model_folder, name, PENDING_FILE_NAME)
+            if not name.startswith("job_") or not os.path.isfile(marker_path):
+                continue
+            marker = read_json(marker_path)
+            if not marker or marker.get("session") == session:
+                continue
+            if now < marker.get("run_at", 0.0) + grace_s:
+                continue
+            found.append((os.path.join(model_folder, name), marker))
+    return found
+
+
+def claim_job(job_folder, marker, session):
+    """
+    Забирает задание-сироту в эту сессию (rename маркера атомарен, второй
+    Revit на той же машине получит False). Маркер остаётся - с новой сессией.
+    """
+    marker_path = os.path.join(job_folder, PENDING_FILE_NAME)
+    claim_path = marker_path + CLAIM_SUFFIX
+    try:
+        os.rename(marker_path, claim_path)
+    except OSError:
+        return False
+    marker = dict(marker)
+    marker["session"] = session
+    marker["run_at"] = time.time()
+    write_json(marker_path, marker)
+    os.remove(claim_path)
+    return True
+
+
+def load_job_sources(job_folder, marker):
+    """Источники задания из маркера; строки таблиц - обратно из <base>.csv."""
+    sources = []
+    for item in marker.get("sources") or []:
+        source = dict((k, v) for k, v in item.items() if k != "from_rows")
+        if item.get("from_rows"):
+            source["rows"] = list(iter_csv_rows(os.path.join(job_folder, item["base"] + ".csv")))
+        sources.append(source)
+    return sources
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+Fan-out of parsed schedule rows into several report writers.
+
+A writer ("sink") is any object with write_header(header), write_row(row),
+close() and discard(). The rows are iterated once; a sink that fails is
+discarded and dropped while the others keep going.
+"""
+
+
+def feed_rows(rows, sinks):
+    """
+    Отдаёт строки (первая - заголовок) всем sinks за один проход.
+
+    Возвращает (row_count, errors), где errors - {sink: exception}
+    для sinks, которые упали по дороге.
+    """
+    sinks = list(sinks)
+    errors = {}
+
+    def call(method, *args):
+        for sink in list(sinks):
+            try:
+                getattr(sink, method)(*args)
+            except Exception as e:
+                errors[sink] = e
+                sinks.remove(sink)
+                try:
+                    sink.discard()
+                except Exception:
+                    pass
+
+    rows = iter(rows)
+    row_count = 0
+    try:
+        header = next(rows, None) or [u"NO DATA"]
+        call('write_header', header)
+        for row in rows:
+            call('write_row', row)
+            row_count += 1
+    except Exception as e:
+        # ошибка чтения источника - все оставшиеся sinks недействительны
+        for sink in sinks:
+            errors[sink] = e
+            try:
+                sink.discard()
+            except Exception:
+                pass
+        return row_count, errors
+
+    call('close')
+    return row_count, errors
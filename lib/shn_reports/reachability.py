@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+Reachability of server folders without blocking the calling (UI) thread.
+
+os.path.exists on a slow or disconnected share can hang for tens of
+seconds. PathProbe runs the check on a daemon thread and waits at most
+timeout_s for it; a check that does not finish in time is cached as
+"timeout" and keeps running in the background, its real result replaces
+the timeout when it arrives. At most one check per path is in flight, so
+repeated clicks never pile up hung threads. Results are reused for
+max_age_s; keep the probe in pyRevit env vars to share it across button
+runs in the same Revit session.
+"""
+
+import os
+import threading
+import time
+
+REACHABLE = "reachable"
+MISSING = "missing"          # сервер отвечает, но папки нет
+UNREACHABLE = "unreachable"  # ошибка доступа
+TIMEOUT = "timeout"          # проверка не уложилась в timeout_s
+UNKNOWN = "unknown"
+
+STATE_TEXT = {
+    REACHABLE: "reachable",
+    MISSING: "folder not found",
+    UNREACHABLE: "unreachable",
+    TIMEOUT: "not responding",
+    UNKNOWN: "not checked",
+}
+
+
+class ProbeResult(object):
+
+    def __init__(self, state, checked_at=None):
+        self.state = state
+        self.checked_at = checked_at
+
+    @property
+    def ok(self):
+        return self.state == REACHABLE
+
+    def age(self, now=None):
+        if self.checked_at is None:
+            return None
+        return max(0.0, (time.time() if now is None else now) - self.checked_at)
+
+    def describe(self, now=None):
+        """'unreachable (checked 3 s ago)'"""
+        text = STATE_TEXT.get(self.state, self.state)
+        age = self.age(now)
+        if age is None:
+            return text
+        return "{} (checked {:.0f} s ago)".format(text, age)
+
+
+def _check_path(path):
+    try:
+        if os.path.isdir(path):
+            return REACHABLE
+        parent = os.path.dirname(path.rstrip("\\/"))
+        if parent and parent != path and os.path.isdir(parent):
+            return MISSING
+        return UNREACHABLE
+    except Exception:
+        return UNREACHABLE
+
+
+class PathProbe(object):
+
+    def __init__(self, max_age_s=30.0, check=_check_path):
+        self.max_age_s = max_age_s
+        self._check = check
+        self._lock = threading.Lock()
+        self._results = {}    # path -> ProbeResult
+        self._running = {}    # path -> threading.Event
+
+    def cached(self, path):
+        """Последний известный результат (без проверки) или UNKNOWN."""
+        with self._lock:
+            return self._results.get(path) or ProbeResult(UNKNOWN)
+
+    def check(self, path, timeout_s=1.0):
+        """
+        Результат не старше max_age_s; иначе запускает проверку и ждёт не
+        дольше timeout_s. Не успела - в кэш кладётся TIMEOUT, проверка
+        доводится в фоне и заменяет его своим результатом.
+        """
+        started = time.time()
+        with self._lock:
+            result = self._results.get(path)
+            if result is not None and result.age() <= self.max_age_s:
+                return result
+            done = self._running.get(path)
+            if done is None:
+                done = threading.Event()
+                self._running[path] = done
+                worker = threading.Thread(target=self._run, args=(path, done),
+                                          name="SHN path probe")
+                worker.daemon = True
+                worker.start()
+
+        done.wait(timeout_s)
+        with self._lock:
+            if done.is_set():
+                return self._results[path]
+            result = ProbeResult(TIMEOUT, started)
+            self._results[path] = result
+        return result
+
+    def _run(self, path, done):
+        state = self._check(path)
+        with self._lock:
+            self._results[path] = ProbeResult(state, time.time())
+            self._running.pop(path, None)
+        done.set()
+
+    def forget(self, path=None):
+        with self._lock:
+            if path is None:
+                self._results.clear()
+            else:
+                self._results.pop(path, None)
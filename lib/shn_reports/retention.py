@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+"""
+Retention / compaction of the report share.
+
+scan_share() walks every report root (Parameters_BOQ, Rooms) once, one
+project folder per worker thread, and returns per-model sizes plus the
+planned actions; apply_actions() executes them. Without apply_actions
+the scan is the dry run. What is cleaned up:
+
+    <name>_new.<ext>    copy published next to a locked file, only if the
+                        spool recorded it (<name>_new.<ext>.spool-diverted)
+                        - deleted once the regular file is at least as new,
+                        otherwise promoted over it (replace_file) as soon
+                        as the regular file is no longer locked; the marker
+                        goes with it. Unrecorded *_new files (a schedule
+                        named so) are never touched
+    *.publishing, *.tmp temp files of an interrupted publish / index write
+    *.jsonl             append-only logs over log_max_bytes are moved into
+                        <stem>_<date>.jsonl.gz and start over
+    <stem>_<date>.jsonl.gz
+                        compressed logs older than archive_days
+    history segments    segments older than history_days, but only those
+                        before the newest full snapshot that is itself
+                        older - every later snapshot can still be rebuilt
+
+Current reports and manifests are only ever replaced by their newer
+<name>_new copy, never deleted, and a newer <name>_new is never deleted.
+archive_days / history_days = None keeps those files forever.
+os.scandir is used when the runtime has it (CPython 3), IronPython falls
+back to listdir + stat.
+"""
+
+import gzip
+import os
+import re
+import shutil
+import stat
+import time
+
+from shn_reports.history import is_segment_name, read_segment_meta
+from shn_reports.spool import DIVERTED_SUFFIX, TEMP_SUFFIX, replace_file
+from shn_reports.workerpool import map_parallel
+
+DELETE = "delete"
+COMPRESS = "compress"
+PROMOTE = "promote"
+
+DEFAULT_POLICY = {
+    "temp_days": 1,
+    "log_max_bytes": 5 * 1024 * 1024,
+    "archive_days": 180,
+    "history_days": 365,
+}
+ARCHIVE_NAME_RE = re.compile(r"_\d{8}_\d{6}\.jsonl\.gz$")
+SCAN_WORKERS = 4
+
+
+class FileInfo(object):
+    __slots__ = ("path", "name", "size", "mtime")
+
+    def __init__(self, path, name, size, mtime):
+        self.path = path
+        self.name = name
+        self.size = size
+        self.mtime = mtime
+
+
+def _list_dir(folder):
+    """([FileInfo] файлов, [пути подпапок]) за один проход по папке."""
+    files, dirs = [], []
+    scandir = getattr(os, "scandir", None)
+    if scandir is not None:
+        for entry in scandir(folder):
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    dirs.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    st = entry.stat(follow_symlinks=False)
+                    files.append(FileInfo(entry.path, entry.name, st.st_size, st.st_mtime))
+            except OSError:
+                continue
+        return files, dirs
+    for name in os.listdir(folder):
+        path = os.path.join(folder, name)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        if stat.S_ISDIR(st.st_mode):
+            dirs.append(path)
+        elif stat.S_ISREG(st.st_mode):
+            files.append(FileInfo(path, name, st.st_size, st.st_mtime))
+    return files, dirs
+
+
+def _leftover_base(name):
+    """'Report_new.xlsx' -> 'Report.xlsx', иначе None."""
+    stem, ext = os.path.splitext(name)
+    if stem.endswith("_new") and len(stem) > 4:
+        return stem[:-4] + ext
+    return None
+
+
+def _plan_history(segments, policy, now):
+    """
+    Старые сегменты истории: всё до последнего полного снимка старше
+    history_days (цепочки после него на удалённые сегменты не опираются).
+    """
+    if policy.get("history_days") is None:
+        return []
+    cutoff = now - policy["history_days"] * 24 * 3600.0
+    segments = sorted(segments, key=lambda f: f.name)
+    old = [i for i, f in enumerate(segments) if f.mtime < cutoff]
+    for i in reversed(old):
+        try:
+            meta = read_segment_meta(segments[i].path) or {}
+        except Exception:
+            continue
+        if meta.get("kind") == "full":
+            return [(DELETE, f, "history older than {} days (kept from {})".format(
+                policy["history_days"], segments[i].name)) for f in segments[:i]]
+    return []
+
+
+def plan_folder(files, policy, now):
+    """[(действие, FileInfo, причина)] для файлов одной папки."""
+    day = 24 * 3600.0
+    by_name = dict((f.name.lower(), f) for f in files)
+    actions = []
+    segments = []
+    for f in files:
+        age = now - f.mtime
+        lower = f.name.lower()
+        if lower.endswith(TEMP_SUFFIX) or lower.endswith(".tmp"):
+            if age > policy["temp_days"] * day:
+                actions.append((DELETE, f, "temp file"))
+            continue
+        if is_segment_name(f.name):
+            segments.append(f)
+            continue
+        if lower.endswith(DIVERTED_SUFFIX):
+            if lower[:-len(DIVERTED_SUFFIX)] not in by_name:
+                actions.append((DELETE, f, "marker of a removed copy"))
+            continue
+        base = None
+        if lower + DIVERTED_SUFFIX in by_name:
+            base = _leftover_base(f.name)
+        current = by_name.get(base.lower()) if base is not None else None
+        if current is not None:
+            # спул кладёт <имя>_new только рядом с существующим (занятым) файлом
+            if current.mtime >= f.mtime:
+                actions.append((DELETE, f, "superseded by " + current.name))
+            else:
+                actions.append((PROMOTE, f, "newer than " + current.name))
+            continue
+        if lower.endswith(".jsonl") and f.size > policy["log_max_bytes"]:
+            actions.append((COMPRESS, f, "log over {} MB".format(
+                policy["log_max_bytes"] // (1024 * 1024))))
+        elif ARCHIVE_NAME_RE.search(lower) and policy.get("archive_days") is not None \
+                and age > policy["archive_days"] * day:
+            actions.append((DELETE, f, "compressed log older than {} days".format(
+                policy["archive_days"])))
+    actions.extend(_plan_history(segments, policy, now))
+    return actions
+
+
+def scan_project(project_folder, policy=None, now=None):
+    """
+    Обход одной папки проекта. Возвращает {"models": {модель: {"files",
+    "bytes", "last_modified"}}, "actions": [...], "errors": [...]}.
+    """
+    policy = policy or DEFAULT_POLICY
+    now = time.time() if now is None else now
+    result = {"models": {}, "actions": [], "errors": []}
+    stack = [(project_folder, None)]
+    while stack:
+        folder, model = stack.pop()
+        try:
+            files, dirs = _list_dir(folder)
+        except OSError as e:
+            result["errors"].append((folder, "{}".format(e)))
+            continue
+        if model is not None:
+            totals = result["models"].setdefault(
+                model, {"files": 0, "bytes": 0, "last_modified": 0.0})
+            for f in files:
+                totals["files"] += 1
+                totals["bytes"] += f.size
+                totals["last_modified"] = max(totals["last_modified"], f.mtime)
+        result["actions"].extend(plan_folder(files, policy, now))
+        for path in dirs:
+            stack.append((path, model if model is not None else os.path.basename(path)))
+    return result
+
+
+def scan_share(roots, policy=None, workers=SCAN_WORKERS):
+    """
+    Все корни отчётов: папки проектов параллельно (map_parallel).
+    Возвращает [(корень, проект, результат scan_project)] и список ошибок.
+    """
+    now = time.time()
+    projects = []
+    errors = []
+    for root in roots:
+        try:
+            _files, dirs = _list_dir(root)
+        except OSError as e:
+            errors.append((root, "{}".format(e)))
+            continue
+        projects.extend((root, path) for path in sorted(dirs))
+
+    results = map_parallel(lambda item: scan_project(item[1], policy, now), projects, workers)
+    scanned = []
+    for (root, path), (result, error) in zip(projects, results):
+        if error:
+            errors.append((path, error.strip().splitlines()[-1]))
+            continue
+        errors.extend(result["errors"])
+        scanned.append((root, os.path.basename(path), result))
+    return scanned, errors
+
+
+def compress_log(path, now=None):
+    """log.jsonl -> log_<дата>.jsonl.gz рядом; лог начинается заново."""
+    now = time.time() if now is None else now
+    stem = os.path.splitext(path)[0]
+    target = "{}_{}.jsonl.gz".format(stem, time.strftime("%Y%m%d_%H%M%S", time.localtime(now)))
+    # переименование первым: хук, дописывающий лог, просто создаст новый файл
+    rotating = path + ".rotating"
+    os.rename(path, rotating)
+    try:
+        with open(rotating, 'rb') as src:
+            gz = gzip.open(target + TEMP_SUFFIX, 'wb')
+            try:
+                shutil.copyfileobj(src, gz)
+            finally:
+                gz.close()
+        os.rename(target + TEMP_SUFFIX, target)
+    except Exception:
+        if not os.path.exists(path):
+            os.rename(rotating, path)
+        raise
+    os.remove(rotating)
+    return target
+
+
+def _remove_marker(info):
+    """Маркер спула уходит вместе со своей копией <имя>_new."""
+    marker = info.path + DIVERTED_SUFFIX
+    if os.path.exists(marker):
+        os.remove(marker)
+
+
+def apply_actions(actions):
+    """Выполняет план. Возвращает (выполнено, освобождено байт, [(путь, ошибка)])."""
+    done = 0
+    freed = 0
+    errors = []
+    for action, info, _reason in actions:
+        try:
+            if action == DELETE:
+                os.remove(info.path)
+                freed += info.size
+                _remove_marker(info)
+            elif action == COMPRESS:
+                target = compress_log(info.path)
+                freed += max(0, info.size - os.path.getsize(target))
+            elif action == PROMOTE:
+                # падает, пока обычный файл занят - тогда _new ждёт следующей очистки
+                target = os.path.join(os.path.dirname(info.path), _leftover_base(info.name))
+                replaced = os.path.getsize(target)
+                replace_file(info.path, target)
+                freed += replaced
+                _remove_marker(info)
+            done += 1
+        except Exception as e:
+            errors.append((info.path, "{}".format(e)))
+    return done, freed, errors
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+Server-wide index of report folders (all projects / models / report kinds).
+
+_reports_index.json at the index root holds one entry per report folder:
+kind (boq, rooms), project, model, folder (relative to the root), last
+export time, result, row counts and file sizes. Each writer updates only
+its own entry (read - update - replace under a lock file), nothing ever
+walks the folder tree. The static _reports_index.html dashboard is
+regenerated from the JSON on every update.
+"""
+
+import io
+import os
+import time
+
+from shn_reports.filelock import acquire_lock, release_lock
+from shn_reports.jsonfile import read_json, write_json
+from shn_reports.spool import replace_file
+from shn_reports.textutil import html_escape
+
+INDEX_JSON_NAME = "_reports_index.json"
+INDEX_HTML_NAME = "_reports_index.html"
+INDEX_LOCK_NAME = "_reports_index.lock"
+STALE_LOCK_S = 60
+LOCK_TIMEOUT_S = 5.0
+
+
+def entry_key(kind, project, model):
+    return u"{}|{}|{}".format(kind, project, model)
+
+
+def read_server_index(index_root):
+    index = read_json(os.path.join(index_root, INDEX_JSON_NAME), default={}) or {}
+    index.setdefault("entries", {})
+    return index
+
+
+def update_server_index(index_root, kind, project, model, folder, record):
+    """
+    Обновляет запись одной папки отчётов и пересобирает дашборд.
+    folder - полный путь папки отчётов (в индекс пишется относительно корня).
+    Возвращает False, если индекс занят другим пользователем дольше
+    LOCK_TIMEOUT_S (обновится при следующем экспорте).
+    """
+    lock_path = os.path.join(index_root, INDEX_LOCK_NAME)
+    if not acquire_lock(lock_path, STALE_LOCK_S, LOCK_TIMEOUT_S):
+        return False
+    try:
+        index = read_server_index(index_root)
+        entry = dict(record)
+        entry.update({
+            "kind": kind,
+            "project": project,
+            "model": model,
+            "folder": os.path.relpath(folder, index_root).replace(os.sep, u"/"),
+            "indexed_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        })
+        index["entries"][entry_key(kind, project, model)] = entry
+        index["updated"] = entry["indexed_at"]
+        write_json(os.path.join(index_root, INDEX_JSON_NAME), index)
+        write_index_dashboard(os.path.join(index_root, INDEX_HTML_NAME), index)
+    finally:
+        release_lock(lock_path)
+    return True
+
+
+# ---------- DASHBOARD ----------
+
+DASHBOARD_STYLE = u"""
+        body { font-family: Arial, sans-serif; padding: 20px; background-color: #fff; }
+        h2 { text-align: center; margin-bottom: 5px; color: #333; }
+        p.info { text-align: center; color: gray; font-size: 12px; margin-top: 0; margin-bottom: 15px; }
+        .search { text-align: center; margin-bottom: 15px; }
+        .search input { width: 320px; padding: 6px 10px; border: 1px solid #ccc; font-size: 13px; }
+        table { margin: 0 auto; border-collapse: collapse; font-size: 12px; }
+        th, td { border: 1px solid #dddddd; padding: 6px 10px; text-align: left; }
+        th { background-color: #009879; color: #ffffff; position: sticky; top: 0; }
+        td.num { text-align: right; }
+        td.error { color: #b00020; }
+        tr:nth-child(even) td { background-color: #f3f3f3; }
+"""
+
+DASHBOARD_SCRIPT = u"""
+    <script>
+        document.getElementById('search').addEventListener('input', function () {
+            var words = this.value.toLowerCase().split(/\\s+/).filter(Boolean);
+            var rows = document.querySelectorAll('#index-body tr');
+            for (var i = 0; i < rows.length; i++) {
+                var text = rows[i].getAttribute('data-search');
+                var show = words.every(function (w) { return text.indexOf(w) >= 0; });
+                rows[i].style.display = show ? '' : 'none';
+            }
+        });
+    </script>
+"""
+
+
+def _size_text(size):
+    if size is None:
+        return u""
+    if size >= 1048576:
+        return u"{:.1f} MB".format(size / 1048576.0)
+    return u"{:.0f} KB".format(size / 1024.0)
+
+
+def write_index_dashboard(html_path, index):
+    """Статическая страница: одна строка на папку отчётов, поиск по тексту."""
+    entries = sorted(index.get("entries", {}).values(),
+                     key=lambda e: (e.get("project", u"").lower(), e.get("model", u"").lower(),
+                                    e.get("kind", u"")))
+    tmp_path = html_path + ".tmp"
+    with io.open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(u'<!DOCTYPE html>\n<html>\n<head>\n    <meta charset="utf-8">\n'
+                u'    <title>SHN reports</title>\n'
+                u'    <style>' + DASHBOARD_STYLE + u'    </style>\n</head>\n<body>\n')
+        f.write(u'    <h2>SHN reports</h2>\n')
+        f.write(u'    <p class="info">Report folders: ' + html_escape(len(entries)) +
+                u' | Updated: ' + html_escape(index.get("updated", u"")) + u'</p>\n')
+        f.write(u'    <div class="search"><input id="search" type="text" '
+                u'placeholder="Filter by project, model, kind..."></div>\n')
+        f.write(u'    <table><thead><tr><th>Project</th><th>Model</th><th>Kind</th>'
+                u'<th>Last export</th><th>Result</th><th>Rows</th><th>Size</th>'
+                u'<th>Reports</th></tr></thead><tbody id="index-body">\n')
+        for e in entries:
+            folder = e.get("folder", u"")
+            links = [(u"Folder", folder + u"/")] + [
+                (label, folder + u"/" + name) for label, name in e.get("links") or []]
+            result = e.get("result") or u""
+            search = u" ".join([e.get("project", u""), e.get("model", u""),
+                                e.get("kind", u"")]).lower()
+            f.write(u'<tr data-search="' + html_escape(search) + u'">'
+                    u'<td>' + html_escape(e.get("project")) + u'</td>'
+                    u'<td>' + html_escape(e.get("model")) + u'</td>'
+                    u'<td>' + html_escape(e.get("kind")) + u'</td>'
+                    u'<td>' + html_escape(e.get("last_export") or u"-") + u'</td>'
+                    u'<td' + (u' class="error"' if result and result != u"ok" else u"") + u'>' +
+                    html_escape(result) + u'</td>'
+                    u'<td class="num">' + html_escape(e.get("rows", u"")) + u'</td>'
+                    u'<td class="num">' + _size_text(e.get("bytes")) + u'</td>'
+                    u'<td>' + u" ".join(u'<a href="' + html_escape(href) + u'">' +
+                                        html_escape(label) + u'</a>'
+                                        for label, href in links) + u'</td></tr>\n')
+        f.write(u'</tbody></table>\n' + DASHBOARD_SCRIPT + u'</body></html>')
+    replace_file(tmp_path, html_path)
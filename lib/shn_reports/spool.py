@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+"""
+Local spool for reports that go to the server share.
+
+Reports are generated locally and staged as one spool entry per target
+folder: a directory with the files plus spool.json (target folder, share
+root, attempts). flush() publishes every pending entry in one bulk copy:
+all files are first copied under temporary names into the target folder
+and then renamed over the final names, so readers never see half-written
+reports. If the share is unreachable the entry stays in the spool and is
+published by the next flush (next sync / next Room List run).
+
+A file that is locked on the share (open in Excel) is published next to
+it as <name>_new<ext>, with a <name>_new<ext>.spool-diverted marker
+(retention promotes or removes only recorded copies - a schedule may
+itself be called "<name>_new"). Commit files of an entry (the report manifest)
+are renamed last and only if every other file reached its own name:
+otherwise the manifest would describe reports that are not there, so it
+is withheld and the old one removed - the next sync regenerates.
+
+Small per-sync records travel the same way: append files of an entry
+(JSON-lines logs) are appended to the file on the share instead of
+replacing it, and an entry may carry one update of the server-wide
+report index (serverindex), applied after its files. Progress of both is
+saved in spool.json, so a retry never appends a record twice, and
+entries with appends or an index update are never dropped as superseded.
+"""
+
+import hashlib
+import os
+import shutil
+import time
+
+from shn_reports.filelock import acquire_lock, release_lock
+from shn_reports.jsonfile import read_json, write_json
+from shn_reports.textutil import to_text
+
+SPOOL_ROOT = os.path.join(
+    os.environ.get("LOCALAPPDATA") or os.environ.get("TEMP") or os.path.expanduser("~"),
+    "SHN_Reports_Spool")
+ENTRY_INFO_NAME = "spool.json"
+TEMP_SUFFIX = ".publishing"
+# Маркер копии, положенной рядом с занятым файлом (отчёты так не называются)
+DIVERTED_SUFFIX = ".spool-diverted"
+LOCK_NAME = "flush.lock"
+# Блокировка старше этого считается брошенной (Revit упал посреди публикации)
+STALE_LOCK_S = 15 * 60
+
+
+def replace_file(src, dst):
+    """Атомарная (насколько позволяет ОС) замена dst файлом src."""
+    try:
+        os.replace(src, dst)
+        return
+    except AttributeError:  # Python 2 / IronPython
+        pass
+    if os.path.exists(dst):
+        os.remove(dst)
+    os.rename(src, dst)
+
+
+def _locked_name(name):
+    stem, ext = os.path.splitext(name)
+    return stem + "_new" + ext
+
+
+class ReportSpool(object):
+
+    def __init__(self, root=SPOOL_ROOT):
+        self.root = root
+
+    # ---------- STAGING ----------
+
+    def stage(self, target_folder, files, share_root=None, move=True, commit_files=(),
+              append_files=(), index_update=None):
+        """
+        Кладёт набор файлов {имя: локальный путь} в новую запись спула.
+        commit_files - имена из files, которые публикуются последними и
+        только если остальные файлы легли под своими именами (манифест).
+        append_files - имена из files, которые дописываются в конец файла
+        на сервере (логи). index_update - аргументы update_server_index
+        (index_root, kind, project, model, folder, record) - применяется
+        после файлов записи.
+        Более старые записи для той же папки, которые новая полностью
+        перекрывает, удаляются (на сервер должно уйти последнее состояние).
+        Возвращает путь записи.
+        """
+        if not os.path.exists(self.root):
+            os.makedirs(self.root)
+
+        key = hashlib.sha1(to_text(target_folder).lower().encode('utf-8')).hexdigest()[:10]
+        entry_id = "{}_{:06d}_{}".format(time.strftime("%Y%m%d_%H%M%S"),
+                                         int((time.time() % 1) * 1000000), key)
+        entry = os.path.join(self.root, entry_id)
+        os.makedirs(entry)
+
+        for name, src in files.items():
+            dst = os.path.join(entry, name)
+            if move:
+                shutil.move(src, dst)
+            else:
+                shutil.copyfile(src, dst)
+
+        write_json(os.path.join(entry, ENTRY_INFO_NAME), {
+            "target": target_folder,
+            "share_root": share_root or "",
+            "files": sorted(files),
+            "commit": sorted(name for name in commit_files if name in files),
+            "append": sorted(name for name in append_files if name in files),
+            "index": index_update,
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "attempts": 0,
+            "last_error": "",
+        })
+
+        new_names = set(files)
+        for other, info in self.pending():
+            # записи логов и индекса не перекрываются: их данные не повторяются
+            if other != entry and info.get("target") == target_folder \
+                    and not info.get("append") \
+                    and (not info.get("index") or index_update) \
+                    and set(info.get("files") or []) <= new_names:
+                shutil.rmtree(other, ignore_errors=True)
+        return entry
+
+    def pending(self):
+        """Список (путь записи, info) в порядке постановки."""
+        result = []
+        if not os.path.isdir(self.root):
+            return result
+        for name in sorted(os.listdir(self.root)):
+            entry = os.path.join(self.root, name)
+            if not os.path.isdir(entry):
+                continue
+            info = read_json(os.path.join(entry, ENTRY_INFO_NAME))
+            if info:
+                result.append((entry, info))
+        return result
+
+    # ---------- PUBLISH ----------
+
+    def publish(self, entry, info=None):
+        """
+        Публикует одну запись: копия под временными именами, затем rename.
+        Возвращает список опубликованных имён (заблокированный файл
+        кладётся рядом как <имя>_new.<ext>; тогда файлы "commit" не
+        публикуются, а их старые версии на сервере удаляются). Бросает
+        исключение, если сервер недоступен или копирование не удалось.
+        """
+        info = info or read_json(os.path.join(entry, ENTRY_INFO_NAME)) or {}
+        target = info["target"]
+        share_root = info.get("share_root")
+        if share_root and not os.path.isdir(share_root):
+            raise IOError("Share is not reachable: {}".format(share_root))
+        if not os.path.exists(target):
+            os.makedirs(target)
+
+        append = set(info.get("append") or [])
+        names = [n for n in info.get("files") or [] if n not in append]
+        commit = set(info.get("commit") or [])
+        # файлы commit - в конец: переименовываются после всех остальных
+        names = [n for n in names if n not in commit] + [n for n in names if n in commit]
+        temps = []
+        try:
+            # 1) одна пачка копирования под временными именами
+            for name in names:
+                tmp = os.path.join(target, name + TEMP_SUFFIX)
+                shutil.copyfile(os.path.join(entry, name), tmp)
+                temps.append((name, tmp))
+
+            # 2) быстрые переименования в финальные имена
+            published = []
+            diverted = False
+            for name, tmp in temps:
+                if name in commit and diverted:
+                    # манифест не должен подтверждать отчёты, которых нет на месте
+                    os.remove(tmp)
+                    try:
+                        os.remove(os.path.join(target, name))
+                    except OSError:
+                        pass
+                    continue
+                try:
+                    replace_file(tmp, os.path.join(target, name))
+                    published.append(name)
+                except Exception:
+                    # файл открыт у кого-то (например, в Excel) - кладём рядом
+                    alt = _locked_name(name)
+                    replace_file(tmp, os.path.join(target, alt))
+                    write_json(os.path.join(target, alt + DIVERTED_SUFFIX), {
+                        "file": name,
+                        "diverted_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                    })
+                    published.append(alt)
+                    diverted = True
+            temps = []
+        finally:
+            for _, tmp in temps:
+                try:
+                    os.remove(tmp)
+                except Exception:
+                    pass
+
+        # 3) логи - дописать, 4) общий индекс; сделанное отмечается в spool.json
+        info_path = os.path.join(entry, ENTRY_INFO_NAME)
+        for name in sorted(append):
+            if name in (info.get("appended") or []):
+                continue
+            with open(os.path.join(entry, name), 'rb') as src:
+                with open(os.path.join(target, name), 'ab') as dst:
+                    shutil.copyfileobj(src, dst)
+            info["appended"] = (info.get("appended") or []) + [name]
+            write_json(info_path, info)
+            published.append(name)
+        if info.get("index") and not info.get("index_done"):
+            # serverindex сам использует replace_file из этого модуля
+            from shn_reports.serverindex import update_server_index
+            args = info["index"]
+            if not update_server_index(args["index_root"], args["kind"], args["project"],
+                                       args["model"], args["folder"], args["record"]):
+                raise IOError("Report index is locked: {}".format(args["index_root"]))
+            info["index_done"] = True
+            write_json(info_path, info)
+
+        shutil.rmtree(entry, ignore_errors=True)
+        return published
+
+    def _acquire_lock(self):
+        """Файловая блокировка: хук и кнопки работают в разных движках pyRevit."""
+        lock_path = os.path.join(self.root, LOCK_NAME)
+        if acquire_lock(lock_path, STALE_LOCK_S):
+            return lock_path
+        return None
+
+    def flush(self):
+        """
+        Публикует все ожидающие записи (старые первыми).
+        Возвращает (published_count, pending_count, last_error).
+        Если публикацию уже выполняет другой поток/скрипт, ничего не делает.
+        """
+        if not os.path.isdir(self.root):
+            return 0, 0, None
+        lock_path = self._acquire_lock()
+        if not lock_path:
+            return 0, len(self.pending()), None
+        try:
+            return self._flush_locked()
+        finally:
+            release_lock(lock_path)
+
+    def _flush_locked(self):
+        published = 0
+        last_error = None
+        unreachable = set()
+        for entry, info in self.pending():
+            if info.get("share_root") in unreachable:
+                continue
+            try:
+                self.publish(entry, info)
+                published += 1
+            except Exception as e:
+                last_error = to_text(e)
+                info["attempts"] = info.get("attempts", 0) + 1
+                info["last_error"] = last_error
+                info["last_attempt"] = time.strftime("%Y-%m-%d %H:%M:%S")
+                try:
+                    write_json(os.path.join(entry, ENTRY_INFO_NAME), info)
+                except Exception:
+                    pass
+                share_root = info.get("share_root")
+                if share_root and not os.path.isdir(share_root):
+                    unreachable.add(share_root)
+        return published, len(self.pending()), last_error
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+Grouped totals ("pivot") of a schedule, computed while the rows stream by.
+
+GroupSummaryWriter is a sink for pipeline.feed_rows: one dict lookup per
+row (group key -> row count + running sums), so it costs next to nothing
+next to the HTML / XLSX writers. A column is summed when every non-empty
+value in it is a number; the group columns themselves are never summed.
+On close() a small CSV and a static HTML table are written - a few
+hundred groups instead of the full 100k-row report.
+"""
+
+import io
+import re
+import time
+
+from shn_reports.csvwriter import CsvWriter
+from shn_reports.htmlreport import find_column
+from shn_reports.textutil import html_escape, to_text
+
+_NUMBER_RE = re.compile(r'^[-+]?(?:\d+|\d{1,3}(?:,\d{3})+)(?:\.\d+)?$')
+
+SUMMARY_STYLE = u"""
+        body { font-family: Arial, sans-serif; padding: 20px; background-color: #fff; }
+        h2 { text-align: center; margin-bottom: 5px; color: #333; }
+        p.info { text-align: center; color: gray; font-size: 12px; margin-top: 0; margin-bottom: 20px; }
+        table { margin: 0 auto; border-collapse: collapse; font-size: 12px; }
+        th, td { border: 1px solid #dddddd; padding: 6px 10px; text-align: left; }
+        th { background-color: #009879; color: #ffffff; position: sticky; top: 0; }
+        td.num { text-align: right; }
+        tr:nth-child(even) td { background-color: #f3f3f3; }
+        tr.total td { font-weight: bold; background-color: #e6f4f1; }
+"""
+
+
+def parse_number(text):
+    """Число из текста ячейки или None (пустые и нечисловые значения)."""
+    text = text.strip()
+    if not text or not _NUMBER_RE.match(text):
+        return None
+    return float(text.replace(u",", u""))
+
+
+def format_number(value):
+    if value == int(value):
+        return u"{}".format(int(value))
+    return u"{:.2f}".format(value)
+
+
+class GroupSummaryWriter(object):
+    """
+    Sink: write_header(header) -> write_row(row)... -> close().
+    group_columns - имена колонок группировки (отсутствующие пропускаются).
+    """
+
+    def __init__(self, html_path, csv_path, group_columns, title, model_title):
+        self.html_path = html_path
+        self.csv_path = csv_path
+        self.group_names = list(group_columns)
+        self.title = title
+        self.model_title = model_title
+        self.header = []
+        self.group_count = 0
+        self._groups = {}      # key -> [row_count, sum0, sum1, ...]
+        self._group_idx = []
+        self._value_idx = []   # колонки-кандидаты на суммирование
+        self._numeric = []     # всё ещё числовая ли колонка
+        self._seen = []        # было ли хоть одно число
+
+    def write_header(self, header):
+        self.header = [to_text(h).strip() for h in header]
+        self._group_idx = [i for i in (find_column(self.header, name)
+                                       for name in self.group_names) if i >= 0]
+        self._value_idx = [i for i in range(len(self.header)) if i not in self._group_idx]
+        self._numeric = [True] * len(self._value_idx)
+        self._seen = [False] * len(self._value_idx)
+
+    def write_row(self, row):
+        width = len(row)
+        key = tuple(to_text(row[i]).strip() if i < width else u"" for i in self._group_idx)
+        acc = self._groups.get(key)
+        if acc is None:
+            acc = [0] + [0.0] * len(self._value_idx)
+            self._groups[key] = acc
+        acc[0] += 1
+
+        numeric = self._numeric
+        for n, i in enumerate(self._value_idx):
+            if not numeric[n] or i >= width:
+                continue
+            cell = to_text(row[i])
+            if not cell.strip():
+                continue
+            value = parse_number(cell)
+            if value is None:
+                numeric[n] = False
+            else:
+                self._seen[n] = True
+                acc[n + 1] += value
+
+    def _table(self):
+        """(заголовок, строки, итог) только с числовыми колонками."""
+        sums = [n for n in range(len(self._value_idx)) if self._numeric[n] and self._seen[n]]
+        header = ([self.header[i] for i in self._group_idx] or [u"Group"]) + [u"Rows"] + \
+                 [self.header[self._value_idx[n]] for n in sums]
+        rows = []
+        total = [0] + [0.0] * len(sums)
+        for key in sorted(self._groups):
+            acc = self._groups[key]
+            values = [acc[0]] + [acc[n + 1] for n in sums]
+            for j, value in enumerate(values):
+                total[j] += value
+            rows.append((list(key) or [u"All"], values))
+        return header, rows, total
+
+    def close(self):
+        header, rows, total = self._table()
+        self.group_count = len(rows)
+        self._groups = {}
+        group_width = len(header) - len(total)
+
+        csv_writer = CsvWriter(self.csv_path)
+        try:
+            csv_writer.write_header(header)
+            for key, values in rows:
+                csv_writer.write_row(key + [format_number(v) for v in values])
+        except Exception:
+            csv_writer.discard()
+            raise
+        csv_writer.close()
+
+        with io.open(self.html_path, 'w', encoding='utf-8') as f:
+            f.write(u'<!DOCTYPE html>\n<html>\n<head>\n    <meta charset="utf-8">\n    <style>' +
+                    SUMMARY_STYLE + u'    </style>\n</head>\n<body>\n')
+            f.write(u'    <h2>' + html_escape(self.title) + u' - totals</h2>\n')
+            f.write(u'    <p class="info">Model: ' + html_escape(self.model_title) +
+                    u' | Date: ' + html_escape(time.strftime("%Y-%m-%d %H:%M")) +
+                    u' | Groups: ' + html_escape(len(rows)) + u'</p>\n')
+            f.write(u'    <table><thead><tr>' + u"".join(
+                u'<th>' + (html_escape(h) or u"&nbsp;") + u'</th>' for h in header) +
+                u'</tr></thead><tbody>\n')
+            for key, values in rows:
+                f.write(u'<tr>' + u"".join(u'<td>' + (html_escape(k) or u"&nbsp;") + u'</td>'
+                                          for k in key) +
+                        u"".join(u'<td class="num">' + format_number(v) + u'</td>'
+                                 for v in values) + u'</tr>\n')
+            f.write(u'<tr class="total"><td colspan="' + html_escape(group_width) + u'">Total</td>' +
+                    u"".join(u'<td class="num">' + format_number(v) + u'</td>' for v in total) +
+                    u'</tr>\n')
+            f.write(u'</tbody></table>\n</body></html>')
+
+    def discard(self):
+        self._groups = {}
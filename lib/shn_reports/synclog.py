@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+"""Append-only JSON-lines log of report jobs (one line per sync)."""
+
+import io
+import json
+
+from shn_reports.textutil import text_type
+
+
+def append_log_record(log_path, record):
+    """Дописывает одну запись (dict) в конец JSON-lines лога."""
+    line = json.dumps(record, sort_keys=True, ensure_ascii=False)
+    with io.open(log_path, 'a', encoding='utf-8') as f:
+        f.write(text_type(line) + u"\n")
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+Schedule rows read straight from the schedule's table data (no CSV export).
+
+A "table" is any object with row_count, column_count and
+cell_text(row, column) (0-based). ScheduleTable adapts a Revit ViewSchedule
+body section to that interface; ListTable is the in-memory equivalent used
+by the benchmarks and for checking the row source without Revit.
+The rows come out the same way iter_csv_rows gives them for the exported
+CSV: first row is the header, blank rows (grouping spacers) are skipped.
+"""
+
+from shn_reports.textutil import to_text
+
+
+class ListTable(object):
+    """Таблица в памяти: ListTable([[u"Family", u"Type"], [u"A", u"1"], ...])."""
+
+    def __init__(self, rows):
+        self.rows = [list(row) for row in rows]
+        self.row_count = len(self.rows)
+        self.column_count = max([len(row) for row in self.rows] or [0])
+
+    def cell_text(self, row, column):
+        cells = self.rows[row]
+        return cells[column] if column < len(cells) else u""
+
+
+class ScheduleTable(object):
+    """
+    Тело спецификации Revit (SectionType.Body) как таблица.
+    Читать можно только в API-потоке Revit.
+    """
+
+    def __init__(self, view):
+        from Autodesk.Revit.DB import SectionType
+
+        self.view = view
+        self.section_type = SectionType.Body
+        section = view.GetTableData().GetSectionData(SectionType.Body)
+        self.first_row = section.FirstRowNumber
+        self.first_column = section.FirstColumnNumber
+        self.row_count = section.NumberOfRows
+        self.column_count = section.NumberOfColumns
+
+    def cell_text(self, row, column):
+        return self.view.GetCellText(self.section_type,
+                                     self.first_row + row,
+                                     self.first_column + column)
+
+    def visible_columns(self):
+        """
+        Индексы колонок без скрытых полей (как в выгрузке CSV).
+        Если колонки таблицы не совпадают с полями один к одному, берём все.
+        """
+        definition = self.view.Definition
+        fields = [definition.GetField(i) for i in range(definition.GetFieldCount())]
+        if len(fields) != self.column_count:
+            return list(range(self.column_count))
+        return [i for i, field in enumerate(fields) if not field.IsHidden]
+
+
+def iter_table_rows(table, columns=None):
+    """
+    Отдаёт строки таблицы (списки текста ячеек), пропуская пустые.
+    columns - индексы колонок в нужном порядке (по умолчанию все).
+    """
+    if columns is None:
+        columns = list(range(table.column_count))
+    cell_text = table.cell_text
+    for row in range(table.row_count):
+        cells = [to_text(cell_text(row, column)) for column in columns]
+        if any(cell.strip() for cell in cells):
+            yield cells
+
+
+def read_table_rows(table, columns=None):
+    """Список всех строк (для передачи из API-потока в фоновый)."""
+    return list(iter_table_rows(table, columns))
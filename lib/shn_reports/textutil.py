@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""Text helpers shared by the report writers."""
+
+try:
+    text_type = unicode  # IronPython 2.7
+except NameError:
+    text_type = str
+
+
+def to_text(value):
+    """Returns value as unicode, decoding bytes with the usual Revit codecs."""
+    if value is None:
+        return u""
+    if isinstance(value, bytes):
+        for enc in ('utf-8', 'cp1251'):
+            try:
+                return value.decode(enc)
+            except Exception:
+                continue
+        return value.decode('utf-8', 'ignore')
+    if not isinstance(value, text_type):
+        return text_type(value)
+    return value
+
+
+def html_escape(s):
+    """Простое экранирование спецсимволов для HTML."""
+    s = to_text(s)
+    s = s.replace(u"&", u"&amp;")
+    s = s.replace(u"<", u"&lt;")
+    s = s.replace(u">", u"&gt;")
+    s = s.replace(u"\"", u"&quot;")
+    s = s.replace(u"'", u"&#39;")
+    return s
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Rate limit for report conversions of one model.
+
+Every sync still captures the schedule data, but the background job may
+be deferred: the first sync after a quiet period converts at once, syncs
+that follow within min_interval_s are debounced (the queued job is pushed
+back and replaced by the newest data, so the latest state is what gets
+converted). Two limits keep a busy model from being deferred forever:
+the force_every_n-th sync since the last conversion runs at once, and a
+deferred job never waits past last conversion + max_age_s.
+
+State is a tiny JSON file per model in the local staging folder. It is
+read and rewritten both by the sync hook (API thread) and by the finished
+background job (worker thread), so every read-modify-write runs under a
+process-wide lock and a lock file next to the state (other pyRevit engines).
+"""
+
+import os
+import threading
+import time
+
+from shn_reports.filelock import acquire_lock, release_lock
+from shn_reports.jsonfile import read_json, write_json
+
+STALE_LOCK_S = 30
+LOCK_TIMEOUT_S = 2.0
+
+_STATE_LOCK = threading.Lock()
+
+
+class SyncThrottle(object):
+
+    def __init__(self, state_path, min_interval_s, force_every_n=0, max_age_s=0):
+        self.state_path = state_path
+        self.min_interval_s = min_interval_s
+        self.force_every_n = force_every_n
+        self.max_age_s = max_age_s
+
+    def _update(self, change):
+        """
+        Читает состояние, применяет change(state) и сохраняет результат.
+        Если lock-файл не получен за LOCK_TIMEOUT_S (папка недоступна,
+        чужой сеанс завис), состояние всё равно обновляется - решение о
+        конвертации важнее точного счётчика. Возвращает результат change.
+        """
+        lock_path = os.path.splitext(self.state_path)[0] + ".lock"
+        with _STATE_LOCK:
+            locked = acquire_lock(lock_path, STALE_LOCK_S, LOCK_TIMEOUT_S)
+            try:
+                state = read_json(self.state_path, default={}) or {}
+                result = change(state)
+                try:
+                    write_json(self.state_path, state)
+                except Exception:
+                    pass
+                return result
+            finally:
+                if locked:
+                    release_lock(lock_path)
+
+    def on_sync(self, now=None):
+        """
+        Учитывает sync и решает, когда запускать конвертацию.
+        Возвращает (run_at, reason): reason - "interval", "nth_sync",
+        "max_age" или "debounced".
+        """
+        now = time.time() if now is None else now
+        return self._update(lambda state: self._decide(state, now))
+
+    def _decide(self, state, now):
+        last_export = state.get("last_export", 0.0)
+        syncs = state.get("syncs_since_export", 0) + 1
+        state["syncs_since_export"] = syncs
+        state["last_sync"] = now
+
+        if self.min_interval_s <= 0 or now - last_export >= self.min_interval_s:
+            run_at, reason = now, "interval"
+        elif self.force_every_n and syncs >= self.force_every_n:
+            run_at, reason = now, "nth_sync"
+        else:
+            run_at, reason = now + self.min_interval_s, "debounced"
+            if self.max_age_s and run_at > last_export + self.max_age_s:
+                run_at = max(now, last_export + self.max_age_s)
+                reason = "max_age" if run_at == now else "debounced"
+        return run_at, reason
+
+    def on_export(self, finished=None):
+        """Конвертация выполнена (вызывается из фонового задания)."""
+        finished = time.time() if finished is None else finished
+
+        def mark(state):
+            state["last_export"] = finished
+            state["syncs_since_export"] = 0
+        self._update(mark)
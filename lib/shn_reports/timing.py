@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Per-stage timings of a report job.
+
+StageTimer accumulates seconds by stage name. Besides plain stage()
+blocks it can time the rows of a source iterator (time_iter) and every
+call into a report writer (wrap_sink), which is how the single-pass
+pipeline gets separate parse / HTML / XLSX times. A disabled timer
+returns the iterator or sink unchanged, so the per-row cost is zero.
+"""
+
+import time
+from contextlib import contextmanager
+
+
+class StageTimer(object):
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.seconds = {}
+
+    def add(self, name, seconds):
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, name):
+        """with timer.stage("publish"): ..."""
+        if not self.enabled:
+            yield
+            return
+        t = time.time()
+        try:
+            yield
+        finally:
+            self.add(name, time.time() - t)
+
+    def time_iter(self, iterable, name):
+        """Время, проведённое внутри next() итератора (включая вложенные стадии)."""
+        if not self.enabled:
+            return iterable
+        return self._timed_iter(iter(iterable), name)
+
+    def _timed_iter(self, iterator, name):
+        clock = time.time
+        spent = 0.0
+        try:
+            while True:
+                t = clock()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    spent += clock() - t
+                    return
+                spent += clock() - t
+                yield item
+        finally:
+            self.add(name, spent)
+
+    def wrap_sink(self, sink, name):
+        """Sink для pipeline.feed_rows, время всех вызовов которого идёт в name."""
+        if not self.enabled or sink is None:
+            return sink
+        return _TimedSink(sink, name, self)
+
+    def as_dict(self, suffix="_s", digits=3):
+        return dict((name + suffix, round(seconds, digits))
+                    for name, seconds in self.seconds.items())
+
+
+class _TimedSink(object):
+
+    def __init__(self, sink, name, timer):
+        self.sink = sink
+        self.name = name
+        self.timer = timer
+
+    def _call(self, method, *args):
+        t = time.time()
+        try:
+            return getattr(self.sink, method)(*args)
+        finally:
+            self.timer.add(self.name, time.time() - t)
+
+    def write_header(self, header):
+        self._call('write_header', header)
+
+    def write_row(self, row):
+        self._call('write_row', row)
+
+    def close(self):
+        self._call('close')
+
+    def discard(self):
+        self._call('discard')
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+Small thread pool for the report jobs (one task per schedule).
+
+IronPython has no GIL, so schedules really are converted in parallel
+there; under CPython the pool still overlaps the file I/O. Tasks must not
+touch the Revit API. BackgroundTask runs one call off the UI thread for
+buttons that must not hang on a slow share.
+"""
+
+import threading
+import time
+import traceback
+
+
+def map_parallel(func, items, max_workers=4):
+    """
+    Вызывает func(item) для каждого элемента в max_workers потоках.
+    Возвращает список (result, error) в порядке items; error - текст
+    traceback или None.
+    """
+    items = list(items)
+    results = [None] * len(items)
+    if not items:
+        return results
+
+    lock = threading.Lock()
+    next_index = [0]  # без nonlocal (IronPython 2.7)
+
+    def worker():
+        while True:
+            with lock:
+                index = next_index[0]
+                if index >= len(items):
+                    return
+                next_index[0] = index + 1
+            try:
+                results[index] = (func(items[index]), None)
+            except Exception:
+                results[index] = (None, traceback.format_exc())
+
+    workers = max(1, min(max_workers, len(items)))
+    if workers == 1:
+        worker()
+        return results
+
+    threads = [threading.Thread(target=worker, name="SHN report pool {}".format(i))
+               for i in range(workers)]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class BackgroundTask(object):
+    """
+    func() в фоновом потоке. wait(timeout_s) - True, если задача успела
+    завершиться; иначе она продолжает работать, результат (result / error
+    - текст traceback) появится позже.
+    """
+
+    def __init__(self, func, name="SHN background task"):
+        self.result = None
+        self.error = None
+        self.finished_at = None
+        self._done = threading.Event()
+        thread = threading.Thread(target=self._run, args=(func,), name=name)
+        thread.daemon = True
+        thread.start()
+
+    def _run(self, func):
+        try:
+            self.result = func()
+        except Exception:
+            self.error = traceback.format_exc()
+        finally:
+            self.finished_at = time.time()
+            self._done.set()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout_s):
+        self._done.wait(timeout_s)
+        return self._done.is_set()
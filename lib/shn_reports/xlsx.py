@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+"""
+Minimal streaming XLSX writer (no Excel / COM required).
+
+Rows are streamed into a temporary sheetData file and the shared strings
+into another one; only the string -> index map (capped) and per-column
+widths are kept in memory. On close() the parts are assembled into the
+zip package with a bold header row, thin borders and column widths
+computed from the data (like Excel's AutoFit).
+"""
+
+import io
+import os
+import re
+import shutil
+import tempfile
+import zipfile
+
+from shn_reports.textutil import to_text
+
+# Больше уникальных строк в shared strings не держим - дальше inline строки,
+# чтобы память не росла вместе с количеством строк спецификации.
+MAX_SHARED_STRINGS = 100000
+MIN_COLUMN_WIDTH = 6
+MAX_COLUMN_WIDTH = 80
+
+STYLE_DATA = 1
+STYLE_HEADER = 2
+
+_NUMBER_RE = re.compile(r'^-?(?:0|[1-9]\d{0,14})(?:\.\d+)?$')
+_ILLEGAL_XML_RE = re.compile(u'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+CONTENT_TYPES_XML = u"""<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>
+<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>
+<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>
+<Override PartName="/xl/sharedStrings.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>
+</Types>"""
+
+ROOT_RELS_XML = u"""<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>
+</Relationships>"""
+
+WORKBOOK_XML = u"""<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
+<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets>
+</workbook>"""
+
+WORKBOOK_RELS_XML = u"""<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>
+<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>
+<Relationship Id="rId3" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings" Target="sharedStrings.xml"/>
+</Relationships>"""
+
+STYLES_XML = u"""<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">
+<fonts count="2">
+<font><sz val="11"/><name val="Calibri"/></font>
+<font><b/><sz val="11"/><name val="Calibri"/></font>
+</fonts>
+<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>
+<borders count="2">
+<border><left/><right/><top/><bottom/><diagonal/></border>
+<border><left style="thin"/><right style="thin"/><top style="thin"/><bottom style="thin"/><diagonal/></border>
+</borders>
+<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>
+<cellXfs count="3">
+<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>
+<xf numFmtId="0" fontId="0" fillId="0" borderId="1" xfId="0" applyBorder="1" applyAlignment="1"><alignment vertical="top" wrapText="1"/></xf>
+<xf numFmtId="0" fontId="1" fillId="0" borderId="1" xfId="0" applyFont="1" applyBorder="1"/>
+</cellXfs>
+</styleSheet>"""
+
+SHEET_HEAD_XML = (u'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                  u'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">\n'
+                  u'<sheetViews><sheetView workbookViewId="0">'
+                  u'<pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/>'
+                  u'</sheetView></sheetViews>\n')
+
+
+def column_letter(index):
+    """0 -> A, 25 -> Z, 26 -> AA ..."""
+    letters = u""
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = u"ABCDEFGHIJKLMNOPQRSTUVWXYZ"[rem] + letters
+    return letters
+
+
+def xml_escape(text):
+    text = _ILLEGAL_XML_RE.sub(u"", text)
+    return (text.replace(u"&", u"&amp;")
+                .replace(u"<", u"&lt;")
+                .replace(u">", u"&gt;")
+                .replace(u"\"", u"&quot;"))
+
+
+def safe_sheet_name(name):
+    name = re.sub(r'[\[\]\\/*?:]', u'_', to_text(name)).strip(u"' ")
+    return name[:31] or u"Sheet1"
+
+
+def _text_width(text):
+    if u"\n" in text:
+        return max(len(line) for line in text.split(u"\n"))
+    return len(text)
+
+
+class XlsxWriter(object):
+    """
+    Потоковая запись одного листа XLSX.
+
+    Порядок вызовов: write_header(header) -> write_row(row)... -> close().
+    """
+
+    def __init__(self, xlsx_path, sheet_name=u"Sheet1",
+                 max_shared_strings=MAX_SHARED_STRINGS):
+        self.xlsx_path = xlsx_path
+        self.sheet_name = safe_sheet_name(sheet_name)
+        self.max_shared_strings = max_shared_strings
+
+        self.row_count = 0
+        self._row_index = 0
+        self._widths = []
+        self._letters = []
+        self._shared = {}
+        self._shared_refs = 0
+
+        self._tmp_dir = tempfile.mkdtemp(prefix="shn_xlsx_")
+        self._rows_path = os.path.join(self._tmp_dir, "rows.xml")
+        self._sst_path = os.path.join(self._tmp_dir, "sst.xml")
+        self._rows = io.open(self._rows_path, 'w', encoding='utf-8')
+        self._sst = io.open(self._sst_path, 'w', encoding='utf-8')
+
+    def _cell_xml(self, ref, value, style):
+        if _NUMBER_RE.match(value):
+            return u'<c r="{}" s="{}"><v>{}</v></c>'.format(ref, style, value)
+
+        idx = self._shared.get(value)
+        if idx is None and len(self._shared) < self.max_shared_strings:
+            idx = len(self._shared)
+            self._shared[value] = idx
+            self._sst.write(self._si_xml(value))
+        if idx is not None:
+            self._shared_refs += 1
+            return u'<c r="{}" s="{}" t="s"><v>{}</v></c>'.format(ref, style, idx)
+
+        return u'<c r="{}" s="{}" t="inlineStr">{}</c>'.format(
+            ref, style, self._si_xml(value, u"is"))
+
+    def _si_xml(self, value, tag=u"si"):
+        return u'<{0}><t>{1}</t></{0}>'.format(tag, xml_escape(value))
+
+    def _write(self, cells, style):
+        self._row_index += 1
+        row_no = self._row_index
+        widths = self._widths
+        letters = self._letters
+        row_ref = str(row_no)
+        parts = [u'<row r="{}">'.format(row_no)]
+        for col, cell in enumerate(cells):
+            value = to_text(cell).strip()
+            if col >= len(widths):
+                widths.extend([0] * (col + 1 - len(widths)))
+                letters.extend(column_letter(i) for i in range(len(letters), col + 1))
+            if not value:
+                continue
+            width = _text_width(value)
+            if width > widths[col]:
+                widths[col] = width
+            parts.append(self._cell_xml(letters[col] + row_ref, value, style))
+        parts.append(u'</row>\n')
+        self._rows.write(u"".join(parts))
+
+    def write_header(self, header):
+        self._write(header, STYLE_HEADER)
+
+    def write_row(self, row):
+        self._write(row, STYLE_DATA)
+        self.row_count += 1
+
+    def _cols_xml(self):
+        if not self._widths:
+            return u""
+        parts = [u'<cols>']
+        for col, width in enumerate(self._widths):
+            width = min(max(width + 2, MIN_COLUMN_WIDTH), MAX_COLUMN_WIDTH)
+            parts.append(u'<col min="{0}" max="{0}" width="{1}" customWidth="1"/>'.format(
+                col + 1, width))
+        parts.append(u'</cols>\n')
+        return u"".join(parts)
+
+    def _assemble(self, path, head, body_path, tail):
+        with io.open(path, 'w', encoding='utf-8') as out:
+            out.write(head)
+            with io.open(body_path, 'r', encoding='utf-8') as body:
+                shutil.copyfileobj(body, out, 1024 * 1024)
+            out.write(tail)
+
+    def close(self):
+        """Собирает пакет XLSX и удаляет временные файлы."""
+        try:
+            self._rows.close()
+            self._sst.close()
+
+            sheet_path = os.path.join(self._tmp_dir, "sheet1.xml")
+            self._assemble(sheet_path,
+                           SHEET_HEAD_XML + self._cols_xml() + u'<sheetData>\n',
+                           self._rows_path,
+                           u'</sheetData>\n</worksheet>')
+
+            shared_path = os.path.join(self._tmp_dir, "sharedStrings.xml")
+            self._assemble(shared_path,
+                           u'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                           u'<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"'
+                           u' count="{}" uniqueCount="{}">'.format(self._shared_refs, len(self._shared)),
+                           self._sst_path,
+                           u'</sst>')
+            self._shared = {}
+
+            if os.path.exists(self.xlsx_path):
+                os.remove(self.xlsx_path)
+
+            with zipfile.ZipFile(self.xlsx_path, 'w', zipfile.ZIP_DEFLATED,
+                                 allowZip64=True) as zf:
+                zf.writestr('[Content_Types].xml', CONTENT_TYPES_XML.encode('utf-8'))
+                zf.writestr('_rels/.rels', ROOT_RELS_XML.encode('utf-8'))
+                zf.writestr('xl/workbook.xml',
+                            WORKBOOK_XML.format(name=xml_escape(self.sheet_name)).encode('utf-8'))
+                zf.writestr('xl/_rels/workbook.xml.rels', WORKBOOK_RELS_XML.encode('utf-8'))
+                zf.writestr('xl/styles.xml', STYLES_XML.encode('utf-8'))
+                zf.write(shared_path, 'xl/sharedStrings.xml')
+                zf.write(sheet_path, 'xl/worksheets/sheet1.xml')
+        finally:
+            self.discard()
+
+    def discard(self):
+        """Закрывает и удаляет временные файлы (без записи XLSX)."""
+        for f in (self._rows, self._sst):
+            try:
+                f.close()
+            except Exception:
+                pass
+        shutil.rmtree(self._tmp_dir, ignore_errors=True)
+
+
+def write_xlsx(rows, xlsx_path, sheet_name=u"Sheet1"):
+    """
+    Записывает XLSX из итератора строк (первая строка - жирный заголовок).
+    Возвращает количество строк данных.
+    """
+    rows = iter(rows)
+    header = next(rows, None) or [u"NO DATA"]
+    writer = XlsxWriter(xlsx_path, sheet_name)
+    try:
+        writer.write_header(header)
+        for row in rows:
+            writer.write_row(row)
+    except Exception:
+        writer.discard()
+        raise
+    writer.close()
+    return writer.row_count
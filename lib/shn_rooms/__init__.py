@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+"""
+Room List computation helpers (ceiling lookup, door counts, ...).
+
+Everything in this package is plain Python (IronPython 2.7 / CPython 3)
+and must not import the Revit API: the button extracts plain numbers
+from the model and hands them over, so the math can be run and
+benchmarked outside of Revit.
+"""
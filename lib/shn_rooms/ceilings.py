@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+Ceiling lookup over a 2D uniform grid.
+
+A ceiling is a plain tuple (min_x, min_y, max_x, max_y, bottom_z, loops)
+in the internal coordinates of its document (feet). loops is the actual
+footprint - a tuple of closed boundary loops, each as (xs, ys) coordinate
+lists, holes included - or None when only the bounding box is known.
+make_ceiling() builds the tuple from boundary points.
+
+CeilingGrid files every ceiling under each grid cell its bounding box
+(plus tol_xy) overlaps, so a room only looks at the ceilings of the one
+cell under its point instead of all ceilings of the document. The cell
+size follows the typical ceiling size; a ceiling that would span more
+than MAX_CELLS_PER_ITEM cells (one huge ceiling over a hall) is kept in
+a short list that every query checks. A candidate passes the bounding
+box test first and only then the even-odd point-in-polygon test against
+its loops, so L-shaped and rotated ceilings no longer cover the empty
+corners of their bounding box.
+"""
+
+import math
+
+MAX_CELLS_PER_ITEM = 64
+# Допуск по XY (ft): точка помещения на границе потолка считается внутри
+TOL_XY = 0.1
+# Потолок должен быть выше пола помещения хотя бы на столько (ft)
+MIN_CLEARANCE = 0.1
+
+
+def make_ceiling(loops, bottom_z):
+    """
+    Потолок из контуров footprint: loops - список контуров, каждый -
+    список точек (x, y) (замыкать не нужно). Пустые контуры пропускаются.
+    """
+    prepared = []
+    for points in loops:
+        if len(points) < 3:
+            continue
+        prepared.append(([p[0] for p in points], [p[1] for p in points]))
+    if not prepared:
+        return None
+    xs = [x for loop in prepared for x in loop[0]]
+    ys = [y for loop in prepared for y in loop[1]]
+    return (min(xs), min(ys), max(xs), max(ys), bottom_z, tuple(prepared))
+
+
+def point_in_loops(loops, x, y):
+    """Even-odd: точка внутри контура и вне его отверстий."""
+    inside = False
+    for xs, ys in loops:
+        xj, yj = xs[-1], ys[-1]
+        for xi, yi in zip(xs, ys):
+            if (yi > y) != (yj > y) and x < (xj - xi) * (y - yi) / (yj - yi) + xi:
+                inside = not inside
+            xj, yj = xi, yi
+    return inside
+
+
+def near_loops(loops, x, y, tol):
+    """Точка не дальше tol от какой-либо стороны контуров."""
+    tol2 = tol * tol
+    for xs, ys in loops:
+        xj, yj = xs[-1], ys[-1]
+        for xi, yi in zip(xs, ys):
+            dx, dy = xi - xj, yi - yj
+            length2 = dx * dx + dy * dy
+            t = 0.0
+            if length2 > 0.0:
+                t = max(0.0, min(1.0, ((x - xj) * dx + (y - yj) * dy) / length2))
+            ex, ey = xj + t * dx - x, yj + t * dy - y
+            if ex * ex + ey * ey <= tol2:
+                return True
+            xj, yj = xi, yi
+    return False
+
+
+def covers(ceiling, x, y, tol=TOL_XY):
+    """Footprint потолка (или его bbox, если контуров нет) содержит точку с допуском."""
+    if not (ceiling[0] - tol <= x <= ceiling[2] + tol and
+            ceiling[1] - tol <= y <= ceiling[3] + tol):
+        return False
+    loops = ceiling[5]
+    if loops is None:
+        return True
+    return point_in_loops(loops, x, y) or (tol > 0.0 and near_loops(loops, x, y, tol))
+
+
+def _typical_size(ceilings):
+    """Медиана большей стороны потолков - размер ячейки сетки."""
+    sizes = sorted(max(c[2] - c[0], c[3] - c[1]) for c in ceilings)
+    size = sizes[len(sizes) // 2] if sizes else 0.0
+    return size if size > 1.0 else 1.0
+
+
+class CeilingGrid(object):
+
+    def __init__(self, ceilings, cell_size=None, tol_xy=TOL_XY):
+        self.ceilings = list(ceilings)
+        self.tol_xy = tol_xy
+        self.cell_size = cell_size or _typical_size(self.ceilings)
+        self._cells = {}   # (ix, iy) -> [ceiling, ...]
+        self._large = []   # потолки на слишком много ячеек
+        for ceiling in self.ceilings:
+            self._insert(ceiling)
+
+    def __len__(self):
+        return len(self.ceilings)
+
+    def _cell(self, value):
+        return int(math.floor(value / self.cell_size))
+
+    def _insert(self, ceiling):
+        tol = self.tol_xy
+        x0, x1 = self._cell(ceiling[0] - tol), self._cell(ceiling[2] + tol)
+        y0, y1 = self._cell(ceiling[1] - tol), self._cell(ceiling[3] + tol)
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > MAX_CELLS_PER_ITEM:
+            self._large.append(ceiling)
+            return
+        cells = self._cells
+        for ix in range(x0, x1 + 1):
+            for iy in range(y0, y1 + 1):
+                bucket = cells.get((ix, iy))
+                if bucket is None:
+                    cells[(ix, iy)] = [ceiling]
+                else:
+                    bucket.append(ceiling)
+
+    def candidates(self, x, y):
+        """Потолки, bbox которых (с допуском) может содержать точку."""
+        bucket = self._cells.get((self._cell(x), self._cell(y)))
+        if not self._large:
+            return bucket or ()
+        return (bucket or []) + self._large
+
+    def lowest_above(self, x, y, floor_z, min_clearance=MIN_CLEARANCE):
+        """
+        Отметка низа ближайшего потолка над точкой (x, y) выше пола
+        floor_z или None - как полный перебор lowest_ceiling_scan.
+        """
+        return lowest_ceiling_scan(self.candidates(x, y), x, y, floor_z,
+                                   self.tol_xy, min_clearance)
+
+
+def lowest_ceiling_scan(ceilings, x, y, floor_z, tol_xy=TOL_XY, min_clearance=MIN_CLEARANCE):
+    """Перебор потолков: сначала отметка и bbox, контур - только для прошедших."""
+    limit = floor_z + min_clearance
+    closest = None
+    for ceiling in ceilings:
+        z = ceiling[4]
+        if z <= limit or (closest is not None and z >= closest):
+            continue
+        if covers(ceiling, x, y, tol_xy):
+            closest = z
+    return closest
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Room List compute stage: plain records in, report rows out.
+
+The button extracts one record per document (host, every link) in the
+Revit API thread:
+
+    {"source": "Host model" | "Link: <title>",
+     "rooms": [{"id": int, "number": ..., "name": ..., "level": ...,
+                "area_sqft": float, "height_ft": float,
+                "point": (x, y) | None, "floor_z": float | None}],
+     "ceilings": [ceiling tuples, see shn_rooms.ceilings],
+     "door_links": [(phase name, from room id | None, to room id | None)]}
+
+Everything below works on those records only - ceiling matching, door
+counts, unit conversion and sorting - so documents can be computed in a
+thread pool and the stage can be run and benchmarked without Revit.
+"""
+
+from shn_reports.workerpool import map_parallel
+from shn_rooms.ceilings import CeilingGrid
+
+SQFT_TO_SQM = 0.09290304
+FT_TO_M = 0.3048
+COMPUTE_WORKERS = 4
+
+
+def count_doors(door_links):
+    """
+    {roomId: doors} из связей дверей. Дверь считается для обеих комнат;
+    помещение существует только в одной фазе, поэтому фазы не пересекаются.
+    """
+    counts = {}
+    for _phase, from_id, to_id in door_links:
+        if from_id is not None:
+            counts[from_id] = counts.get(from_id, 0) + 1
+        if to_id is not None and to_id != from_id:
+            counts[to_id] = counts.get(to_id, 0) + 1
+    return counts
+
+
+def count_doors_by_phase(door_links):
+    """{имя фазы: {roomId: doors}} - те же связи по фазам."""
+    by_phase = {}
+    for link in door_links:
+        by_phase.setdefault(link[0], []).append(link)
+    return dict((phase, count_doors(links)) for phase, links in by_phase.items())
+
+
+def ceiling_above(grid, room):
+    """(HasCeiling, Height_m_or_dash): ближайший потолок над точкой помещения."""
+    point = room.get("point")
+    floor_z = room.get("floor_z")
+    if point is None or floor_z is None:
+        return "No", "-"
+    closest = grid.lowest_above(point[0], point[1], floor_z)
+    if closest is None:
+        return "No", "-"
+    return "Yes", round((closest - floor_z) * FT_TO_M, 2)
+
+
+def compute_document(record):
+    """
+    Строки отчёта (словари колонок Room List) для записи одного документа.
+    DoorCount - по всем выбранным фазам, DoorsByPhase - {фаза: двери}.
+    """
+    grid = CeilingGrid(record.get("ceilings") or [])
+    door_links = record.get("door_links") or []
+    door_counts = count_doors(door_links)
+    by_phase = count_doors_by_phase(door_links)
+    source = record["source"]
+    rows = []
+    for room in record.get("rooms") or []:
+        has_ceil, ceil_h = ceiling_above(grid, room)
+        rows.append({
+            "Number": room["number"],
+            "Name": room["name"],
+            "Level": room["level"],
+            "Area": round(room["area_sqft"] * SQFT_TO_SQM, 2),
+            "RoomHeight": round(room["height_ft"] * FT_TO_M, 2),
+            "DoorCount": door_counts.get(room["id"], 0),
+            "DoorsByPhase": dict((phase, counts[room["id"]])
+                                 for phase, counts in by_phase.items() if room["id"] in counts),
+            "HasCeiling": has_ceil,
+            "CeilingHeight": ceil_h,
+            "Source": source,
+        })
+    return rows
+
+
+def compute_documents(records, workers=COMPUTE_WORKERS):
+    """
+    Все документы в пуле потоков (map_parallel). Возвращает [(строки,
+    traceback или None)] в порядке records - ошибка одного документа не
+    роняет остальные.
+    """
+    return [(rows or [], error)
+            for rows, error in map_parallel(compute_document, records, workers)]
+
+
+def sort_rows(rows):
+    """По номеру помещения, затем по источнику (как в отчёте)."""
+    rows.sort(key=lambda x: (x["Number"], x["Source"]))
+    return rows
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Disk cache of Room List results per linked model.
+
+One JSON file per link path in the local cache folder:
+
+    {"path": ..., "stamp": ..., "settings": ..., "rooms": [...]}
+
+An entry is used only while the link is the same saved version (stamp,
+e.g. the document version GUID or the file modification time) and the
+Room List settings that shape the result are unchanged; anything else is
+a miss and the link is walked again. The cache is local (per user), the
+links themselves may live on the server.
+"""
+
+import hashlib
+import os
+
+from shn_reports.jsonfile import read_json, write_json
+from shn_reports.textutil import to_text
+
+CACHE_ROOT = os.path.join(
+    os.environ.get("LOCALAPPDATA") or os.environ.get("TEMP") or os.path.expanduser("~"),
+    "SHN_Rooms_Cache")
+
+
+class LinkResultCache(object):
+
+    def __init__(self, root=CACHE_ROOT):
+        self.root = root
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, link_path):
+        key = hashlib.sha1(to_text(link_path).lower().encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.root, key + ".json")
+
+    def get(self, link_path, stamp, settings):
+        """Сохранённые строки помещений линка или None (и считает hit / miss)."""
+        entry = None
+        if link_path and stamp:
+            entry = read_json(self._path(link_path))
+        if entry and entry.get("stamp") == stamp and entry.get("settings") == settings \
+                and entry.get("path") == link_path:
+            self.hits += 1
+            return entry.get("rooms")
+        self.misses += 1
+        return None
+
+    def put(self, link_path, stamp, settings, rooms):
+        """Запоминает результат; ошибки записи не мешают экспорту."""
+        if not link_path or not stamp:
+            return False
+        try:
+            if not os.path.isdir(self.root):
+                os.makedirs(self.root)
+            write_json(self._path(link_path), {
+                "path": link_path,
+                "stamp": stamp,
+                "settings": settings,
+                "rooms": rooms,
+            })
+            return True
+        except Exception:
+            return False
@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the Revit-free helpers in lib/ (shn_reports, shn_rooms).
+
+    python -m pytest tests
+
+Adds the extension lib folder to sys.path, like benchmarks/_synthetic.py.
+"""
+
+import os
+import sys
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+LIB_DIR = os.path.join(os.path.dirname(TESTS_DIR), 'lib')
+if LIB_DIR not in sys.path:
+    sys.path.insert(0, LIB_DIR)
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+from shn_reports.diff import RowDiffer, diff_rows
+
+KEYS = [u"Family", u"Type"]
+
+
+def summary(delta):
+    s = delta["summary"]
+    return s["added"], s["removed"], s["changed"], s["unchanged"]
+
+
+def test_keyed_diff_with_repeated_keys():
+    old = [[u"Family", u"Type", u"Count"],
+           [u"Door", u"D1", u"2"], [u"Door", u"D1", u"4"], [u"Wall", u"W1", u"1"]]
+    new = [[u"Family", u"Type", u"Count"],
+           [u"Door", u"D1", u"2"], [u"Door", u"D1", u"5"], [u"Window", u"A", u"1"]]
+    delta = diff_rows(old, new, KEYS)
+    assert delta["key_columns"] == KEYS
+    assert summary(delta) == (1, 1, 1, 1)
+    assert delta["changed"][0]["key"] == [u"Door", u"D1"]
+    assert delta["changed"][0]["changes"] == [[2, u"Count", u"4", u"5"]]
+    assert delta["removed"] == [[u"Wall", u"W1", u"1"]]
+
+
+def test_column_moved_and_added_keeps_keyed_matching():
+    old = [[u"Family", u"Type", u"Count"], [u"Door", u"D1", u"2"]]
+    new = [[u"Count", u"Mark", u"Type", u"Family"], [u"3", u"M1", u"D1", u"Door"]]
+    delta = diff_rows(old, new, KEYS)
+    assert summary(delta) == (0, 0, 1, 0)
+    assert delta["changed"][0]["changes"] == [[0, u"Count", u"2", u"3"], [1, u"Mark", u"", u"M1"]]
+    assert delta["added_columns"] == [u"Mark"]
+
+
+def test_key_missing_in_new_header_matches_whole_rows_on_both_sides():
+    old = [[u"Family", u"Type", u"Count"], [u"Door", u"D1", u"2"], [u"Wall", u"W1", u"1"]]
+    new = [[u"Family", u"Count"], [u"Door", u"2"], [u"Wall", u"7"]]
+    delta = diff_rows(old, new, KEYS)
+    assert delta["key_columns"] == []
+    # старые строки сравниваются по колонкам новой выгрузки, а не по старому ключу
+    assert summary(delta) == (1, 1, 0, 1)
+    assert delta["added"] == [[u"Wall", u"7"]]
+    assert delta["removed"] == [[u"Wall", u"1"]]
+    assert delta["removed_columns"] == [u"Type"]
+
+
+def test_key_missing_in_old_header_matches_whole_rows_on_both_sides():
+    old = [[u"Family", u"Count"], [u"Door", u"2"]]
+    new = [[u"Family", u"Type", u"Count"], [u"Door", u"", u"2"], [u"Door", u"D2", u"2"]]
+    delta = diff_rows(old, new, KEYS)
+    assert delta["key_columns"] == []
+    assert summary(delta) == (1, 0, 0, 1)
+    assert delta["added"] == [[u"Door", u"D2", u"2"]]
+
+
+def test_finish_without_new_header_reports_old_rows_as_removed():
+    delta = RowDiffer([[u"Family", u"Type"], [u"Door", u"D1"]], KEYS).finish()
+    assert summary(delta) == (0, 1, 0, 0)
+    assert delta["removed"] == [[u"Door", u"D1"]]
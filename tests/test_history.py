@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+from shn_reports.history import (quantity_trend, read_segment_meta, reconstruct_snapshot,
+                                 segment_file_name, write_delta_segment, write_full_segment)
+
+HEADER = [u"Family", u"Count"]
+
+
+def rows_once(rows):
+    """Итератор, который падает при втором проходе - снимок пишется потоком."""
+    consumed = []
+
+    def generate():
+        assert not consumed, "rows iterated twice"
+        consumed.append(True)
+        for row in rows:
+            yield row
+    return generate()
+
+
+def test_full_segment_is_streamed_with_trailing_count(tmpdir):
+    path = str(tmpdir.join(segment_file_name("a" * 40, now=1700000000)))
+    rows = [HEADER, [u" Door ", u"2"], [u"Window", u"3"]]
+    count = write_full_segment(path, rows_once(rows),
+                               {"content_hash": "a" * 40, "base_hash": u""})
+    assert count == 2
+
+    meta = read_segment_meta(path)
+    assert meta["kind"] == "full" and meta["header"] == HEADER and "rows" not in meta
+
+    meta, snapshot = reconstruct_snapshot(str(tmpdir))
+    assert meta["rows"] == 2 and meta["conflicts"] == 0
+    assert snapshot == [HEADER, [u"Door", u"2"], [u"Window", u"3"]]
+
+
+def test_delta_on_top_of_streamed_full(tmpdir):
+    full = "a" * 40
+    write_full_segment(str(tmpdir.join(segment_file_name(full, now=1700000000))),
+                       iter([HEADER, [u"Door", u"2"], [u"Window", u"3"]]),
+                       {"content_hash": full, "base_hash": u"", "generated_at": u"2023-11-14"})
+    write_delta_segment(str(tmpdir.join(segment_file_name("b" * 40, now=1700000060))),
+                        {"header": HEADER, "summary": {},
+                         "removed": [[u"Window", u"3"]],
+                         "changed": [{"row": [u"Door", u"5"],
+                                      "changes": [(1, u"Count", u"2", u"5")]}],
+                         "added": [[u"Wall", u"1"]]},
+                        {"content_hash": "b" * 40, "base_hash": full,
+                         "generated_at": u"2023-11-15"})
+
+    meta, snapshot = reconstruct_snapshot(str(tmpdir))
+    assert meta["kind"] == "delta" and "rows" not in meta
+    assert snapshot == [HEADER, [u"Door", u"5"], [u"Wall", u"1"]]
+
+    trend = quantity_trend(str(tmpdir))
+    assert trend == [(u"2023-11-14", {u"Door": 2.0, u"Window": 3.0}),
+                     (u"2023-11-15", {u"Door": 5.0, u"Wall": 1.0})]
+
+
+def test_empty_snapshot(tmpdir):
+    path = str(tmpdir.join(segment_file_name("c" * 40)))
+    assert write_full_segment(path, iter([]), {"content_hash": "c" * 40}) == 0
+    meta, snapshot = reconstruct_snapshot(str(tmpdir))
+    assert meta["rows"] == 0 and snapshot == [[]]
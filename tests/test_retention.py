@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+
+from shn_reports.history import segment_file_name, write_delta_segment, write_full_segment
+from shn_reports.retention import (COMPRESS, DEFAULT_POLICY, DELETE, PROMOTE, FileInfo,
+                                   apply_actions, plan_folder, scan_project)
+from shn_reports.spool import DIVERTED_SUFFIX
+
+DAY = 24 * 3600.0
+NOW = 1700000000.0
+
+
+def info(name, age_days, size=10, folder=u"share"):
+    return FileInfo(os.path.join(folder, name), name, size, NOW - age_days * DAY)
+
+
+def planned(files, policy=DEFAULT_POLICY):
+    return sorted((action, f.name) for action, f, _reason in plan_folder(files, policy, NOW))
+
+
+def write(path, text, age_days=0.0):
+    with io.open(str(path), "w", encoding="utf-8") as f:
+        f.write(text)
+    os.utime(str(path), (NOW - age_days * DAY, NOW - age_days * DAY))
+
+
+def diverted(name, age_days):
+    """Копия спула и её маркер."""
+    return [info(name, age_days), info(name + DIVERTED_SUFFIX, age_days)]
+
+
+def test_new_copy_older_than_report_is_deleted():
+    files = [info("BOQ.xlsx", 1)] + diverted("BOQ_new.xlsx", 2)
+    assert planned(files) == [(DELETE, "BOQ_new.xlsx")]
+
+
+def test_new_copy_newer_than_report_is_promoted_never_deleted():
+    for age in (0, 30, 400):
+        files = [info("BOQ.xlsx", age + 1)] + diverted("BOQ_new.xlsx", age)
+        assert planned(files) == [(PROMOTE, "BOQ_new.xlsx")]
+
+
+def test_schedules_named_new_are_never_touched():
+    # спецификации "Cable" и "Cable_new": маркера спула нет - это не копия
+    for ages in ((1, 2), (2, 1), (400, 500)):
+        files = [info("Cable.xlsx", ages[0]), info("Cable_new.xlsx", ages[1])]
+        assert planned(files) == []
+    assert planned([info("Walls_new.xlsx", 400)]) == []
+
+
+def test_marker_without_copy_is_removed():
+    assert planned([info("BOQ_new.xlsx" + DIVERTED_SUFFIX, 3)]) == \
+        [(DELETE, "BOQ_new.xlsx" + DIVERTED_SUFFIX)]
+
+
+def test_temp_logs_and_archives():
+    files = [info("BOQ.html.publishing", 2), info("index.tmp", 0.5),
+             info("SHN_Reports_sync_log.jsonl", 0, size=6 * 1024 * 1024),
+             info("SHN_Reports_sync_log_20230101_120000.jsonl.gz", 200),
+             info("SHN_Reports_sync_log_20240101_120000.jsonl.gz", 10)]
+    assert planned(files) == [
+        (COMPRESS, "SHN_Reports_sync_log.jsonl"),
+        (DELETE, "BOQ.html.publishing"),
+        (DELETE, "SHN_Reports_sync_log_20230101_120000.jsonl.gz")]
+    policy = dict(DEFAULT_POLICY, archive_days=None)
+    assert (DELETE, "SHN_Reports_sync_log_20230101_120000.jsonl.gz") not in planned(files, policy)
+
+
+def test_promote_replaces_report_once_it_is_writable(tmpdir):
+    write(tmpdir.join("BOQ.xlsx"), u"old", age_days=2)
+    write(tmpdir.join("BOQ_new.xlsx"), u"new", age_days=1)
+    write(tmpdir.join("BOQ_new.xlsx" + DIVERTED_SUFFIX), u"{}", age_days=1)
+    result = scan_project(str(tmpdir), now=NOW)
+    assert [(a, f.name) for a, f, _ in result["actions"]] == [(PROMOTE, "BOQ_new.xlsx")]
+
+    done, freed, errors = apply_actions(result["actions"])
+    assert (done, freed, errors) == (1, 3, [])
+    assert sorted(os.listdir(str(tmpdir))) == ["BOQ.xlsx"]
+    assert tmpdir.join("BOQ.xlsx").read() == u"new"
+
+
+def test_promote_onto_missing_report_fails_and_keeps_new_copy(tmpdir):
+    write(tmpdir.join("BOQ.xlsx"), u"old", age_days=2)
+    write(tmpdir.join("BOQ_new.xlsx"), u"new", age_days=1)
+    write(tmpdir.join("BOQ_new.xlsx" + DIVERTED_SUFFIX), u"{}", age_days=1)
+    actions = scan_project(str(tmpdir), now=NOW)["actions"]
+    os.remove(str(tmpdir.join("BOQ.xlsx")))
+    done, _freed, errors = apply_actions(actions)
+    assert done == 0 and len(errors) == 1
+    assert tmpdir.join("BOQ_new.xlsx").read() == u"new"
+    assert tmpdir.join("BOQ_new.xlsx" + DIVERTED_SUFFIX).exists()
+
+
+def make_history(folder, kinds_and_ages):
+    """Сегменты истории по порядку: [("full" | "delta", возраст в днях)]."""
+    names = []
+    previous = u""
+    header = [u"Family", u"Count"]
+    for i, (kind, age_days) in enumerate(kinds_and_ages):
+        digest = u"{:08x}".format(i + 1) + u"0" * 32
+        name = segment_file_name(digest, now=NOW - age_days * DAY)
+        path = str(folder.join(name))
+        meta = {"content_hash": digest, "base_hash": previous}
+        if kind == "full":
+            write_full_segment(path, [header, [u"Door", str(i)]], meta)
+        else:
+            write_delta_segment(path, {"header": header, "summary": {}, "removed": [],
+                                       "changed": [], "added": [[u"Window", str(i)]]}, meta)
+        os.utime(path, (NOW - age_days * DAY, NOW - age_days * DAY))
+        names.append(name)
+        previous = digest
+    return names
+
+
+def test_history_is_pruned_only_before_an_old_full_snapshot(tmpdir):
+    names = make_history(tmpdir, [("full", 900), ("delta", 800), ("full", 500),
+                                  ("delta", 450), ("delta", 300), ("full", 100)])
+    actions = scan_project(str(tmpdir), now=NOW)["actions"]
+    # полный снимок 500 дней назад остаётся: из него восстанавливаются дельты 450 и 300
+    assert sorted(f.name for a, f, _ in actions if a == DELETE) == sorted(names[:2])
+
+    policy = dict(DEFAULT_POLICY, history_days=None)
+    assert scan_project(str(tmpdir), policy, now=NOW)["actions"] == []
+
+
+def test_history_without_old_full_snapshot_is_kept(tmpdir):
+    make_history(tmpdir, [("full", 300), ("delta", 200), ("delta", 10)])
+    assert scan_project(str(tmpdir), now=NOW)["actions"] == []
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+from shn_rooms.ceilings import make_ceiling
+from shn_rooms.compute import (compute_document, compute_documents, count_doors,
+                               count_doors_by_phase, sort_rows)
+
+
+def square(x0, y0, size):
+    return [(x0, y0), (x0 + size, y0), (x0 + size, y0 + size), (x0, y0 + size)]
+
+
+def room(room_id, number, point, floor_z=0.0, area_sqft=100.0, height_ft=10.0):
+    return {"id": room_id, "number": number, "name": u"Room " + number,
+            "level": u"Level 1", "area_sqft": area_sqft, "height_ft": height_ft,
+            "point": point, "floor_z": floor_z}
+
+
+def make_record():
+    # L-образный потолок на 9 ft и низкий потолок 8 ft над частью помещения 101
+    l_shape = make_ceiling([[(0, 0), (20, 0), (20, 10), (10, 10), (10, 20), (0, 20)]], 9.0)
+    low = make_ceiling([square(0, 0, 5)], 8.0)
+    upper = make_ceiling([square(0, 0, 5)], 21.0)
+    return {
+        "source": u"Host model",
+        "rooms": [
+            room(1, u"101", (2.0, 2.0)),            # под обоими - ближайший 8 ft
+            room(2, u"102", (15.0, 5.0)),           # только L-потолок
+            room(3, u"103", (15.0, 15.0)),          # пустой угол L - потолка нет
+            room(4, u"201", (2.0, 2.0), floor_z=12.0),  # этажом выше
+            room(5, u"104", None),                  # не размещено
+        ],
+        "ceilings": [l_shape, low, upper],
+        "door_links": [
+            (u"Existing", 1, 2),
+            (u"New Construction", 2, 3),
+            (u"New Construction", 3, None),         # наружная дверь
+            (u"New Construction", 4, 4),            # обе стороны - одно помещение
+        ],
+    }
+
+
+def test_count_doors_counts_both_sides_once():
+    counts = count_doors(make_record()["door_links"])
+    assert counts == {1: 1, 2: 2, 3: 2, 4: 1}
+
+
+def test_count_doors_by_phase():
+    by_phase = count_doors_by_phase(make_record()["door_links"])
+    assert by_phase == {u"Existing": {1: 1, 2: 1},
+                        u"New Construction": {2: 1, 3: 2, 4: 1}}
+
+
+def test_compute_document_rows():
+    rows = dict((r["Number"], r) for r in compute_document(make_record()))
+    assert sorted(rows) == [u"101", u"102", u"103", u"104", u"201"]
+
+    assert (rows[u"101"]["HasCeiling"], rows[u"101"]["CeilingHeight"]) == ("Yes", 2.44)
+    assert (rows[u"102"]["HasCeiling"], rows[u"102"]["CeilingHeight"]) == ("Yes", 2.74)
+    assert (rows[u"103"]["HasCeiling"], rows[u"103"]["CeilingHeight"]) == ("No", "-")
+    assert (rows[u"201"]["HasCeiling"], rows[u"201"]["CeilingHeight"]) == ("Yes", 2.74)
+    assert (rows[u"104"]["HasCeiling"], rows[u"104"]["CeilingHeight"]) == ("No", "-")
+
+    assert [rows[n]["DoorCount"] for n in (u"101", u"102", u"103", u"201", u"104")] == \
+        [1, 2, 2, 1, 0]
+    assert rows[u"101"] == {
+        "Number": u"101", "Name": u"Room 101", "Level": u"Level 1",
+        "Area": 9.29, "RoomHeight": 3.05, "DoorCount": 1,
+        "DoorsByPhase": {u"Existing": 1},
+        "HasCeiling": "Yes", "CeilingHeight": 2.44, "Source": u"Host model",
+    }
+
+
+def test_compute_document_door_counts_per_phase():
+    rows = dict((r["Number"], r) for r in compute_document(make_record()))
+    assert rows[u"102"]["DoorsByPhase"] == {u"Existing": 1, u"New Construction": 1}
+    assert rows[u"102"]["DoorCount"] == 2
+    assert rows[u"103"]["DoorsByPhase"] == {u"New Construction": 2}
+    assert rows[u"104"]["DoorsByPhase"] == {}
+
+
+def test_compute_document_without_ceilings_or_doors():
+    record = {"source": u"Link: Empty", "rooms": [room(1, u"1", (0.0, 0.0))]}
+    rows = compute_document(record)
+    assert [(r["HasCeiling"], r["DoorCount"], r["Source"]) for r in rows] == \
+        [("No", 0, u"Link: Empty")]
+
+
+def test_compute_documents_isolates_failing_document():
+    broken = {"source": u"Link: Broken", "rooms": [{"id": 1}]}
+    link = dict(make_record(), source=u"Link: A")
+    results = compute_documents([make_record(), broken, link], workers=3)
+    assert [len(rows) for rows, _error in results] == [5, 0, 5]
+    assert [error is None for _rows, error in results] == [True, False, True]
+    assert "KeyError" in results[1][1]
+
+    rows = sort_rows(results[0][0] + results[2][0])
+    assert [(r["Number"], r["Source"]) for r in rows[:2]] == \
+        [(u"101", u"Host model"), (u"101", u"Link: A")]
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+
+import pytest
+
+from shn_reports import spool as spool_module
+from shn_reports.manifest import manifest_matches, read_manifest
+from shn_reports.spool import ReportSpool
+
+REPORTS = ["BOQ.html", "BOQ.xlsx", "BOQ_manifest.json"]
+
+
+def write(path, text):
+    with io.open(str(path), "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def read(path):
+    with io.open(str(path), encoding="utf-8") as f:
+        return f.read()
+
+
+@pytest.fixture
+def share(tmpdir):
+    target = tmpdir.mkdir("share").mkdir("Project").mkdir("Model")
+    for name in REPORTS[:2]:
+        write(target.join(name), u"old")
+    write(target.join("BOQ_manifest.json"), u'{"content_hash": "old"}')
+    return target
+
+
+def stage_new(tmpdir, target):
+    job = tmpdir.mkdir("job")
+    files = {}
+    for name in REPORTS[:2]:
+        write(job.join(name), u"new")
+        files[name] = str(job.join(name))
+    write(job.join("BOQ_manifest.json"), u'{"content_hash": "new"}')
+    files["BOQ_manifest.json"] = str(job.join("BOQ_manifest.json"))
+    spool = ReportSpool(str(tmpdir.join("spool")))
+    entry = spool.stage(str(target), files, commit_files=["BOQ_manifest.json"])
+    return spool, entry
+
+
+def lock(monkeypatch, locked_path):
+    """replace_file на занятый файл падает, как на Windows с открытым Excel."""
+    replace_file = spool_module.replace_file
+
+    def fake_replace(src, dst):
+        if os.path.normcase(dst) == os.path.normcase(str(locked_path)):
+            raise OSError(13, "Permission denied", dst)
+        replace_file(src, dst)
+    monkeypatch.setattr(spool_module, "replace_file", fake_replace)
+
+
+def test_publish_replaces_reports_and_manifest(tmpdir, share):
+    spool, entry = stage_new(tmpdir, share)
+    assert spool.flush() == (1, 0, None)
+    assert not os.path.exists(entry)
+    assert [read(share.join(n)) for n in REPORTS[:2]] == [u"new", u"new"]
+    manifest = read_manifest(str(share.join("BOQ_manifest.json")))
+    assert manifest_matches(manifest, "new", str(share), REPORTS[:2])
+    assert sorted(os.listdir(str(share))) == sorted(REPORTS)
+
+
+def test_locked_report_withholds_manifest(tmpdir, share, monkeypatch):
+    lock(monkeypatch, share.join("BOQ.xlsx"))
+    spool, entry = stage_new(tmpdir, share)
+    published = spool.publish(entry)
+
+    assert published == ["BOQ.html", "BOQ_new.xlsx"]
+    assert read(share.join("BOQ.xlsx")) == u"old"
+    assert read(share.join("BOQ_new.xlsx")) == u"new"
+    marker = read_manifest(str(share.join("BOQ_new.xlsx" + spool_module.DIVERTED_SUFFIX)))
+    assert marker["file"] == "BOQ.xlsx"
+    # ни новый, ни старый манифест не подтверждают отчёты - следующий sync пересоберёт
+    assert not share.join("BOQ_manifest.json").exists()
+    manifest = read_manifest(str(share.join("BOQ_manifest.json")))
+    assert not manifest_matches(manifest, "new", str(share), REPORTS[:2])
+    assert not manifest_matches(manifest, "old", str(share), REPORTS[:2])
+    assert not [n for n in os.listdir(str(share)) if n.endswith(spool_module.TEMP_SUFFIX)]
+
+
+def test_locked_manifest_is_diverted_like_any_file(tmpdir, share, monkeypatch):
+    lock(monkeypatch, share.join("BOQ_manifest.json"))
+    spool, entry = stage_new(tmpdir, share)
+    assert spool.publish(entry) == ["BOQ.html", "BOQ.xlsx", "BOQ_manifest_new.json"]
+    assert read_manifest(str(share.join("BOQ_manifest.json"))) == {"content_hash": "old"}
+
+
+def test_unreachable_share_keeps_entry(tmpdir, share):
+    spool, entry = stage_new(tmpdir, share)
+    info = read_manifest(os.path.join(entry, spool_module.ENTRY_INFO_NAME))
+    info["share_root"] = str(tmpdir.join("offline"))
+    spool_module.write_json(os.path.join(entry, spool_module.ENTRY_INFO_NAME), info)
+
+    published, pending, error = spool.flush()
+    assert (published, pending) == (0, 1)
+    assert "not reachable" in error
+    assert read(share.join("BOQ.html")) == u"old"
+
+
+def stage_record(tmpdir, spool, target, line, index_update=None, name="status"):
+    local = tmpdir.mkdir(name)
+    write(local.join("sync_log.jsonl"), line + u"\n")
+    write(local.join("status.json"), u'{"line": "%s"}' % line)
+    return spool.stage(str(target), {"sync_log.jsonl": str(local.join("sync_log.jsonl")),
+                                     "status.json": str(local.join("status.json"))},
+                       share_root=str(tmpdir.join("share")), append_files=["sync_log.jsonl"],
+                       index_update=index_update)
+
+
+def index_args(tmpdir, target, rows):
+    return {"index_root": str(tmpdir.join("share")), "kind": "boq", "project": "Project",
+            "model": "Model", "folder": str(target), "record": {"rows": rows}}
+
+
+def test_records_for_missing_folder_wait_and_append_in_order(tmpdir):
+    target = tmpdir.join("share").join("Project").join("New model")
+    spool = ReportSpool(str(tmpdir.join("spool")))
+    offline = str(tmpdir.join("offline"))
+
+    # сервер недоступен: две записи копятся в спуле, ни одна не вытесняет другую
+    for i, line in enumerate([u"sync 1", u"sync 2"]):
+        entry = stage_record(tmpdir, spool, target, line, name="s%d" % i)
+        info = read_manifest(os.path.join(entry, spool_module.ENTRY_INFO_NAME))
+        info["share_root"] = offline
+        spool_module.write_json(os.path.join(entry, spool_module.ENTRY_INFO_NAME), info)
+    assert spool.flush()[:2] == (0, 2)
+
+    for entry, info in spool.pending():
+        info["share_root"] = str(tmpdir.join("share"))
+        spool_module.write_json(os.path.join(entry, spool_module.ENTRY_INFO_NAME), info)
+    tmpdir.join("share").ensure_dir()
+    assert spool.flush() == (2, 0, None)
+    # папка модели создана публикацией, лог дописан по порядку
+    assert read(target.join("sync_log.jsonl")) == u"sync 1\nsync 2\n"
+    assert read(target.join("status.json")) == u'{"line": "sync 2"}'
+
+
+def test_index_update_is_applied_after_files_and_retried(tmpdir, monkeypatch):
+    from shn_reports import serverindex
+    target = tmpdir.mkdir("share").mkdir("Project").mkdir("Model")
+    write(target.join("sync_log.jsonl"), u"old\n")
+    spool = ReportSpool(str(tmpdir.join("spool")))
+    entry = stage_record(tmpdir, spool, target, u"sync", index_args(tmpdir, target, 7))
+
+    calls = []
+    real_update = serverindex.update_server_index
+
+    def busy_then_free(*args):
+        calls.append(args)
+        return False if len(calls) == 1 else real_update(*args)
+    monkeypatch.setattr(serverindex, "update_server_index", busy_then_free)
+
+    published, pending, error = spool.flush()
+    assert (published, pending) == (0, 1) and "locked" in error
+    # лог уже дописан - повтор не дублирует строку
+    assert read(target.join("sync_log.jsonl")) == u"old\nsync\n"
+
+    assert spool.flush() == (1, 0, None)
+    assert not os.path.exists(entry)
+    assert read(target.join("sync_log.jsonl")) == u"old\nsync\n"
+    index = serverindex.read_server_index(str(tmpdir.join("share")))
+    assert index["entries"]["boq|Project|Model"]["rows"] == 7
+
+
+def test_reports_do_not_supersede_pending_records(tmpdir):
+    target = tmpdir.mkdir("share").mkdir("Project").mkdir("Model")
+    spool = ReportSpool(str(tmpdir.join("spool")))
+    record = stage_record(tmpdir, spool, target, u"sync", index_args(tmpdir, target, 1))
+    job = tmpdir.mkdir("job")
+    write(job.join("status.json"), u"{}")
+    write(job.join("sync_log.jsonl"), u"other\n")
+    spool.stage(str(target), {"status.json": str(job.join("status.json")),
+                              "sync_log.jsonl": str(job.join("sync_log.jsonl"))})
+    assert os.path.exists(record)
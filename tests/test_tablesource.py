@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+import io
+
+from shn_reports.csvreader import iter_csv_rows
+from shn_reports.csvwriter import CsvWriter, quote_csv_cell
+from shn_reports.pipeline import feed_rows
+from shn_reports.summary import GroupSummaryWriter
+from shn_reports.tablesource import ListTable, iter_table_rows, read_table_rows
+
+# тело спецификации с группировкой: строка раздела, пустые строки-разделители,
+# неполные строки (колонок меньше, чем в заголовке) и не текстовые значения
+TABLE = [
+    [u"Family", u"Type", u"Count", u"Mark"],
+    [u"Doors"],
+    [u"Door", u"D1, \"90\"", 2, u"א-1"],
+    [u"Door", u"D2", u"3"],
+    [u"", u"", u"", u""],
+    [u"Windows", u"", u"", u""],
+    [u"Window", u"W1\nsplit", u"1", u"Б-2"],
+    [u"  ", u"\t"],
+    [],
+]
+EXPECTED = [
+    [u"Family", u"Type", u"Count", u"Mark"],
+    [u"Doors", u"", u"", u""],
+    [u"Door", u"D1, \"90\"", u"2", u"א-1"],
+    [u"Door", u"D2", u"3", u""],
+    [u"Windows", u"", u"", u""],
+    [u"Window", u"W1\nsplit", u"1", u"Б-2"],
+]
+
+
+def write_revit_csv(path, rows, width):
+    """Выгрузка как у Revit: все ячейки в кавычках, пустые строки тоже."""
+    with io.open(str(path), "w", encoding="utf-16", newline=u"") as f:
+        for row in rows:
+            cells = [u"{}".format(c) for c in row] + [u""] * (width - len(row))
+            f.write(u",".join(quote_csv_cell(c) for c in cells) + u"\r\n")
+
+
+def test_list_table_shape():
+    table = ListTable(TABLE)
+    assert (table.row_count, table.column_count) == (9, 4)
+    assert table.cell_text(1, 3) == u""
+
+
+def test_blank_rows_skipped_section_rows_kept():
+    assert read_table_rows(ListTable(TABLE)) == EXPECTED
+
+
+def test_columns_select_and_order():
+    rows = read_table_rows(ListTable(TABLE), [2, 0])
+    assert rows[:3] == [[u"Count", u"Family"], [u"", u"Doors"], [u"2", u"Door"]]
+    assert len(rows) == len(EXPECTED)
+    # строки, пустые в выбранных колонках (разделы), тоже пропускаются
+    assert list(iter_table_rows(ListTable(TABLE), [3])) == \
+        [[u"Mark"], [u"א-1"], [u"Б-2"]]
+
+
+def test_table_rows_match_exported_csv(tmpdir):
+    path = tmpdir.join("export.csv")
+    write_revit_csv(path, TABLE, 4)
+    assert list(iter_csv_rows(str(path))) == read_table_rows(ListTable(TABLE))
+
+
+def test_table_rows_through_pipeline(tmpdir):
+    csv_path = str(tmpdir.join("BOQ.csv"))
+    summary_html = str(tmpdir.join("BOQ_summary.html"))
+    summary_csv = str(tmpdir.join("BOQ_summary.csv"))
+    csv_writer = CsvWriter(csv_path)
+    summary = GroupSummaryWriter(summary_html, summary_csv, [u"Family"], u"BOQ", u"Model")
+
+    count, errors = feed_rows(read_table_rows(ListTable(TABLE)), [csv_writer, summary])
+    assert (count, errors) == (len(EXPECTED) - 1, {})
+    assert csv_writer.row_count == count
+    assert list(iter_csv_rows(csv_path)) == EXPECTED
+
+    # строки разделов - свои группы без количества, итог по Count не меняется
+    assert list(iter_csv_rows(summary_csv)) == [
+        [u"Family", u"Rows", u"Count"],
+        [u"Door", u"2", u"5"],
+        [u"Doors", u"1", u"0"],
+        [u"Window", u"1", u"1"],
+        [u"Windows", u"1", u"0"],
+    ]
+    assert summary.group_count == 4
+
+
+def test_empty_table_gives_no_data_header(tmpdir):
+    csv_path = str(tmpdir.join("empty.csv"))
+    rows = read_table_rows(ListTable([[u"", u""], []]))
+    assert rows == []
+    count, errors = feed_rows(rows, [CsvWriter(csv_path)])
+    assert (count, errors) == (0, {})
+    assert list(iter_csv_rows(csv_path)) == [[u"NO DATA"]]
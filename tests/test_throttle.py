@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+
+from shn_reports import throttle as throttle_module
+from shn_reports.jsonfile import read_json
+from shn_reports.pendingjobs import (PENDING_FILE_NAME, claim_job, find_orphaned_jobs,
+                                     load_job_sources, persist_job)
+from shn_reports.throttle import SyncThrottle
+
+ROWS = [[u"Family", u"Type", u"Count"],
+        [u"Panel", u"A, 400", u"2"],
+        [u"Light \"L1\"", u"line1\nline2", u"10"]]
+
+
+def make_throttle(folder):
+    return SyncThrottle(str(folder.join("throttle.json")), min_interval_s=300,
+                        force_every_n=5, max_age_s=1800)
+
+
+def test_first_sync_runs_at_once(tmpdir):
+    run_at, reason = make_throttle(tmpdir).on_sync(now=1000.0)
+    assert (run_at, reason) == (1000.0, "interval")
+
+
+def test_sync_soon_after_export_is_debounced(tmpdir):
+    throttle = make_throttle(tmpdir)
+    throttle.on_sync(now=1000.0)
+    throttle.on_export(finished=1010.0)
+    run_at, reason = throttle.on_sync(now=1060.0)
+    assert reason == "debounced"
+    assert run_at == 1360.0
+
+
+def test_nth_sync_is_forced(tmpdir):
+    throttle = make_throttle(tmpdir)
+    throttle.on_export(finished=1000.0)
+    reasons = [throttle.on_sync(now=1000.0 + i)[1] for i in range(1, 6)]
+    assert reasons == ["debounced"] * 4 + ["nth_sync"]
+
+
+def test_deferred_job_is_never_later_than_max_age(tmpdir):
+    throttle = SyncThrottle(str(tmpdir.join("throttle.json")), 300, 0, 400)
+    throttle.on_export(finished=1000.0)
+    run_at, _reason = throttle.on_sync(now=1200.0)
+    assert run_at == 1400.0
+
+
+def test_concurrent_syncs_and_exports_keep_every_update(tmpdir):
+    # sync-хук (поток API) и фоновое задание пишут одно состояние
+    state_path = str(tmpdir.join("throttle.json"))
+
+    def syncs():
+        for i in range(50):
+            make_throttle(tmpdir).on_sync(now=2000.0 + i)
+
+    def exports():
+        for _i in range(20):
+            make_throttle(tmpdir).on_export(finished=1000.0)
+
+    threads = [threading.Thread(target=syncs) for _i in range(3)]
+    threads.append(threading.Thread(target=exports))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    make_throttle(tmpdir).on_export(finished=1000.0)
+    threads = [threading.Thread(target=syncs) for _i in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    state = read_json(state_path)
+    assert state["syncs_since_export"] == 150
+    assert state["last_export"] == 1000.0
+    assert not tmpdir.join("throttle.lock").check()
+
+
+def test_lock_held_by_another_engine_still_updates_state(tmpdir, monkeypatch):
+    monkeypatch.setattr(throttle_module, "LOCK_TIMEOUT_S", 0.0)
+    tmpdir.join("throttle.lock").write("")
+    throttle = make_throttle(tmpdir)
+    throttle.on_export(finished=1000.0)
+    assert throttle.on_sync(now=1100.0)[1] == "debounced"
+    assert read_json(str(tmpdir.join("throttle.json")))["syncs_since_export"] == 1
+    # чужой lock-файл не удаляется
+    assert tmpdir.join("throttle.lock").check()
+
+
+def test_deferred_sync_then_close_is_resumed_by_next_session(tmpdir):
+    staging = tmpdir.mkdir("staging")
+    model = staging.mkdir("Project__Model")
+    throttle = make_throttle(model)
+    throttle.on_export(finished=1000.0)
+    run_at, reason = throttle.on_sync(now=1100.0)
+    assert reason == "debounced"
+
+    # сеанс A откладывает задание и закрывается, не выполнив его
+    job_folder = str(model.mkdir("job_a"))
+    sources = [{"schedule": u"SHN_CommonBOQ", "base": u"SHN_CommonBOQ",
+                "timings": {"extract_s": 0.1}, "rows": ROWS},
+               {"schedule": u"Other", "base": u"Other", "timings": {},
+                "error": u"exported CSV not ready"}]
+    assert persist_job(job_folder, {"session": "A", "export_folder": u"F:\\X\\P\\M",
+                                    "model_title": u"M", "api_timings": {},
+                                    "run_at": run_at}, sources)
+
+    # до run_at + grace задание принадлежит сеансу A
+    assert find_orphaned_jobs(str(staging), "B", now=run_at) == []
+    # свои задания сеанс не забирает
+    assert find_orphaned_jobs(str(staging), "A", now=run_at + 1000) == []
+
+    orphans = find_orphaned_jobs(str(staging), "B", now=run_at + 1000)
+    assert [folder for folder, _marker in orphans] == [job_folder]
+    folder, marker = orphans[0]
+    assert marker["export_folder"] == u"F:\\X\\P\\M"
+    assert claim_job(folder, marker, "B")
+    assert os.path.isfile(os.path.join(folder, PENDING_FILE_NAME))
+    assert find_orphaned_jobs(str(staging), "C", now=run_at + 1000) == []
+
+    resumed = load_job_sources(folder, marker)
+    assert resumed[0]["rows"] == ROWS
+    assert resumed[0]["timings"] == {"extract_s": 0.1}
+    assert "rows" not in resumed[1] and resumed[1]["error"] == u"exported CSV not ready"
+
+
+def test_finished_or_replaced_job_is_not_persisted(tmpdir):
+    missing = str(tmpdir.join("job_gone"))
+    assert not persist_job(missing, {"session": "A", "run_at": 0.0}, [])
+    assert find_orphaned_jobs(str(tmpdir), "B") == []
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+import threading
+
+from shn_reports.workerpool import BackgroundTask, map_parallel
+
+
+def test_map_parallel_keeps_order_and_errors():
+    results = map_parallel(lambda x: 10 // x, [5, 0, 2], 3)
+    assert [r for r, _e in results] == [2, None, 5]
+    assert results[1][1].strip().splitlines()[-1].startswith("ZeroDivisionError")
+
+
+def test_background_task_outlives_timeout():
+    release = threading.Event()
+    task = BackgroundTask(lambda: release.wait(5) and "published")
+    assert not task.wait(0.05)
+    assert not task.done and task.result is None
+    release.set()
+    assert task.wait(5)
+    assert task.result == "published" and task.error is None and task.finished_at
+
+
+def test_background_task_error():
+    task = BackgroundTask(lambda: {}["share"])
+    assert task.wait(5)
+    assert task.result is None and "KeyError" in task.error